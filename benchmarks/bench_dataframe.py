@@ -0,0 +1,162 @@
+"""
+Benchmark of the tweet DataFrame pipeline in src/utils/data_processor.py.
+
+Builds a synthetic batch of raw tweets (the same corpus the fake Data365
+server serves) and times each stage, reporting the DataFrame's deep memory
+footprint. Building and cleaning are also timed with the old
+list-comprehension and per-cell regex implementations for comparison, and
+the CSV written from the new frame is checked byte for byte against the
+old writer's, on the corpus plus records with fractional seconds, mixed
+offsets, a malformed date and missing list fields:
+
+    python benchmarks/bench_dataframe.py --tweets 10000
+    python benchmarks/bench_dataframe.py --tweets 100000 --repeat 3 --json
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_data365 import synthetic_tweet
+from src.utils.data_processor import create_tweet_dataframe, select_columns, clean_dataframe
+from src.utils.output import append_frame
+
+def make_tweets(count: int, posts_per_day: int = 2000, seed: int = 0):
+    """Return `count` synthetic raw tweets, newest day first."""
+    end = date(2024, 11, 22)
+    return [
+        synthetic_tweet('#COP29', end - timedelta(days=i // posts_per_day), i % posts_per_day, posts_per_day, seed)
+        for i in range(count)
+    ]
+
+def edge_tweets(template: dict):
+    """Records whose created_time or list fields the old writer passed through as they were."""
+    created_times = ['2024-11-22T10:00:00.123Z', '2024-11-22T10:00:05+01:00', '2024-11-22T10:00:07-05:30',
+                     'not a date', None]
+    tweets = [dict(template, created_time=created_time) for created_time in created_times]
+    for field in ('text_tags', 'text_tagged_users', 'attached_links_expanded_url'):
+        tweets.append({key: value for key, value in template.items() if key != field})
+    tweets.append(dict(template, text_tags=None, text='quoted "[tag]"'))
+    return tweets
+
+def legacy_create(tweets):
+    """The list-comprehension create_tweet_dataframe that the columnar builder replaced."""
+    return pd.DataFrame({
+        'tweet_id': [tweet['id'] for tweet in tweets],
+        'author_username': [tweet['author_username'] for tweet in tweets],
+        'created_time': [tweet['created_time'] for tweet in tweets],
+        'text': [tweet['text'] for tweet in tweets],
+        'text_lang': [tweet['text_lang'] for tweet in tweets],
+        'post_type': [tweet['post_type'] for tweet in tweets],
+        'favorite_count': [tweet['favorite_count'] for tweet in tweets],
+        'reply_count': [tweet['reply_count'] for tweet in tweets],
+        'retweet_count': [tweet['retweet_count'] for tweet in tweets],
+        'view_count': [tweet['view_count'] for tweet in tweets],
+        'source': [tweet['source'] for tweet in tweets],
+        'text_tags': [tweet.get('text_tags', []) for tweet in tweets],
+        'text_tagged_users': [tweet.get('text_tagged_users', []) for tweet in tweets],
+        'attached_links': [tweet.get('attached_links_expanded_url', []) for tweet in tweets]
+    })
+
+def check_csv(tweets) -> None:
+    """Fail unless the CSV output is byte for byte what the old writer produced."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'new.csv')
+        append_frame(path, clean_dataframe(select_columns(create_tweet_dataframe(tweets, parse_dates=False))), 'csv')
+        with open(path, 'rb') as f:
+            written = f.read()
+    expected = legacy_clean(select_columns(legacy_create(tweets))).to_csv(index=False).encode('utf-8')
+    if written != expected:
+        raise AssertionError("The CSV output no longer matches the old writer's")
+
+def legacy_clean(df):
+    """The per-cell regex clean_dataframe that the vectorized one replaced."""
+    def clean_string(value):
+        if isinstance(value, str):
+            for char in ('"', r'\[', r'\]'):
+                value = re.sub(char, '', value)
+        return value
+
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]) or isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].apply(clean_string)
+        elif df[col].dtype == object:
+            df[col] = df[col].apply(lambda lst: [clean_string(item) for item in lst] if isinstance(lst, list) else lst)
+    return df
+
+def _best_of(repeat: int, func, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(tweets: int, repeat: int) -> dict:
+    """Time every stage on `tweets` synthetic tweets, keeping the best of `repeat` runs."""
+    records = make_tweets(tweets)
+    check_csv(records + edge_tweets(records[0]))
+
+    create_s, df = _best_of(repeat, create_tweet_dataframe, records)
+    memory = int(df.memory_usage(deep=True).sum())
+    legacy_create_s, legacy_df = _best_of(repeat, legacy_create, records)
+    legacy_memory = int(legacy_df.memory_usage(deep=True).sum())
+    select_s, selected = _best_of(repeat, select_columns, df)
+    clean_s, cleaned = _best_of(repeat, lambda frame: clean_dataframe(frame.copy()), selected)
+    legacy_s, legacy = _best_of(repeat, lambda frame: legacy_clean(frame.copy()), selected)
+    if not cleaned.astype(object).equals(legacy.astype(object)):
+        raise AssertionError("clean_dataframe no longer matches the per-cell implementation")
+
+    return {
+        'tweets': tweets,
+        'create_s': round(create_s, 4),
+        'select_s': round(select_s, 4),
+        'clean_s': round(clean_s, 4),
+        'total_s': round(create_s + select_s + clean_s, 4),
+        'create_legacy_s': round(legacy_create_s, 4),
+        'create_speedup': round(legacy_create_s / create_s, 1),
+        'clean_legacy_s': round(legacy_s, 4),
+        'clean_speedup': round(legacy_s / clean_s, 1),
+        'tweets_per_s': round(tweets / (create_s + select_s + clean_s)),
+        'memory_mb': round(memory / 2 ** 20, 2),
+        'memory_legacy_mb': round(legacy_memory / 2 ** 20, 2),
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()}
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the tweet DataFrame pipeline.")
+    parser.add_argument('--tweets', type=int, default=10000, help="Number of synthetic tweets")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage; the best time is kept")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.disable(logging.INFO)
+    report = run(args.tweets, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['tweets']:,} tweets ({report['tweets_per_s']:,} tweets/s)")
+    for stage in ('create', 'select', 'clean', 'total'):
+        print(f"  {stage:<8} {report[f'{stage}_s']:>9.4f} s")
+    print(f"  create (list comprehensions) {report['create_legacy_s']:.4f} s, {report['create_speedup']}x slower")
+    print(f"  clean (per-cell regex) {report['clean_legacy_s']:.4f} s, {report['clean_speedup']}x slower")
+    print(f"  memory   {report['memory_mb']:>9.2f} MB (list comprehensions: {report['memory_legacy_mb']:.2f} MB)")
+
+if __name__ == "__main__":
+    main()
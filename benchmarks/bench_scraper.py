@@ -0,0 +1,166 @@
+"""
+Offline throughput benchmark for TwitterSearchAPI.
+
+Starts the fake Data365 server (benchmarks/fake_data365.py) in a child
+process, runs the collector against it in a scratch directory and reports
+tweets/sec, requests/sec and the collector's peak RSS:
+
+    python benchmarks/bench_scraper.py --keywords 8 --days 10 --latency 0.02
+    python benchmarks/bench_scraper.py --mode async --concurrency 8 --json
+
+The fake reports tasks as finished on the first status check unless
+--task-delay is set, in which case the collector's INITIAL_WAIT backoff
+applies as it would against the real API.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
+
+from benchmarks.fake_data365 import FakeConfig, FakeData365Server
+
+def _serve(config: FakeConfig, ready: multiprocessing.Queue, stats: multiprocessing.Queue,
+           stop: multiprocessing.Event):
+    server = FakeData365Server(('127.0.0.1', 0), config)
+    server.start()
+    ready.put(server.base_url)
+    stop.wait()
+    server.shutdown()
+    server.server_close()
+    stats.put(server.stats)
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the collector against a local fake Data365 server.")
+    parser.add_argument('--mode', choices=['sync', 'async', 'submit'], default='sync',
+                        help="process_keywords, process_keywords_async or process_keywords_submitted")
+    parser.add_argument('--keywords', type=int, default=4, help="Number of synthetic keywords")
+    parser.add_argument('--days', type=int, default=7, help="Length of the single date range")
+    parser.add_argument('--posts-per-day', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Server latency per response, in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--task-delay', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.2)
+    parser.add_argument('--no-gzip', action='store_true')
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrency for async and submit modes")
+    parser.add_argument('--rps', type=float, default=1000.0,
+                        help="Collector request budget; high by default so the server is the bottleneck")
+    parser.add_argument('--shard-days', type=int, default=0)
+    parser.add_argument('--buffered', action='store_true')
+    parser.add_argument('--dedupe', action='store_true')
+    parser.add_argument('--output-format', choices=['csv', 'parquet', 'arrow'], default='csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--verbose', action='store_true', help="Keep the collector's INFO logging")
+    return parser.parse_args()
+
+def run(args) -> dict:
+    """Run one benchmark and return its report."""
+    config = FakeConfig(
+        latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+        posts_per_day=args.posts_per_day, task_delay=args.task_delay,
+        failure_rate=args.failure_rate, throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after, compress=not args.no_gzip, seed=args.seed
+    )
+
+    ready, stats, stop = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Event()
+    server = multiprocessing.Process(target=_serve, args=(config, ready, stats, stop), daemon=True)
+    server.start()
+    base_url = ready.get(timeout=30)
+
+    os.environ.setdefault('access_token', 'benchmark')
+    workdir = tempfile.mkdtemp(prefix='bench_scraper_')
+    os.chdir(workdir)
+
+    from config.settings import DateRange
+    from twitter_scraper import TwitterSearchAPI
+
+    end = date(2024, 11, 22)
+    date_ranges = [DateRange('BENCH', (end - timedelta(days=args.days - 1)).isoformat(), end.isoformat())]
+    keywords = [f"#bench{i}" for i in range(args.keywords)]
+
+    api = TwitterSearchAPI(
+        pool_size=max(10, args.concurrency * 2), stream_results=not args.buffered,
+        deduplicate=args.dedupe, requests_per_second=args.rps, shard_days=args.shard_days,
+        output_format=args.output_format
+    )
+    api.base_url = base_url
+
+    # Sharding only runs on the async path, as in twitter_main
+    mode = 'async' if args.mode == 'sync' and args.shard_days else args.mode
+
+    start = time.perf_counter()
+    try:
+        if mode == 'submit':
+            asyncio.run(api.process_keywords_submitted(keywords, date_ranges, concurrency=args.concurrency))
+        elif mode == 'async':
+            asyncio.run(api.process_keywords_async(keywords, date_ranges, concurrency=args.concurrency))
+        else:
+            api.process_keywords(keywords, date_ranges)
+        elapsed = time.perf_counter() - start
+        transport = api.transport.get_stats()
+    finally:
+        api.close()
+        stop.set()
+
+    server_stats = stats.get(timeout=30)
+    server.join(timeout=30)
+
+    tweets = sum(entry['tweet_count'] for entry in api.metrics)
+    return {
+        'mode': mode,
+        'keywords': args.keywords,
+        'days': args.days,
+        'concurrency': args.concurrency if mode != 'sync' else 1,
+        'elapsed_s': round(elapsed, 3),
+        'tweets': tweets,
+        'tweets_per_s': round(tweets / elapsed, 1) if elapsed else None,
+        'requests': transport['requests'],
+        'requests_per_s': round(transport['requests'] / elapsed, 1) if elapsed else None,
+        'retries': transport['retries'],
+        'bytes_received': transport['bytes_received'],
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'server': server_stats,
+        'output_dir': workdir
+    }
+
+def main():
+    args = parse_args()
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    report = run(args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"mode={report['mode']} keywords={report['keywords']} days={report['days']} "
+          f"concurrency={report['concurrency']}")
+    print(f"  elapsed      {report['elapsed_s']:>10.3f} s")
+    print(f"  tweets       {report['tweets']:>10,}  ({report['tweets_per_s']:,} /s)")
+    print(f"  requests     {report['requests']:>10,}  ({report['requests_per_s']:,} /s, "
+          f"{report['retries']} retries)")
+    print(f"  bytes        {report['bytes_received']:>10,}")
+    print(f"  peak RSS     {report['peak_rss_mb']:>10.1f} MB")
+    print(f"  output       {report['output_dir']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Local stand-in for the Data365 Twitter endpoints used by TwitterSearchAPI.
+
+Implements task creation and status (`/post/update`) and cursor pagination
+(`/post/posts`) over a deterministic synthetic corpus, with configurable
+latency, page size, failure and throttling rates. Run it standalone with
+
+    python benchmarks/fake_data365.py --port 8365 --latency 0.05
+
+and point the collector at http://127.0.0.1:8365/v1.1/twitter/search.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+API_PREFIX = "/v1.1/twitter/search"
+
+LANGUAGES = ['en', 'en', 'en', 'fr', 'es', 'pt', 'de', 'ar']
+POST_TYPES = ['post', 'post', 'reply', 'quote']
+SOURCES = ['Twitter for iPhone', 'Twitter for Android', 'Twitter Web App']
+WORDS = (
+    "climate finance cop29 baku emissions adaptation loss damage fossil fuels "
+    "renewable energy youth justice biodiversity pledge methane carbon market "
+    "net zero transition deal negotiators summit action policy warming"
+).split()
+
+@dataclass
+class FakeConfig:
+    """Behaviour of the fake server."""
+    latency: float = 0.0          # Seconds added to every response
+    jitter: float = 0.0           # Extra uniform random latency, in seconds
+    page_size: int = 100          # Largest page served, whatever max_page_size asks for
+    posts_per_day: int = 200      # Synthetic tweets per keyword per day
+    max_posts: int = 10000        # Cap applied per search task, like the real API
+    task_delay: float = 0.0       # Seconds before a created task reports `finished`
+    failure_rate: float = 0.0     # Probability of a 503 response
+    throttle_rate: float = 0.0    # Probability of a 429 response
+    retry_after: float = 1.0      # Retry-After sent with 429 responses
+    compress: bool = True         # gzip responses when the client accepts it
+    seed: int = 0
+
+def _task_key(params: Dict[str, str]) -> Tuple[str, str, str]:
+    return params.get('keywords', ''), params.get('from_date', ''), params.get('to_date', '')
+
+def _stable_int(*parts: Any) -> int:
+    digest = hashlib.blake2b('|'.join(map(str, parts)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def synthetic_tweet(keyword: str, day: date, index: int, posts_per_day: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Build one deterministic tweet for a keyword and day.
+
+    Args:
+        keyword: Search keyword the tweet matches
+        day: Day the tweet was posted
+        index: Position of the tweet within the day (0 is the earliest)
+        posts_per_day: Tweets generated per keyword per day
+        seed: Corpus seed
+
+    Returns:
+        Dict[str, Any]: Tweet in the shape returned by /post/posts
+    """
+    h = _stable_int(seed, keyword, day.isoformat(), index)
+    rng = random.Random(h)
+    seconds = index * 86400 // max(1, posts_per_day)
+    words = rng.sample(WORDS, 12)
+    tags = rng.sample(WORDS, rng.randint(0, 3))
+
+    return {
+        # Time-ordered like real snowflake IDs
+        'id': str(((day.toordinal() * 86400 + seconds) * 1000) + h % 1000),
+        'author_username': f"user_{h % 5000}",
+        'created_time': f"{day.isoformat()}T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+        'text': f"{keyword} " + ' '.join(words) + (' "quoted" [link]' if h % 7 == 0 else ''),
+        'text_lang': LANGUAGES[h % len(LANGUAGES)],
+        'post_type': POST_TYPES[(h >> 8) % len(POST_TYPES)],
+        'favorite_count': rng.randint(0, 5000),
+        'reply_count': rng.randint(0, 300),
+        'retweet_count': rng.randint(0, 1000),
+        'view_count': rng.randint(0, 100000),
+        'source': SOURCES[(h >> 16) % len(SOURCES)],
+        'text_tags': tags,
+        'text_tagged_users': [f"user_{(h >> s) % 5000}" for s in range(0, 8 * rng.randint(0, 2), 8)],
+        'attached_links_expanded_url': []
+    }
+
+class SyntheticCorpus:
+    """Deterministic tweets for any keyword and date window, newest first."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+
+    def count(self, keyword: str, from_date: str, to_date: str) -> int:
+        """Number of tweets a search task over the window returns."""
+        days = (date.fromisoformat(to_date) - date.fromisoformat(from_date)).days + 1
+        return min(self.config.max_posts, max(0, days) * self.config.posts_per_day)
+
+    def page(self, keyword: str, from_date: str, to_date: str, offset: int, size: int) -> List[Dict[str, Any]]:
+        """Return `size` tweets starting at `offset` in date_desc order."""
+        end = date.fromisoformat(to_date)
+        per_day = self.config.posts_per_day
+        stop = min(offset + size, self.count(keyword, from_date, to_date))
+
+        items = []
+        for position in range(offset, stop):
+            day = end - timedelta(days=position // per_day)
+            index = per_day - 1 - position % per_day
+            items.append(synthetic_tweet(keyword, day, index, per_day, self.config.seed))
+        return items
+
+class FakeData365Server(ThreadingHTTPServer):
+    """Threaded HTTP server holding the fake's configuration, tasks and counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: Optional[FakeConfig] = None):
+        super().__init__(address, FakeData365Handler)
+        self.config = config or FakeConfig()
+        self.corpus = SyntheticCorpus(self.config)
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.tasks: Dict[Tuple[str, str, str], float] = {}
+        self.stats = {'requests': 0, 'throttled': 0, 'failed': 0, 'items_served': 0, 'bytes_sent': 0}
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use in place of settings.BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def roll(self) -> Optional[int]:
+        """Pick an injected error status for the next response, if any."""
+        with self.lock:
+            self.stats['requests'] += 1
+            draw = self.rng.random()
+            if draw < self.config.throttle_rate:
+                self.stats['throttled'] += 1
+                return 429
+            if draw < self.config.throttle_rate + self.config.failure_rate:
+                self.stats['failed'] += 1
+                return 503
+        return None
+
+    def start(self) -> threading.Thread:
+        """Serve in a background daemon thread."""
+        thread = threading.Thread(target=self.serve_forever, name='fake-data365', daemon=True)
+        thread.start()
+        return thread
+
+class FakeData365Handler(BaseHTTPRequestHandler):
+    """Request handler for the fake Data365 endpoints."""
+
+    protocol_version = 'HTTP/1.1'
+    server: FakeData365Server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self) -> Tuple[str, Dict[str, str]]:
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        return parts.path, params
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        compressed = self.server.config.compress and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compressed:
+            body = gzip.compress(body, compresslevel=5)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+        with self.server.lock:
+            self.server.stats['bytes_sent'] += len(body)
+
+    def _handle(self, method: str):
+        config = self.server.config
+        # Drain any request body so the keep-alive connection stays usable
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        path, params = self._params()
+        if not path.startswith(API_PREFIX):
+            self._send_json(404, {'error': {'message': f"Unknown path {path}"}})
+            return
+        if not params.get('access_token'):
+            self._send_json(401, {'error': {'message': "access_token is required"}})
+            return
+
+        injected = self.server.roll()
+        if injected == 429:
+            self._send_json(429, {'error': {'message': "Too many requests"}},
+                            {'Retry-After': f"{config.retry_after:g}"})
+            return
+        if injected is not None:
+            self._send_json(injected, {'error': {'message': "Service unavailable"}})
+            return
+
+        endpoint = path[len(API_PREFIX):]
+        if endpoint == '/post/update':
+            self._task(method, params)
+        elif endpoint == '/post/posts' and method == 'GET':
+            self._posts(params)
+        else:
+            self._send_json(404, {'error': {'message': f"Unknown endpoint {method} {endpoint}"}})
+
+    def _task(self, method: str, params: Dict[str, str]):
+        key = _task_key(params)
+        with self.server.lock:
+            if method == 'POST':
+                self.server.tasks[key] = time.monotonic() + self.server.config.task_delay
+                ready_at = None
+            else:
+                ready_at = self.server.tasks.get(key)
+
+        if method == 'POST':
+            status = 'pending'
+        elif ready_at is None:
+            status = 'failed'
+        else:
+            status = 'finished' if time.monotonic() >= ready_at else 'pending'
+
+        self._send_json(200, {'data': {'status': status}, 'status': 'ok'})
+
+    def _posts(self, params: Dict[str, str]):
+        keyword, from_date, to_date = _task_key(params)
+        try:
+            offset = int(params.get('cursor') or 0)
+            size = min(self.server.config.page_size, int(params.get('max_page_size', 100)))
+            total = self.server.corpus.count(keyword, from_date, to_date)
+        except ValueError as e:
+            self._send_json(400, {'error': {'message': str(e)}})
+            return
+
+        items = self.server.corpus.page(keyword, from_date, to_date, offset, size)
+        has_next_page = offset + len(items) < total
+        with self.server.lock:
+            self.server.stats['items_served'] += len(items)
+
+        self._send_json(200, {
+            'data': {
+                'items': items,
+                'page_info': {
+                    'has_next_page': has_next_page,
+                    'cursor': str(offset + len(items)) if has_next_page else None
+                }
+            },
+            'status': 'ok'
+        })
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+def parse_args():
+    """Parse command line arguments."""
+    defaults = FakeConfig()
+    parser = argparse.ArgumentParser(description="Serve a local fake of the Data365 Twitter API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8365)
+    parser.add_argument('--latency', type=float, default=defaults.latency, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=defaults.jitter, help="Extra random latency in seconds")
+    parser.add_argument('--page-size', type=int, default=defaults.page_size, help="Largest page served")
+    parser.add_argument('--posts-per-day', type=int, default=defaults.posts_per_day)
+    parser.add_argument('--max-posts', type=int, default=defaults.max_posts, help="Post cap per search task")
+    parser.add_argument('--task-delay', type=float, default=defaults.task_delay,
+                        help="Seconds before a created task reports finished")
+    parser.add_argument('--failure-rate', type=float, default=defaults.failure_rate, help="Share of 503 responses")
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate, help="Share of 429 responses")
+    parser.add_argument('--retry-after', type=float, default=defaults.retry_after)
+    parser.add_argument('--no-gzip', action='store_true', help="Never compress responses")
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    return parser.parse_args()
+
+def config_from_args(args) -> FakeConfig:
+    """Build a FakeConfig from parsed command line arguments."""
+    return FakeConfig(
+        latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+        posts_per_day=args.posts_per_day, max_posts=args.max_posts, task_delay=args.task_delay,
+        failure_rate=args.failure_rate, throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after, compress=not args.no_gzip, seed=args.seed
+    )
+
+def main():
+    args = parse_args()
+    server = FakeData365Server((args.host, args.port), config_from_args(args))
+    print(f"Serving fake Data365 API at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+if __name__ == "__main__":
+    main()
@@ -24,22 +24,34 @@ from wordcloud import WordCloud, STOPWORDS
 import nltk
 from nltk import word_tokenize
 from nltk.corpus import stopwords
+import os
 import re
+import argparse
+import json
 import warnings
 import calendar
 from datetime import datetime
 from scipy import stats
 
 # Text analysis and machine learning libraries
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
 
 # Time series analysis
 from statsmodels.tsa.seasonal import seasonal_decompose
 
+# Cached, dependency-aware stage runner and figure export
+from src.utils.logger import flush_logging
+from src.utils.pipeline import Pipeline
+from src.utils.snapshot import read_typed_csv
+from src.utils.figures import FigureRenderer
+from src.utils.output import parse_list_cells
+from src.utils.pseudonymize import Pseudonymizer, load_key
+from src.utils.near_duplicates import near_duplicate_groups, collapse_duplicates, duplicate_weights
+from src.utils.ngrams import count_ngrams, count_words
+from src.utils.cluster_selection import select_k, stratified_sample
+
 # --- Visualization and Display Setup --------------------------------------------
 # Set display options
 pd.set_option('display.max_rows', None)
@@ -65,9 +77,32 @@ sns.set_style('whitegrid', {'grid.linestyle': '--', 'grid.alpha': 0.6})
 # Ignore warnings for cleaner output
 warnings.filterwarnings('ignore')
 
-# Download required NLTK resources
-nltk.download('punkt_tab', quiet=True)
-nltk.download('stopwords', quiet=True)
+# --- Figures --------------------------------------------------------------------
+# Every figure is drawn by a draw_* function from the data it is given, and
+# handed to the renderer rather than shown directly: inline it is drawn and
+# shown, in export mode it is rendered headless in a worker process and
+# written to visuals/ unless its data is unchanged since the last export
+figures = FigureRenderer()
+
+def draw_heatmap(data, title, xlabel, ylabel, figsize=(12, 8), tight=False, title_size=None, label_size=None,
+                 **heatmap_kwargs):
+    """Draw a heatmap of a table"""
+    plt.figure(figsize=figsize)
+    sns.heatmap(data, **heatmap_kwargs)
+    plt.title(title, fontweight='bold', **({'fontsize': title_size} if title_size else {}))
+    plt.xlabel(xlabel, **({'fontsize': label_size} if label_size else {}))
+    plt.ylabel(ylabel, **({'fontsize': label_size} if label_size else {}))
+    if tight:
+        plt.tight_layout()
+
+def draw_ranking(labels, values, title, xlabel, ylabel, figsize=(12, 8)):
+    """Draw a horizontal bar chart of ranked counts"""
+    plt.figure(figsize=figsize)
+    sns.barplot(y=labels, x=values, palette='viridis')
+    plt.title(title, fontweight='bold')
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.tight_layout()
 
 # --- Helper Functions ----------------------------------------------------------
 def format_plot(ax, title, xlabel=None, ylabel=None, legend_title=None,
@@ -93,53 +128,44 @@ def format_plot(ax, title, xlabel=None, ylabel=None, legend_title=None,
 
     return ax
 
-def generate_wordcloud(text_series, title="Word Cloud of Tweets", max_words=200):
-    """Generate and display a word cloud from a series of texts"""
-    # Combine all text
-    text = " ".join(text_series)
-    word_count = len(text.split())
-    print(f"There are {word_count:,} words in the combined texts.")
-
-    # Define stopwords
-    stop_words = set(STOPWORDS)
-    stop_words.update(['https', 'co', 'etc', 'rt', 'amp', 'the', 'and', 'to', 'of', 'a', 'in', 'is', 'for', 'that', 'on'])
+# Words left out of the word clouds
+WORDCLOUD_STOPWORDS = set(STOPWORDS) | {'https', 'co', 'etc', 'rt', 'amp', 'the', 'and', 'to', 'of', 'a', 'in',
+                                        'is', 'for', 'that', 'on'}
 
-    # Generate wordcloud
+def draw_wordcloud(frequencies, title, max_words, preview=False):
+    """Lay out and draw a word cloud from word frequencies"""
+    # Previews lay out a quarter of the pixels, which is several times faster
+    width, height, figsize = (800, 400, (8, 5)) if preview else (1600, 800, (16, 10))
     wordcloud = WordCloud(
-        stopwords=stop_words,
-        max_font_size=100,
+        max_font_size=100 if not preview else 50,
         random_state=42,
-        width=1600,
-        height=800,
-        min_font_size=6,
+        width=width,
+        height=height,
+        min_font_size=6 if not preview else 4,
         max_words=max_words,
         background_color='white',
         colormap='viridis'
-    ).generate(text)
+    ).generate_from_frequencies(frequencies)
 
     # Display the wordcloud
-    plt.figure(figsize=(16, 10))
+    plt.figure(figsize=figsize)
     plt.imshow(wordcloud, interpolation='bilinear')
     plt.axis("off")
     plt.title(title, fontsize=16, pad=20)
     plt.tight_layout()
-    plt.show()
 
-    return wordcloud
-
-def analyze_engagement(df, metric, title_prefix=""):
-    """Analyze and visualize an engagement metric"""
-    print(f"\n{title_prefix} {metric.replace('_', ' ').title()} Statistics:")
-    print(f"- Highest: {df[metric].max():,.0f}")
-    print(f"- Lowest: {df[metric].min():,.0f}")
-    print(f"- Average: {df[metric].mean():,.1f}")
-    print(f"- Median: {df[metric].median():,.1f}")
+def generate_wordcloud(counter, name, column='overall', group=None, title="Word Cloud of Tweets", max_words=200,
+                       preview=False):
+    """Display a word cloud of one group of a filled WordCounter"""
+    print(f"{title}: {counter.total(column, group):,.0f} words")
 
-    # Get top 10 entries
-    top_10 = df.sort_values(by=metric, ascending=False).head(10).copy()
-    top_10['rank'] = [f"Top {i+1}" for i in range(len(top_10))]
+    # Only the words that can appear are sent to the renderer; the layout
+    # is the slow part, so it runs with the drawing
+    frequencies = counter.frequencies(column, group, stop_words=WORDCLOUD_STOPWORDS, max_words=max_words)
+    figures.show(name, draw_wordcloud, frequencies, title, max_words, preview=preview)
 
-    # Create a plot
+def draw_top_engagement(top_10, metric):
+    """Draw the top 10 tweets by an engagement metric"""
     fig, ax = plt.subplots(figsize=(12, 7))
     sns.barplot(x='rank', y=metric, data=top_10, palette='plasma', ax=ax)
 
@@ -153,7 +179,21 @@ def analyze_engagement(df, metric, title_prefix=""):
     plt.ylabel(f'{metric.replace("_", " ").title()}')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+
+def analyze_engagement(df, metric, title_prefix=""):
+    """Analyze and visualize an engagement metric"""
+    print(f"\n{title_prefix} {metric.replace('_', ' ').title()} Statistics:")
+    print(f"- Highest: {df[metric].max():,.0f}")
+    print(f"- Lowest: {df[metric].min():,.0f}")
+    print(f"- Average: {df[metric].mean():,.1f}")
+    print(f"- Median: {df[metric].median():,.1f}")
+
+    # Get top 10 entries
+    top_10 = df.sort_values(by=metric, ascending=False).head(10).copy()
+    top_10['rank'] = [f"Top {i+1}" for i in range(len(top_10))]
+
+    # Create a plot
+    figures.show(f"engagement_top_{metric}", draw_top_engagement, top_10[['rank', metric]], metric)
 
     # Show top example with sentiment
     top_example = top_10.iloc[0]
@@ -165,32 +205,19 @@ def analyze_engagement(df, metric, title_prefix=""):
 
     return top_10
 
-def generate_ngrams(text_series, n=2, top_n=20):
-    """Generate and visualize top n-grams"""
-    # Join all text
-    text = ' '.join(text_series)
-
-    # Create n-gram vectorizer
-    vectorizer = CountVectorizer(ngram_range=(n, n), stop_words='english')
-    ngram_counts = vectorizer.fit_transform([text])
-
-    # Get top n-grams
-    ngrams = vectorizer.get_feature_names_out()
-    count_values = ngram_counts.toarray().sum(axis=0)
-
-    # Create DataFrame with n-grams and counts
-    ngram_df = pd.DataFrame({'ngram': ngrams, 'count': count_values})
-    ngram_df = ngram_df.sort_values('count', ascending=False).head(top_n)
-
-    # Visualize
+def draw_ngrams(ngram_df, n, top_n):
+    """Draw the most common n-grams"""
     plt.figure(figsize=(12, 6))
     sns.barplot(y='ngram', x='count', data=ngram_df, palette='viridis')
     plt.title(f'Top {top_n} {n}-grams in COP Tweets', fontweight='bold')
     plt.xlabel('Count')
     plt.ylabel(f'{n}-gram')
     plt.tight_layout()
-    plt.show()
 
+def generate_ngrams(counter, n=2, top_n=20):
+    """Visualize the top n-grams of all tweets from a filled NgramCounter"""
+    ngram_df = counter.top(n, top_n)
+    figures.show(f"text_{n}grams", draw_ngrams, ngram_df, n, top_n)
     return ngram_df
 
 def get_top_terms_per_cluster(kmeans, tfidf_vectorizer, n_terms=10):
@@ -208,11 +235,8 @@ def get_top_terms_per_cluster(kmeans, tfidf_vectorizer, n_terms=10):
 
     return top_terms
 
-def plot_enhanced_correlation(df, metrics, title="Enhanced Correlation Analysis"):
-    """
-    Creates an enhanced correlation matrix visualization with additional statistics
-    """
-    # Calculate correlation matrix
+def draw_enhanced_correlation(df, metrics, title):
+    """Draw the correlation matrix, distributions and summary statistics of some metrics"""
     corr_matrix = df[metrics].corr()
 
     # Create a figure with gridspec for custom layout
@@ -301,7 +325,15 @@ def plot_enhanced_correlation(df, metrics, title="Enhanced Correlation Analysis"
     plt.suptitle(title, fontsize=16, fontweight='bold', y=0.98)
     plt.tight_layout()
     plt.subplots_adjust(top=0.9)
-    plt.show()
+
+def plot_enhanced_correlation(df, metrics, title="Enhanced Correlation Analysis"):
+    """
+    Creates an enhanced correlation matrix visualization with additional statistics
+    """
+    # Calculate correlation matrix
+    corr_matrix = df[metrics].corr()
+
+    figures.show("correlation_matrix", draw_enhanced_correlation, df[metrics], metrics, title)
 
     # Print additional statistical insights
     print("\nStatistical Insights:")
@@ -337,246 +369,375 @@ def create_aspect_sentiment_heatmap(df):
         aspect_sentiment = aspect_sentiment.drop('positivity_score', axis=1)
 
     # Create heatmap
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(aspect_sentiment, annot=True, fmt='.1f', cmap='RdYlGn')
-    plt.title('Sentiment Distribution Across Aspects (%)', fontweight='bold', fontsize=14)
-    plt.xlabel('Sentiment', fontsize=12)
-    plt.ylabel('Aspect', fontsize=12)
-    plt.tight_layout()
-    plt.show()
+    figures.show("aspects_sentiment_heatmap", draw_heatmap, aspect_sentiment,
+                 'Sentiment Distribution Across Aspects (%)', 'Sentiment', 'Aspect',
+                 figsize=(12, 10), tight=True, title_size=14, label_size=12,
+                 annot=True, fmt='.1f', cmap='RdYlGn')
 
     return aspect_sentiment
 
-# --- Data Loading and Initial Processing -----------------------------------------
-print("=" * 80)
-print("COP TWITTER ANALYSIS".center(80))
-print("=" * 80)
-print("\nLoading and preprocessing data...")
-
-# Load data
-df = pd.read_csv('analysis_results_with_sentiments-3.csv')
-
-# Display basic information in a structured format
-print("\n" + "=" * 50)
-print("DATASET OVERVIEW")
-print("=" * 50)
-print(f"Total tweets: {df.shape[0]:,}")
-print(f"Total features: {df.shape[1]:,}")
-
-# Check for missing values
-missing_data = df.isnull().sum()
-missing_percent = (missing_data / len(df)) * 100
-missing_summary = pd.DataFrame({
-    'Missing Values': missing_data,
-    'Percentage': missing_percent
-})
-if missing_summary['Missing Values'].sum() > 0:
-    print("\nMissing Value Analysis:")
-    print(missing_summary[missing_summary['Missing Values'] > 0].sort_values('Missing Values', ascending=False))
-else:
-    print("\nNo missing values found in the dataset.")
-
-# --- Data Cleaning and Feature Engineering ---------------------------------------
-print("\nCleaning data and creating features...")
+# --- Analysis Stages -----------------------------------------------------------
+# Each section of the analysis is a pipeline stage with declared inputs and
+# outputs. Stage outputs are cached on disk under a hash of the stage's code,
+# parameters and inputs, so re-running one stage (say, clustering with new
+# parameters) reuses the cached upstream data instead of reloading the CSV
+# and redrawing every plot.
+ANALYSIS_CACHE_DIR = '.analysis_cache'
+VISUALS_DIR = 'visuals'
+# Secret key of the user pseudonyms; created on first run. Share it to get
+# the same IDs across machines, keep it out of version control
+PSEUDONYM_KEY_FILE = 'pseudonym.key'
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+ENGAGEMENT_METRICS = ['retweet_count', 'favorite_count', 'reply_count', 'view_count']
+
+# Columns the analysis reads, with their types; any other column is skipped.
+# Counts are read as floats and become integers when none is missing
+ANALYSIS_DTYPES = {
+    'created_time': 'str',
+    'author_username': 'str',
+    'cleaned_text': 'str',
+    'sentiment': 'category',
+    'aspect': 'category',
+    'text_lang': 'category',
+    'user_location': 'str',
+    'text_tagged_users': 'str',
+    **{metric: 'float64' for metric in ENGAGEMENT_METRICS}
+}
 
-# Convert datetime and create time-based features
-df['created_time'] = pd.to_datetime(df['created_time'])
-print(f"Time range: {df['created_time'].min()} to {df['created_time'].max()}")
+pipeline = Pipeline(ANALYSIS_CACHE_DIR)
 
-# Create time-based features for analysis
-df['date_'] = df['created_time'].dt.date
-df['year'] = df['created_time'].dt.year
-df['month'] = df['created_time'].dt.month
-df['day'] = df['created_time'].dt.day
-df['year/month'] = df['created_time'].dt.strftime('%Y-%m')
-df['day_of_week'] = df['created_time'].dt.day_name()
-df['hour_of_day'] = df['created_time'].dt.hour
+def print_section(title):
+    """Print a section banner, after the log lines still queued for the console"""
+    flush_logging()
+    print("\n" + "=" * 50)
+    print(title)
+    print("=" * 50)
 
-# Order days correctly for visualizations
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-df['day_of_week'] = pd.Categorical(df['day_of_week'], categories=day_order, ordered=True)
+def handle_duplicates(tweets, dup_group, mode, modes=('keep', 'collapse', 'weight')):
+    """Apply a stage's `duplicates` mode: the rows to analyse and their weights (None unless weighting)"""
+    if mode not in modes:
+        raise ValueError(f"duplicates must be one of {list(modes)}, not {mode!r}")
+    df = tweets.assign(dup_group=dup_group)
+    if mode == 'collapse':
+        df = collapse_duplicates(df)
+        print(f"Collapsed near-duplicates: analysing {len(df):,} of {len(tweets):,} tweets")
+        return df, None
+    if mode == 'weight':
+        return df, duplicate_weights(df)
+    return df, None
 
-# Anonymize usernames more efficiently
-if 'author_username' in df.columns:
-    # Convert categorical codes to a pandas Series before applying map
-    codes = pd.Categorical(df['author_username']).codes
-    df['author_username'] = pd.Series(codes).map(lambda x: f'author_{x+1}').values
+# --- Data Loading and Initial Processing -----------------------------------------
+@pipeline.stage('load', outputs=['raw'],
+                params={'path': 'analysis_results_with_sentiments-3.csv', 'snapshot': True}, files=['path'])
+def load_stage(path, snapshot):
+    """Load the labelled tweets and summarize missing values"""
+    print("\nLoading and preprocessing data...")
+
+    # Load the typed columns, from the binary snapshot while the CSV is unchanged
+    snapshot_path = None
+    if snapshot:
+        name = os.path.splitext(os.path.basename(path))[0]
+        snapshot_path = os.path.join(pipeline.cache_dir, 'snapshots', f"{name}.feather")
+    df = read_typed_csv(path, ANALYSIS_DTYPES, date_columns=['created_time'], snapshot_path=snapshot_path)
+
+    # Display basic information in a structured format
+    print_section("DATASET OVERVIEW")
+    print(f"Total tweets: {df.shape[0]:,}")
+    print(f"Total features: {df.shape[1]:,}")
+
+    # Check for missing values
+    missing_data = df.isnull().sum()
+    missing_percent = (missing_data / len(df)) * 100
+    missing_summary = pd.DataFrame({
+        'Missing Values': missing_data,
+        'Percentage': missing_percent
+    })
+    if missing_summary['Missing Values'].sum() > 0:
+        print("\nMissing Value Analysis:")
+        print(missing_summary[missing_summary['Missing Values'] > 0].sort_values('Missing Values', ascending=False))
+    else:
+        print("\nNo missing values found in the dataset.")
 
-# Fill any missing text values
-df['cleaned_text'] = df['cleaned_text'].astype(str).fillna('')
+    return {'raw': df}
 
-# Calculate word count more efficiently
-df['length_words'] = df['cleaned_text'].apply(lambda x: len(word_tokenize(x)))
+# --- Data Cleaning and Feature Engineering ---------------------------------------
+@pipeline.stage('features', inputs=['raw'], outputs=['tweets'],
+                params={'key_file': PSEUDONYM_KEY_FILE}, files=['key_file'])
+def features_stage(raw, key_file):
+    """Derive the time, length and sentiment features every later stage uses"""
+    print("\nCleaning data and creating features...")
+    df = raw.copy()
+
+    # created_time is already parsed by the loader
+    print(f"Time range: {df['created_time'].min()} to {df['created_time'].max()}")
+
+    # Create time-based features for analysis
+    df['date_'] = df['created_time'].dt.date
+    df['year'] = df['created_time'].dt.year
+    df['month'] = df['created_time'].dt.month
+    df['day'] = df['created_time'].dt.day
+    df['year/month'] = df['created_time'].dt.strftime('%Y-%m')
+    df['day_of_week'] = df['created_time'].dt.day_name()
+    df['hour_of_day'] = df['created_time'].dt.hour
+
+    # Order days correctly for visualizations
+    df['day_of_week'] = pd.Categorical(df['day_of_week'], categories=DAY_ORDER, ordered=True)
+
+    # Pseudonymize authors and tagged users with a keyed hash, so IDs are the
+    # same in every dataset and run and tagged users can be joined to authors
+    if 'text_tagged_users' in df.columns:
+        # Stored in the CSV as list literals
+        df['text_tagged_users'] = parse_list_cells(df['text_tagged_users'])
+    df = Pseudonymizer(load_key(key_file)).pseudonymize_frame(df)
+
+    # Fill any missing text values
+    df['cleaned_text'] = df['cleaned_text'].astype(str).fillna('')
+
+    # Calculate word count more efficiently
+    df['length_words'] = df['cleaned_text'].apply(lambda x: len(word_tokenize(x)))
+
+    # Check for exact duplicate tweets (near-duplicates are grouped by the duplicates stage)
+    duplicates = df.duplicated(subset=['cleaned_text']).sum()
+    print(f"Found {duplicates} duplicate tweets ({duplicates/len(df)*100:.1f}% of the dataset)")
+
+    # Convert sentiment to numeric for correlation analysis
+    sentiment_mapping = {'Negative': -1, 'Neutral': 0, 'Positive': 1}
+    df['sentiment_score'] = df['sentiment'].map(sentiment_mapping).astype('float64')
+
+    return {'tweets': df}
+
+# --- Near-Duplicate Detection --------------------------------------------------
+# Copy-pasted and retweet-style tweets share a `dup_group` (MinHash over word
+# shingles, LSH banding). The sentiment, text and clustering stages take a
+# `duplicates` parameter: 'keep' every tweet, 'collapse' each group to its
+# first tweet, or 'weight' each tweet by one over its group's size
+@pipeline.stage('duplicates', inputs=['tweets'], outputs=['dup_group'],
+                params={'threshold': 0.7, 'num_perm': 128, 'shingle_words': 2, 'seed': 42})
+def duplicates_stage(tweets, threshold, num_perm, shingle_words, seed):
+    """Group near-duplicate tweets"""
+    df = tweets
+    print_section("NEAR-DUPLICATE TWEETS")
+
+    dup_group = near_duplicate_groups(df['cleaned_text'], threshold=threshold, num_perm=num_perm,
+                                      shingle_words=shingle_words, seed=seed)
+
+    group_sizes = dup_group.value_counts()
+    repeated = group_sizes[group_sizes > 1]
+    print(f"Groups of near-duplicates (estimated Jaccard >= {threshold}): {len(repeated):,}")
+    print(f"Tweets in those groups: {repeated.sum():,} ({repeated.sum()/len(df)*100:.1f}% of the dataset)")
+    print(f"Distinct tweets after collapsing: {len(group_sizes):,}")
+
+    if len(repeated) > 0:
+        print("\nLargest groups:")
+        for group, size in repeated.head(5).items():
+            text = df['cleaned_text'].iloc[group]
+            print(f"- {size} tweets: {text[:100]}..." if len(text) > 100 else f"- {size} tweets: {text}")
+
+    return {'dup_group': dup_group}
 
-# Check for duplicate tweets
-duplicates = df.duplicated(subset=['cleaned_text']).sum()
-print(f"Found {duplicates} duplicate tweets ({duplicates/len(df)*100:.1f}% of the dataset)")
+# --- Sentiment Analysis ---------------------------------------------------------
+def draw_sentiment_distribution(sentiment_counts, total):
+    """Draw the number of tweets per sentiment"""
+    plt.figure(figsize=(10, 6))
+    ax = sns.barplot(x='sentiment', y='count', data=sentiment_counts, palette='Blues_r')
+    for p in ax.patches:
+        ax.annotate(f'{p.get_height():,.0f} ({p.get_height()/total*100:.1f}%)',
+                    (p.get_x() + p.get_width()/2., p.get_height() + 10),
+                    ha='center', va='bottom')
+    plt.title('Distribution of Sentiment', weight='bold')
+    plt.ylabel('Count', fontsize=10, weight='bold')
+    plt.xlabel('Sentiment', fontsize=10, weight='bold')
+
+def draw_length_distribution(lengths):
+    """Draw the tweet length distribution overall and by sentiment"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+
+    # Box plot
+    sns.boxplot(x=lengths['length_words'], ax=ax1, color='blue')
+    ax1.set_title('Distribution of Word Length (Box Plot)', weight='bold')
+    ax1.set_xlabel('Number of Words')
+
+    # Kernel density plot by sentiment
+    for sentiment in lengths['sentiment'].unique():
+        sns.kdeplot(lengths[lengths['sentiment'] == sentiment]['length_words'],
+                    ax=ax2,
+                    label=sentiment)
+    ax2.set_title("Word Length Distribution by Sentiment")
+    ax2.set_xlabel('Number of Words')
+    ax2.legend()
 
-# Convert sentiment to numeric for correlation analysis
-sentiment_mapping = {'Negative': -1, 'Neutral': 0, 'Positive': 1}
-df['sentiment_score'] = df['sentiment'].map(sentiment_mapping)
+    plt.tight_layout()
 
-# --- Sentiment Analysis ---------------------------------------------------------
-print("\n" + "=" * 50)
-print("SENTIMENT ANALYSIS")
-print("=" * 50)
-
-# Create a summary of sentiment distribution
-sentiment_counts = df['sentiment'].value_counts().reset_index()
-sentiment_counts.columns = ['sentiment', 'count']
-sentiment_percentage = df['sentiment'].value_counts(normalize=True) * 100
-
-print("Sentiment Distribution:")
-for sentiment, percentage in sentiment_percentage.items():
-    print(f"- {sentiment}: {percentage:.1f}%")
-
-# Visualize sentiment distribution
-plt.figure(figsize=(10, 6))
-ax = sns.barplot(x='sentiment', y='count', data=sentiment_counts, palette='Blues_r')
-for p in ax.patches:
-    ax.annotate(f'{p.get_height():,.0f} ({p.get_height()/df.shape[0]*100:.1f}%)',
-                (p.get_x() + p.get_width()/2., p.get_height() + 10),
-                ha='center', va='bottom')
-plt.title('Distribution of Sentiment', weight='bold')
-plt.ylabel('Count', fontsize=10, weight='bold')
-plt.xlabel('Sentiment', fontsize=10, weight='bold')
-plt.show()
+def draw_length_by_sentiment(lengths):
+    """Draw tweet length per sentiment"""
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(x='sentiment', y='length_words', data=lengths)
+    plt.title('Word Count by Sentiment', weight='bold')
+    plt.xlabel('Sentiment')
+    plt.ylabel('Number of Words')
+
+@pipeline.stage('sentiment', inputs=['tweets', 'dup_group'], outputs=['sentiment_counts', 'length_stats'],
+                params={'duplicates': 'keep'})
+def sentiment_stage(tweets, dup_group, duplicates):
+    """Sentiment distribution, and tweet length by sentiment"""
+    print_section("SENTIMENT ANALYSIS")
+    df, weights = handle_duplicates(tweets, dup_group, duplicates)
+
+    # Create a summary of sentiment distribution (weighted counts sum to the
+    # number of near-duplicate groups)
+    if weights is None:
+        weights = pd.Series(1.0, index=df.index)
+    sentiment_totals = weights.groupby(df['sentiment'], observed=True).sum().sort_values(ascending=False)
+    sentiment_counts = sentiment_totals.reset_index()
+    sentiment_counts.columns = ['sentiment', 'count']
+    sentiment_percentage = sentiment_totals / sentiment_totals.sum() * 100
+
+    print("Sentiment Distribution:")
+    for sentiment, percentage in sentiment_percentage.items():
+        print(f"- {sentiment}: {percentage:.1f}%")
+
+    # Visualize sentiment distribution
+    figures.show("sentiment_distribution", draw_sentiment_distribution, sentiment_counts, sentiment_totals.sum())
+
+    # --- Tweet Length Analysis ---
+    print_section("TWEET LENGTH ANALYSIS")
+
+    # Summarize tweet length statistics
+    length_stats = {
+        'Maximum': df['length_words'].max(),
+        'Minimum': df['length_words'].min(),
+        'Average': round(df['length_words'].mean(), 1),
+        'Median': df['length_words'].median(),
+        'Standard Deviation': round(df['length_words'].std(), 1)
+    }
+    print("Tweet Length Statistics:")
+    for stat, value in length_stats.items():
+        print(f"- {stat}: {value} words")
+
+    # Visualize tweet length distribution
+    lengths = df[['sentiment', 'length_words']]
+    figures.show("sentiment_length_distribution", draw_length_distribution, lengths)
+
+    # Words vs. sentiment relationship
+    figures.show("sentiment_length_boxplot", draw_length_by_sentiment, lengths)
+
+    return {'sentiment_counts': sentiment_counts, 'length_stats': length_stats}
 
 # --- Aspect-Based Analysis ------------------------------------------------------
-print("\n" + "=" * 50)
-print("ASPECT-BASED ANALYSIS")
-print("=" * 50)
-
-# Visualize aspects more efficiently
-aspect_counts = df['aspect'].value_counts()
-top_n_aspects = min(15, len(aspect_counts))
-print(f"Top {top_n_aspects} Aspects in the Dataset:")
-for aspect, count in aspect_counts.head(top_n_aspects).items():
-    print(f"- {aspect}: {count:,} tweets ({count/len(df)*100:.1f}%)")
-
-plt.figure(figsize=(10, 8))
-ax = sns.barplot(y=aspect_counts.index[:top_n_aspects], x=aspect_counts.values[:top_n_aspects], palette='Blues_r')
-for p in ax.patches:
-    ax.annotate(f'{p.get_width():,.0f}',
-                (p.get_width() + 0.1, p.get_y() + 0.5),
-                va='center')
-plt.title('Top Aspects Distribution', weight='bold')
-plt.xlabel('Count', fontsize=10, weight='bold')
-plt.ylabel('Aspect', fontsize=10, weight='bold')
-plt.tight_layout()
-plt.show()
-
-# Aspect with sentiment breakdown
-plt.figure(figsize=(12, 10))
-aspect_order = aspect_counts.index[:top_n_aspects]
-ax = sns.countplot(y='aspect', data=df[df['aspect'].isin(aspect_order)],
-                  hue='sentiment', palette='Blues_r', order=aspect_order)
-plt.title('Sentiment Distribution by Aspect', weight='bold')
-plt.ylabel('Aspect', fontsize=10, weight='bold')
-plt.xlabel('Count', fontsize=10, weight='bold')
-plt.legend(title='Sentiment')
-plt.tight_layout()
-plt.show()
-
-# Create aspect-sentiment heatmap
-aspect_sentiment_heatmap = create_aspect_sentiment_heatmap(df[df['aspect'].isin(aspect_order)])
-
-# --- Tweet Length Analysis ------------------------------------------------------
-print("\n" + "=" * 50)
-print("TWEET LENGTH ANALYSIS")
-print("=" * 50)
-
-# Summarize tweet length statistics
-length_stats = {
-    'Maximum': df['length_words'].max(),
-    'Minimum': df['length_words'].min(),
-    'Average': round(df['length_words'].mean(), 1),
-    'Median': df['length_words'].median(),
-    'Standard Deviation': round(df['length_words'].std(), 1)
-}
-print("Tweet Length Statistics:")
-for stat, value in length_stats.items():
-    print(f"- {stat}: {value} words")
-
-# Visualize tweet length distribution
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-
-# Box plot
-sns.boxplot(x=df['length_words'], ax=ax1, color='blue')
-ax1.set_title('Distribution of Word Length (Box Plot)', weight='bold')
-ax1.set_xlabel('Number of Words')
-
-# Kernel density plot by sentiment
-for sentiment in df['sentiment'].unique():
-    sns.kdeplot(df[df['sentiment'] == sentiment]['length_words'],
-                ax=ax2,
-                label=sentiment)
-ax2.set_title("Word Length Distribution by Sentiment")
-ax2.set_xlabel('Number of Words')
-ax2.legend()
-
-plt.tight_layout()
-plt.show()
-
-# Words vs. sentiment relationship
-plt.figure(figsize=(10, 6))
-sns.boxplot(x='sentiment', y='length_words', data=df)
-plt.title('Word Count by Sentiment', weight='bold')
-plt.xlabel('Sentiment')
-plt.ylabel('Number of Words')
-plt.show()
+def draw_top_aspects(top_aspects):
+    """Draw the tweet count of the top aspects"""
+    plt.figure(figsize=(10, 8))
+    ax = sns.barplot(y=top_aspects.index, x=top_aspects.values, palette='Blues_r')
+    for p in ax.patches:
+        ax.annotate(f'{p.get_width():,.0f}',
+                    (p.get_width() + 0.1, p.get_y() + 0.5),
+                    va='center')
+    plt.title('Top Aspects Distribution', weight='bold')
+    plt.xlabel('Count', fontsize=10, weight='bold')
+    plt.ylabel('Aspect', fontsize=10, weight='bold')
+    plt.tight_layout()
 
-# --- Engagement Analysis --------------------------------------------------------
-print("\n" + "=" * 50)
-print("ENGAGEMENT ANALYSIS")
-print("=" * 50)
+def draw_aspect_sentiment_counts(aspect_tweets, aspect_order):
+    """Draw the sentiment counts of the top aspects"""
+    plt.figure(figsize=(12, 10))
+    sns.countplot(y='aspect', data=aspect_tweets, hue='sentiment', palette='Blues_r', order=aspect_order)
+    plt.title('Sentiment Distribution by Aspect', weight='bold')
+    plt.ylabel('Aspect', fontsize=10, weight='bold')
+    plt.xlabel('Count', fontsize=10, weight='bold')
+    plt.legend(title='Sentiment')
+    plt.tight_layout()
 
-# Analyze different engagement metrics
-engagement_metrics = ['retweet_count', 'favorite_count', 'reply_count', 'view_count']
-for metric in engagement_metrics:
-    if metric in df.columns:
-        analyze_engagement(df, metric)
+@pipeline.stage('aspects', inputs=['tweets'], outputs=['aspect_order', 'aspect_sentiment'],
+                params={'top_n': 15})
+def aspects_stage(tweets, top_n):
+    """Most discussed aspects and their sentiment breakdown"""
+    df = tweets
+    print_section("ASPECT-BASED ANALYSIS")
 
-# Create engagement score (composite metric)
-print("\nCreating composite engagement score...")
-engagement_columns = [col for col in engagement_metrics if col in df.columns]
+    # Visualize aspects more efficiently
+    aspect_counts = df['aspect'].value_counts()
+    top_n_aspects = min(top_n, len(aspect_counts))
+    print(f"Top {top_n_aspects} Aspects in the Dataset:")
+    for aspect, count in aspect_counts.head(top_n_aspects).items():
+        print(f"- {aspect}: {count:,} tweets ({count/len(df)*100:.1f}%)")
 
-if len(engagement_columns) > 0:
-    # Standardize metrics
-    scaler = StandardScaler()
-    engagement_scaled = scaler.fit_transform(df[engagement_columns])
-    engagement_df = pd.DataFrame(engagement_scaled, columns=engagement_columns)
+    figures.show("aspects_top", draw_top_aspects, aspect_counts.head(top_n_aspects))
 
-    # Calculate engagement score (mean of standardized metrics)
-    df['engagement_score'] = engagement_df.mean(axis=1)
+    # Aspect with sentiment breakdown
+    aspect_order = list(aspect_counts.index[:top_n_aspects])
+    aspect_tweets = df.loc[df['aspect'].isin(aspect_order), ['aspect', 'sentiment']]
+    figures.show("aspects_sentiment_counts", draw_aspect_sentiment_counts, aspect_tweets, aspect_order)
 
-    # Visualize engagement score distribution
+    # Create aspect-sentiment heatmap
+    aspect_sentiment = create_aspect_sentiment_heatmap(aspect_tweets)
+
+    return {'aspect_order': aspect_order, 'aspect_sentiment': aspect_sentiment}
+
+# --- Engagement Analysis --------------------------------------------------------
+def draw_engagement_distribution(engagement_score):
+    """Draw the distribution of the composite engagement score"""
     plt.figure(figsize=(10, 6))
-    sns.histplot(df['engagement_score'], kde=True, bins=30)
+    sns.histplot(engagement_score, kde=True, bins=30)
     plt.title('Distribution of Engagement Scores', fontweight='bold')
     plt.xlabel('Engagement Score (Standardized)')
     plt.ylabel('Frequency')
-    plt.axvline(df['engagement_score'].mean(), color='red', linestyle='--',
-                label=f'Mean: {df["engagement_score"].mean():.2f}')
+    plt.axvline(engagement_score.mean(), color='red', linestyle='--',
+                label=f'Mean: {engagement_score.mean():.2f}')
     plt.legend()
-    plt.show()
 
-    # Engagement by sentiment
+def draw_engagement_by_sentiment(scores):
+    """Draw the engagement score per sentiment"""
     plt.figure(figsize=(10, 6))
-    sns.boxplot(x='sentiment', y='engagement_score', data=df)
+    sns.boxplot(x='sentiment', y='engagement_score', data=scores)
     plt.title('Engagement Score by Sentiment', fontweight='bold')
     plt.xlabel('Sentiment')
     plt.ylabel('Engagement Score')
-    plt.show()
 
-    # Engagement by aspect (top aspects)
+def draw_engagement_by_aspect(scores, aspect_order):
+    """Draw the engagement score of the top aspects"""
     plt.figure(figsize=(12, 8))
-    sns.boxplot(y='aspect', x='engagement_score', data=df[df['aspect'].isin(aspect_order)],
-               order=aspect_order)
+    sns.boxplot(y='aspect', x='engagement_score', data=scores, order=aspect_order)
     plt.title('Engagement Score by Aspect', fontweight='bold')
     plt.ylabel('Aspect')
     plt.xlabel('Engagement Score')
-    plt.show()
+
+@pipeline.stage('engagement', inputs=['tweets', 'aspect_order'],
+                outputs=['engagement_columns', 'engagement_score'])
+def engagement_stage(tweets, aspect_order):
+    """Per-metric engagement leaders and a composite engagement score"""
+    df = tweets
+    print_section("ENGAGEMENT ANALYSIS")
+
+    # Analyze different engagement metrics
+    for metric in ENGAGEMENT_METRICS:
+        if metric in df.columns:
+            analyze_engagement(df, metric)
+
+    # Create engagement score (composite metric)
+    print("\nCreating composite engagement score...")
+    engagement_columns = [col for col in ENGAGEMENT_METRICS if col in df.columns]
+    if not engagement_columns:
+        return {'engagement_columns': engagement_columns, 'engagement_score': None}
+
+    # Standardize metrics
+    scaler = StandardScaler()
+    engagement_scaled = scaler.fit_transform(df[engagement_columns])
+    engagement_df = pd.DataFrame(engagement_scaled, columns=engagement_columns, index=df.index)
+
+    # Calculate engagement score (mean of standardized metrics)
+    engagement_score = engagement_df.mean(axis=1).rename('engagement_score')
+    df = df.assign(engagement_score=engagement_score)
+
+    # Visualize engagement score distribution
+    figures.show("engagement_score_distribution", draw_engagement_distribution, engagement_score)
+
+    # Engagement by sentiment
+    scores = df[['sentiment', 'aspect', 'engagement_score']]
+    figures.show("engagement_by_sentiment", draw_engagement_by_sentiment, scores[['sentiment', 'engagement_score']])
+
+    # Engagement by aspect (top aspects)
+    figures.show("engagement_by_aspect", draw_engagement_by_aspect,
+                 scores.loc[scores['aspect'].isin(aspect_order), ['aspect', 'engagement_score']], aspect_order)
 
     # Find most engaging content (top 10 by engagement score)
     top_engaging = df.sort_values('engagement_score', ascending=False).head(10)
@@ -588,224 +749,320 @@ if len(engagement_columns) > 0:
              f"Favorites: {row['favorite_count']}, Replies: {row['reply_count']}")
         print()
 
+    return {'engagement_columns': engagement_columns, 'engagement_score': engagement_score}
+
 # --- Enhanced Correlation Analysis ----------------------------------------------
-print("\n" + "=" * 50)
-print("CORRELATION ANALYSIS")
-print("=" * 50)
-
-# Analyze correlation between engagement metrics
-if len(engagement_columns) > 0:
-    metrics_to_analyze = engagement_columns + ['length_words']
-
-    # Create enhanced correlation plot
-    corr_matrix = plot_enhanced_correlation(df, metrics_to_analyze,
-                                          "Enhanced Analysis of Engagement Metrics")
-
-    # Additional analysis: sentiment score correlation with engagement
-    if 'sentiment_score' in df.columns:
-        print("\nAnalyzing correlation between sentiment and engagement...")
-
-        # Create composite metrics for analysis
-        metrics_with_sentiment = metrics_to_analyze + ['sentiment_score']
-
-        # Calculate correlations
-        sentiment_corr = df[metrics_with_sentiment].corr()['sentiment_score'].drop('sentiment_score')
-
-        # Visualize correlation between sentiment and engagement
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=sentiment_corr.index, y=sentiment_corr.values, palette='RdYlGn')
-        plt.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-        plt.title('Correlation Between Sentiment and Engagement Metrics', fontweight='bold')
-        plt.xlabel('Engagement Metric')
-        plt.ylabel('Correlation with Sentiment Score')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+def draw_sentiment_correlation(sentiment_corr):
+    """Draw the correlation of each metric with the sentiment score"""
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=sentiment_corr.index, y=sentiment_corr.values, palette='RdYlGn')
+    plt.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+    plt.title('Correlation Between Sentiment and Engagement Metrics', fontweight='bold')
+    plt.xlabel('Engagement Metric')
+    plt.ylabel('Correlation with Sentiment Score')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+@pipeline.stage('correlation', inputs=['tweets', 'engagement_columns'],
+                outputs=['corr_matrix', 'sentiment_corr'])
+def correlation_stage(tweets, engagement_columns):
+    """Correlations between engagement metrics, tweet length and sentiment"""
+    df = tweets
+    print_section("CORRELATION ANALYSIS")
+    corr_matrix, sentiment_corr = None, None
+
+    # Analyze correlation between engagement metrics
+    if len(engagement_columns) > 0:
+        metrics_to_analyze = engagement_columns + ['length_words']
+
+        # Create enhanced correlation plot
+        corr_matrix = plot_enhanced_correlation(df, metrics_to_analyze,
+                                                "Enhanced Analysis of Engagement Metrics")
+
+        # Additional analysis: sentiment score correlation with engagement
+        if 'sentiment_score' in df.columns:
+            print("\nAnalyzing correlation between sentiment and engagement...")
 
-        # Print insights
-        print("\nSentiment Correlation Insights:")
-        for metric, corr in sentiment_corr.items():
-            direction = "positive" if corr > 0 else "negative"
-            strength = "strong" if abs(corr) > 0.5 else "moderate" if abs(corr) > 0.3 else "weak"
+            # Create composite metrics for analysis
+            metrics_with_sentiment = metrics_to_analyze + ['sentiment_score']
 
-            print(f"- {metric.replace('_', ' ').title()} has a {strength} {direction} correlation ({corr:.3f}) with sentiment")
+            # Calculate correlations
+            sentiment_corr = df[metrics_with_sentiment].corr()['sentiment_score'].drop('sentiment_score')
 
-            if corr > 0.3:
-                print(f"  This suggests more positive tweets tend to get more {metric.replace('_', ' ')}.")
-            elif corr < -0.3:
-                print(f"  This suggests more negative tweets tend to get more {metric.replace('_', ' ')}.")
+            # Visualize correlation between sentiment and engagement
+            figures.show("correlation_sentiment", draw_sentiment_correlation, sentiment_corr)
+
+            # Print insights
+            print("\nSentiment Correlation Insights:")
+            for metric, corr in sentiment_corr.items():
+                direction = "positive" if corr > 0 else "negative"
+                strength = "strong" if abs(corr) > 0.5 else "moderate" if abs(corr) > 0.3 else "weak"
+
+                print(f"- {metric.replace('_', ' ').title()} has a {strength} {direction} correlation ({corr:.3f}) with sentiment")
+
+                if corr > 0.3:
+                    print(f"  This suggests more positive tweets tend to get more {metric.replace('_', ' ')}.")
+                elif corr < -0.3:
+                    print(f"  This suggests more negative tweets tend to get more {metric.replace('_', ' ')}.")
+
+    return {'corr_matrix': corr_matrix, 'sentiment_corr': sentiment_corr}
 
 # --- Time Series Analysis -------------------------------------------------------
-print("\n" + "=" * 50)
-print("TIME SERIES ANALYSIS")
-print("=" * 50)
-
-# Create time series of daily tweet counts
-df_ts = df.set_index('created_time').copy()
-df_daily = df_ts['cleaned_text'].resample('D').count()
-
-print(f"Analyzing time series from {df_daily.index.min().date()} to {df_daily.index.max().date()}")
-print(f"Total days in time series: {len(df_daily)}")
-print(f"Average tweets per day: {df_daily.mean():.1f}")
-print(f"Maximum tweets in a day: {df_daily.max()} on {df_daily.idxmax().date()}")
-
-# Plot the time series
-plt.figure(figsize=(14, 7))
-plt.plot(df_daily.index, df_daily.values, linewidth=2)
-plt.title('Number of COP Tweets Over Time', fontsize=14, fontweight='bold')
-plt.xlabel('Date')
-plt.ylabel('Number of Tweets')
-plt.grid(True, alpha=0.3)
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# Decompose the time series if we have enough data
-if len(df_daily) >= 14:  # Need at least 2 weeks for meaningful decomposition
-    try:
-        # Use a reasonable period for seasonal decomposition
-        decomposition_period = min(7, len(df_daily) // 2)  # Weekly seasonality or less
-        result = seasonal_decompose(df_daily, model='additive', period=decomposition_period)
-
-        # Plot the decomposition
-        fig, axes = plt.subplots(4, 1, figsize=(14, 12), sharex=True)
-        result.observed.plot(ax=axes[0], title='Observed')
-        result.trend.plot(ax=axes[1], title='Trend')
-        result.seasonal.plot(ax=axes[2], title='Seasonal')
-        result.resid.plot(ax=axes[3], title='Residual')
-        plt.tight_layout()
-        plt.show()
-    except Exception as e:
-        print(f"Could not perform seasonal decomposition: {str(e)}")
-else:
-    print("Insufficient data for seasonal decomposition (need at least 14 days)")
-
-# Sentiment trends over time
-print("\nAnalyzing sentiment trends over time...")
-sentiment_by_month = df.groupby(['year/month', 'sentiment']).size().unstack(fill_value=0)
-
-# Calculate absolute counts
-plt.figure(figsize=(14, 7))
-sentiment_by_month.plot(kind='bar', stacked=True)
-plt.title('Absolute Sentiment Counts by Month', fontsize=14, fontweight='bold')
-plt.xlabel('Year/Month')
-plt.ylabel('Number of Tweets')
-plt.grid(True, alpha=0.3)
-plt.legend(title='Sentiment')
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# Normalize to see proportion
-sentiment_by_month_norm = sentiment_by_month.div(sentiment_by_month.sum(axis=1), axis=0)
-
-# Plot normalized sentiment trends
-plt.figure(figsize=(14, 7))
-sentiment_by_month_norm.plot(kind='line', marker='o')
-plt.title('Sentiment Trends Over Time (Normalized)', fontsize=14, fontweight='bold')
-plt.xlabel('Year/Month')
-plt.ylabel('Proportion of Tweets')
-plt.grid(True, alpha=0.3)
-plt.legend(title='Sentiment')
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# Analyze tweet patterns by day of week and hour
-day_hour_counts = df.groupby(['day_of_week', 'hour_of_day']).size().unstack(fill_value=0)
-
-plt.figure(figsize=(14, 8))
-sns.heatmap(day_hour_counts, cmap='YlGnBu', linewidths=0.5, annot=False, fmt='.0f')
-plt.title('Tweet Activity by Day and Hour', fontweight='bold')
-plt.xlabel('Hour of Day')
-plt.ylabel('Day of Week')
-plt.show()
-
-# Create heatmap of sentiment distribution by day of week
-day_sentiment = pd.crosstab(df['day_of_week'], df['sentiment'], normalize='index') * 100
-
-plt.figure(figsize=(12, 8))
-sns.heatmap(day_sentiment, annot=True, fmt='.1f', cmap='coolwarm')
-plt.title('Sentiment Distribution by Day of Week (%)', fontweight='bold')
-plt.xlabel('Sentiment')
-plt.ylabel('Day of Week')
-plt.show()
-
-# --- Word Cloud Visualization ---------------------------------------------------
-print("\n" + "=" * 50)
-print("TEXT CONTENT ANALYSIS")
-print("=" * 50)
-
-# Create a word cloud of all tweets
-print("\nGenerating word clouds...")
-
-# Generate overall word cloud
-all_tweets_cloud = generate_wordcloud(df['cleaned_text'], title="Word Cloud of All COP Tweets")
-
-# Generate word clouds by sentiment
-for sentiment in df['sentiment'].unique():
-    sentiment_text = df[df['sentiment'] == sentiment]['cleaned_text']
-    if len(sentiment_text) > 0:  # Check if we have data for this sentiment
-        generate_wordcloud(sentiment_text, f"Word Cloud for {sentiment} Tweets")
-
-# --- N-gram Analysis -----------------------------------------------------------
-print("\nGenerating N-gram analysis...")
-
-# Generate bigrams and trigrams
-bigrams = generate_ngrams(df['cleaned_text'], n=2, top_n=15)
-trigrams = generate_ngrams(df['cleaned_text'], n=3, top_n=15)
+def draw_daily_counts(df_daily):
+    """Draw the number of tweets per day"""
+    plt.figure(figsize=(14, 7))
+    plt.plot(df_daily.index, df_daily.values, linewidth=2)
+    plt.title('Number of COP Tweets Over Time', fontsize=14, fontweight='bold')
+    plt.xlabel('Date')
+    plt.ylabel('Number of Tweets')
+    plt.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
 
-# --- Topic Clustering ----------------------------------------------------------
-print("\n" + "=" * 50)
-print("TOPIC CLUSTERING")
-print("=" * 50)
-print("\nPerforming topic clustering using TF-IDF and K-means...")
-
-# Create TF-IDF features
-tfidf_vectorizer = TfidfVectorizer(
-    max_features=1000,
-    stop_words='english',
-    min_df=5  # Minimum document frequency
-)
-
-# Check if we have enough data for meaningful clustering
-if len(df) > 100:  # Only do clustering if we have at least 100 tweets
-    # Fit and transform the text data
-    tfidf_matrix = tfidf_vectorizer.fit_transform(df['cleaned_text'])
+def draw_decomposition(observed, trend, seasonal, resid):
+    """Draw the components of a seasonal decomposition"""
+    fig, axes = plt.subplots(4, 1, figsize=(14, 12), sharex=True)
+    observed.plot(ax=axes[0], title='Observed')
+    trend.plot(ax=axes[1], title='Trend')
+    seasonal.plot(ax=axes[2], title='Seasonal')
+    resid.plot(ax=axes[3], title='Residual')
+    plt.tight_layout()
 
-    # Determine optimal number of clusters using silhouette score
-    silhouette_scores = []
-    k_range = range(2, min(10, len(df) // 20))  # Try different numbers of clusters
+def draw_monthly_sentiment(sentiment_by_month, kind, title, ylabel):
+    """Draw sentiment per month as stacked bars or lines"""
+    fig, ax = plt.subplots(figsize=(14, 7))
+    if kind == 'bar':
+        sentiment_by_month.plot(kind='bar', stacked=True, ax=ax)
+    else:
+        sentiment_by_month.plot(kind='line', marker='o', ax=ax)
+    plt.title(title, fontsize=14, fontweight='bold')
+    plt.xlabel('Year/Month')
+    plt.ylabel(ylabel)
+    plt.grid(True, alpha=0.3)
+    plt.legend(title='Sentiment')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
 
-    print("Determining optimal number of clusters...")
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        cluster_labels = kmeans.fit_predict(tfidf_matrix)
+@pipeline.stage('time_series', inputs=['tweets'], outputs=['daily_counts', 'sentiment_by_month'])
+def time_series_stage(tweets):
+    """Daily volume, seasonality and sentiment over time"""
+    df = tweets
+    print_section("TIME SERIES ANALYSIS")
+
+    # Create time series of daily tweet counts
+    df_ts = df.set_index('created_time')
+    df_daily = df_ts['cleaned_text'].resample('D').count()
+
+    print(f"Analyzing time series from {df_daily.index.min().date()} to {df_daily.index.max().date()}")
+    print(f"Total days in time series: {len(df_daily)}")
+    print(f"Average tweets per day: {df_daily.mean():.1f}")
+    print(f"Maximum tweets in a day: {df_daily.max()} on {df_daily.idxmax().date()}")
+
+    # Plot the time series
+    figures.show("time_series_daily", draw_daily_counts, df_daily)
+
+    # Decompose the time series if we have enough data
+    if len(df_daily) >= 14:  # Need at least 2 weeks for meaningful decomposition
+        try:
+            # Use a reasonable period for seasonal decomposition
+            decomposition_period = min(7, len(df_daily) // 2)  # Weekly seasonality or less
+            result = seasonal_decompose(df_daily, model='additive', period=decomposition_period)
+
+            # Plot the decomposition
+            figures.show("time_series_decomposition", draw_decomposition,
+                         result.observed, result.trend, result.seasonal, result.resid)
+        except Exception as e:
+            print(f"Could not perform seasonal decomposition: {str(e)}")
+    else:
+        print("Insufficient data for seasonal decomposition (need at least 14 days)")
+
+    # Sentiment trends over time
+    print("\nAnalyzing sentiment trends over time...")
+    sentiment_by_month = df.groupby(['year/month', 'sentiment']).size().unstack(fill_value=0)
+
+    # Calculate absolute counts
+    figures.show("time_series_sentiment_counts", draw_monthly_sentiment, sentiment_by_month,
+                 'bar', 'Absolute Sentiment Counts by Month', 'Number of Tweets')
+
+    # Normalize to see proportion
+    sentiment_by_month_norm = sentiment_by_month.div(sentiment_by_month.sum(axis=1), axis=0)
+
+    # Plot normalized sentiment trends
+    figures.show("time_series_sentiment_trends", draw_monthly_sentiment, sentiment_by_month_norm,
+                 'line', 'Sentiment Trends Over Time (Normalized)', 'Proportion of Tweets')
+
+    # Analyze tweet patterns by day of week and hour
+    day_hour_counts = df.groupby(['day_of_week', 'hour_of_day']).size().unstack(fill_value=0)
+
+    figures.show("time_series_day_hour", draw_heatmap, day_hour_counts,
+                 'Tweet Activity by Day and Hour', 'Hour of Day', 'Day of Week', figsize=(14, 8),
+                 cmap='YlGnBu', linewidths=0.5, annot=False, fmt='.0f')
+
+    # Create heatmap of sentiment distribution by day of week
+    day_sentiment = pd.crosstab(df['day_of_week'], df['sentiment'], normalize='index') * 100
+
+    figures.show("time_series_day_sentiment", draw_heatmap, day_sentiment,
+                 'Sentiment Distribution by Day of Week (%)', 'Sentiment', 'Day of Week',
+                 annot=True, fmt='.1f', cmap='coolwarm')
+
+    return {'daily_counts': df_daily, 'sentiment_by_month': sentiment_by_month}
+
+# --- Word Cloud and N-gram Analysis ---------------------------------------------
+@pipeline.stage('text', inputs=['tweets', 'dup_group'], outputs=['bigrams', 'trigrams', 'ngram_table'],
+                params={'max_words': 200, 'top_n': 15, 'duplicates': 'keep',
+                        'chunk_size': 50_000, 'capacity': 50_000, 'preview': False})
+def text_stage(tweets, dup_group, max_words, top_n, duplicates, chunk_size, capacity, preview):
+    """Word clouds overall and per sentiment, and the most common n-grams"""
+    print_section("TEXT CONTENT ANALYSIS")
+    df, weights = handle_duplicates(tweets, dup_group, duplicates)
+
+    # Create a word cloud of all tweets
+    print("\nGenerating word clouds...")
+
+    # Count the words once, overall and per sentiment; every cloud is drawn
+    # from these tables
+    words = count_words(df['cleaned_text'], df[['sentiment']], weights, chunk_size=chunk_size)
+
+    # Generate overall word cloud
+    generate_wordcloud(words, "text_wordcloud_all", title="Word Cloud of All COP Tweets",
+                       max_words=max_words, preview=preview)
+
+    # Generate word clouds by sentiment
+    for sentiment in words.groups('sentiment'):
+        generate_wordcloud(words, f"text_wordcloud_{str(sentiment).lower()}", 'sentiment', sentiment,
+                           f"Word Cloud for {sentiment} Tweets", max_words=max_words, preview=preview)
+
+    print("\nGenerating N-gram analysis...")
+
+    # Count bigrams and trigrams per tweet in one streaming pass, overall and
+    # per sentiment, aspect and month
+    group_columns = [column for column in ['sentiment', 'aspect', 'year/month'] if column in df.columns]
+    counter = count_ngrams(df['cleaned_text'], df[group_columns], weights, chunk_size=chunk_size,
+                           ngram_range=(2, 3), capacity=capacity, stop_words=ENGLISH_STOP_WORDS)
+    ngram_table = counter.top_table(top_n)
+
+    bigrams = generate_ngrams(counter, n=2, top_n=top_n)
+    trigrams = generate_ngrams(counter, n=3, top_n=top_n)
+
+    print("\nTop bigrams by sentiment:")
+    for sentiment in counter.groups('sentiment'):
+        top = counter.top(2, 5, 'sentiment', sentiment)
+        print(f"- {sentiment}: {', '.join(top['ngram'])}")
 
-        # Calculate silhouette score
-        silhouette_avg = silhouette_score(tfidf_matrix, cluster_labels)
-        silhouette_scores.append(silhouette_avg)
-        print(f"For n_clusters = {k}, the silhouette score is {silhouette_avg:.3f}")
+    return {'bigrams': bigrams, 'trigrams': trigrams, 'ngram_table': ngram_table}
 
-    # Plot silhouette scores
+# --- Topic Clustering ----------------------------------------------------------
+def draw_silhouette_scores(k_values, silhouette_scores, low=None, high=None):
+    """Draw the silhouette score of each number of clusters, with its confidence band if sampled"""
     plt.figure(figsize=(10, 6))
-    plt.plot(list(k_range), silhouette_scores, 'o-', linewidth=2)
+    plt.plot(k_values, silhouette_scores, 'o-', linewidth=2)
+    if low is not None and high is not None:
+        plt.fill_between(k_values, low, high, alpha=0.2, label='95% interval (sampled)')
+        plt.legend()
     plt.xlabel('Number of clusters')
     plt.ylabel('Silhouette Score')
     plt.title('Silhouette Score for Different Numbers of Clusters', fontweight='bold')
     plt.grid(True, alpha=0.3)
-    plt.show()
 
-    # Choose the optimal number of clusters (highest silhouette score)
-    optimal_k = list(k_range)[silhouette_scores.index(max(silhouette_scores))]
-    print(f"Optimal number of clusters: {optimal_k}")
+def draw_k_criteria(k_values, inertias, calinski_harabasz, optimal_k):
+    """Draw the inertia (elbow) and Calinski-Harabasz curves of the k sweep"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    ax1.plot(k_values, inertias, 'o-', linewidth=2)
+    ax1.set_title('Inertia (Elbow)', fontweight='bold')
+    ax1.set_xlabel('Number of clusters')
+    ax1.set_ylabel('Inertia')
+    ax2.plot(k_values, calinski_harabasz, 'o-', linewidth=2, color='darkorange')
+    ax2.set_title('Calinski-Harabasz Score', fontweight='bold')
+    ax2.set_xlabel('Number of clusters')
+    ax2.set_ylabel('Score')
+    for ax in (ax1, ax2):
+        ax.axvline(optimal_k, color='grey', linestyle='--', alpha=0.7)
+        ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+def draw_cluster_projection(cluster_df):
+    """Draw the tweets on their first two principal components, colored by cluster"""
+    plt.figure(figsize=(12, 8))
+    sns.scatterplot(x='x', y='y', hue='cluster', data=cluster_df, palette='viridis', s=50, alpha=0.7)
+    plt.title('Topic Cluster Visualization using PCA', fontweight='bold')
+    plt.xlabel('Principal Component 1')
+    plt.ylabel('Principal Component 2')
+    plt.legend(title='Cluster')
+    plt.grid(True, alpha=0.3)
+
+# The k sweep runs in worker processes. Above `minibatch_above` tweets it
+# fits MiniBatchKMeans, and above `silhouette_sample` tweets the silhouette
+# is estimated on a stratified sample; on smaller data it is the exact
+# KMeans + silhouette sweep. `criterion` can also be 'elbow' or
+# 'calinski_harabasz', which skip the quadratic silhouette entirely
+@pipeline.stage('clustering', inputs=['tweets', 'dup_group'],
+                outputs=['clusters', 'top_terms', 'silhouette_scores', 'k_selection'],
+                params={'max_features': 1000, 'min_df': 5, 'max_k': 10, 'min_tweets': 100,
+                        'n_init': 10, 'n_terms': 10, 'random_state': 42, 'duplicates': 'keep',
+                        'criterion': 'silhouette', 'algorithm': 'auto', 'minibatch_above': 20_000,
+                        'silhouette_sample': 10_000, 'projection_sample': 5_000, 'workers': None})
+def clustering_stage(tweets, dup_group, max_features, min_df, max_k, min_tweets, n_init, n_terms, random_state,
+                     duplicates, criterion, algorithm, minibatch_above, silhouette_sample, projection_sample,
+                     workers):
+    """TF-IDF topic clusters, with k chosen by silhouette score (or elbow / Calinski-Harabasz)"""
+    print_section("TOPIC CLUSTERING")
+    df, weights = handle_duplicates(tweets, dup_group, duplicates)
+    sample_weight = None if weights is None else weights.to_numpy()
+    print("\nPerforming topic clustering using TF-IDF and K-means...")
+
+    # Check if we have enough data for meaningful clustering
+    if len(df) <= min_tweets:
+        print(f"Insufficient data for meaningful topic clustering (need at least {min_tweets} tweets)")
+        return {'clusters': None, 'top_terms': {}, 'silhouette_scores': {}, 'k_selection': None}
+
+    # Create TF-IDF features
+    tfidf_vectorizer = TfidfVectorizer(
+        max_features=max_features,
+        stop_words='english',
+        min_df=min_df  # Minimum document frequency
+    )
+
+    # Fit and transform the text data
+    tfidf_matrix = tfidf_vectorizer.fit_transform(df['cleaned_text'])
+
+    # Determine optimal number of clusters, fitting every k in parallel
+    k_range = range(2, min(max_k, len(df) // 20))  # Try different numbers of clusters
+
+    print("Determining optimal number of clusters...")
+    optimal_k, k_selection, models = select_k(
+        tfidf_matrix, k_range, criterion=criterion, algorithm=algorithm, n_init=n_init,
+        random_state=random_state, sample_size=silhouette_sample, minibatch_above=minibatch_above,
+        sample_weight=sample_weight, workers=workers
+    )
 
-    # Apply K-means with optimal number of clusters
-    kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init=10)
-    df['cluster'] = kmeans.fit_predict(tfidf_matrix)
+    silhouette_scores = {}
+    if 'silhouette' in k_selection.columns:
+        silhouette_scores = k_selection['silhouette'].to_dict()
+        for k, row in k_selection.iterrows():
+            interval = ('' if row['silhouette_low'] == row['silhouette_high']
+                        else f" (95% CI {row['silhouette_low']:.3f} to {row['silhouette_high']:.3f}, "
+                             f"{row['silhouette_sample']:,.0f} sampled tweets)")
+            print(f"For n_clusters = {k}, the silhouette score is {row['silhouette']:.3f}{interval}")
+
+        # Plot silhouette scores
+        sampled = (k_selection['silhouette_low'] != k_selection['silhouette_high']).any()
+        figures.show("clustering_silhouette", draw_silhouette_scores, list(k_selection.index),
+                     k_selection['silhouette'].tolist(),
+                     k_selection['silhouette_low'].tolist() if sampled else None,
+                     k_selection['silhouette_high'].tolist() if sampled else None)
+
+    figures.show("clustering_criteria", draw_k_criteria, list(k_selection.index),
+                 k_selection['inertia'].tolist(), k_selection['calinski_harabasz'].tolist(), optimal_k)
+
+    print(f"Optimal number of clusters ({criterion}): {optimal_k}")
+
+    # Keep the sweep's model for the optimal number of clusters
+    kmeans, labels = models[optimal_k]
+    clusters = pd.Series(labels, index=df.index, name='cluster')
+    df = df.assign(cluster=clusters)
 
     # Get top terms for each cluster
-    top_terms = get_top_terms_per_cluster(kmeans, tfidf_vectorizer, n_terms=10)
+    top_terms = get_top_terms_per_cluster(kmeans, tfidf_vectorizer, n_terms=n_terms)
 
     # Display top terms for each cluster
     print("\nTop terms for each topic cluster:")
@@ -813,38 +1070,30 @@ if len(df) > 100:  # Only do clustering if we have at least 100 tweets
         print(f"Cluster {cluster}: {', '.join(terms)}")
 
     # Visualize clusters with PCA
-    # Reduce dimensions for visualization
-    pca = PCA(n_components=2, random_state=42)
-    tfidf_pca = pca.fit_transform(tfidf_matrix.toarray())
+    # Reduce dimensions for visualization, on a stratified sample of tweets
+    # so the dense matrix stays small
+    projected = stratified_sample(labels, projection_sample, random_state)
+    pca = PCA(n_components=2, random_state=random_state)
+    tfidf_pca = pca.fit_transform(tfidf_matrix[projected].toarray())
 
     # Create a DataFrame for plotting
     cluster_df = pd.DataFrame({
         'x': tfidf_pca[:, 0],
         'y': tfidf_pca[:, 1],
-        'cluster': df['cluster'],
-        'sentiment': df['sentiment']
+        'cluster': df['cluster'].values[projected],
+        'sentiment': df['sentiment'].values[projected]
     })
 
     # Plot clusters
-    plt.figure(figsize=(12, 8))
-    sns.scatterplot(x='x', y='y', hue='cluster', data=cluster_df, palette='viridis', s=50, alpha=0.7)
-    plt.title('Topic Cluster Visualization using PCA', fontweight='bold')
-    plt.xlabel('Principal Component 1')
-    plt.ylabel('Principal Component 2')
-    plt.legend(title='Cluster')
-    plt.grid(True, alpha=0.3)
-    plt.show()
+    figures.show("clustering_pca", draw_cluster_projection, cluster_df[['x', 'y', 'cluster']])
 
     # Relationship between clusters and sentiment
     cluster_sentiment = pd.crosstab(df['cluster'], df['sentiment'], normalize='index') * 100
 
     # Visualize relationship
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(cluster_sentiment, annot=True, fmt='.1f', cmap='YlGnBu')
-    plt.title('Sentiment Distribution Within Each Cluster (%)', fontweight='bold')
-    plt.xlabel('Sentiment')
-    plt.ylabel('Cluster')
-    plt.show()
+    figures.show("clustering_sentiment", draw_heatmap, cluster_sentiment,
+                 'Sentiment Distribution Within Each Cluster (%)', 'Sentiment', 'Cluster',
+                 annot=True, fmt='.1f', cmap='YlGnBu')
 
     # Print insights about clusters
     print("\nCluster-Sentiment Relationship Insights:")
@@ -863,93 +1112,90 @@ if len(df) > 100:  # Only do clustering if we have at least 100 tweets
         example = df[df['cluster'] == cluster].iloc[0]
         print(f"  Example tweet: {example['cleaned_text'][:100]}...")
         print()
-else:
-    print("Insufficient data for meaningful topic clustering (need at least 100 tweets)")
-
-# --- User Analysis -------------------------------------------------------------
-print("\n" + "=" * 50)
-print("USER ANALYSIS")
-print("=" * 50)
-
-# Analyze user activity
-if 'author_username' in df.columns:
-    user_activity = df['author_username'].value_counts()
-    top_users = min(20, len(user_activity))
-
-    print(f"\nTop {top_users} Most Active Users:")
-    for i, (user, count) in enumerate(user_activity.head(top_users).items(), 1):
-        print(f"{i}. {user}: {count} tweets ({count/len(df)*100:.1f}%)")
-
-    plt.figure(figsize=(12, 8))
-    sns.barplot(y=user_activity.head(top_users).index,
-                x=user_activity.head(top_users).values,
-                palette='viridis')
-    plt.title('Top Most Active Users', fontweight='bold')
-    plt.xlabel('Number of Tweets')
-    plt.ylabel('User')
-    plt.tight_layout()
-    plt.show()
-
-    # User sentiment analysis for active users
-    min_tweets = 5  # Only consider users with at least 5 tweets
-    user_counts = df['author_username'].value_counts()
-    active_users = user_counts[user_counts >= min_tweets].index
-
-    if len(active_users) > 0:
-        user_sentiment = pd.crosstab(
-            df[df['author_username'].isin(active_users)]['author_username'],
-            df[df['author_username'].isin(active_users)]['sentiment'],
-            normalize='index'
-        ).mul(100).round(1)
-
-        # Show top users by activity
-        top_n_active = min(15, len(user_sentiment))
-        user_sentiment_top = user_sentiment.loc[user_activity.head(top_n_active).index]
-
-        plt.figure(figsize=(14, 10))
-        sns.heatmap(user_sentiment_top, annot=True, fmt='.1f', cmap='coolwarm')
-        plt.title('Sentiment Distribution by Top Active Users (%)', fontweight='bold')
-        plt.xlabel('Sentiment')
-        plt.ylabel('User')
-        plt.tight_layout()
-        plt.show()
 
-        # Identify users with strong sentiment bias
-        if 'Positive' in user_sentiment.columns and 'Negative' in user_sentiment.columns:
-            user_sentiment['positivity_bias'] = user_sentiment['Positive'] - user_sentiment['Negative']
-            most_positive = user_sentiment.sort_values('positivity_bias', ascending=False).head(5)
-            most_negative = user_sentiment.sort_values('positivity_bias', ascending=True).head(5)
+    return {
+        'clusters': clusters,
+        'top_terms': top_terms,
+        'silhouette_scores': silhouette_scores,
+        'k_selection': k_selection
+    }
 
-            print("\nUsers with Strongest Positive Bias:")
-            for user, row in most_positive.iterrows():
-                print(f"- {user}: {row['Positive']:.1f}% positive, {row['Negative']:.1f}% negative")
-
-            print("\nUsers with Strongest Negative Bias:")
-            for user, row in most_negative.iterrows():
-                print(f"- {user}: {row['Positive']:.1f}% positive, {row['Negative']:.1f}% negative")
+# --- User Analysis -------------------------------------------------------------
+@pipeline.stage('users', inputs=['tweets'], outputs=['user_activity', 'user_sentiment'],
+                params={'top_users': 20, 'min_tweets': 5})
+def users_stage(tweets, top_users, min_tweets):
+    """Most active users and their sentiment bias"""
+    df = tweets
+    print_section("USER ANALYSIS")
+    user_activity, user_sentiment = None, None
+
+    # Analyze user activity
+    if 'author_username' in df.columns:
+        user_activity = df['author_username'].value_counts()
+        top_users = min(top_users, len(user_activity))
+
+        print(f"\nTop {top_users} Most Active Users:")
+        for i, (user, count) in enumerate(user_activity.head(top_users).items(), 1):
+            print(f"{i}. {user}: {count} tweets ({count/len(df)*100:.1f}%)")
+
+        figures.show("users_top", draw_ranking, user_activity.head(top_users).index,
+                     user_activity.head(top_users).values, 'Top Most Active Users', 'Number of Tweets', 'User')
+
+        # User sentiment analysis for active users (at least min_tweets tweets)
+        active_users = user_activity[user_activity >= min_tweets].index
+
+        if len(active_users) > 0:
+            user_sentiment = pd.crosstab(
+                df[df['author_username'].isin(active_users)]['author_username'],
+                df[df['author_username'].isin(active_users)]['sentiment'],
+                normalize='index'
+            ).mul(100).round(1)
+
+            # Show top users by activity
+            top_n_active = min(15, len(user_sentiment))
+            user_sentiment_top = user_sentiment.loc[user_activity.head(top_n_active).index]
+
+            figures.show("users_sentiment", draw_heatmap, user_sentiment_top,
+                         'Sentiment Distribution by Top Active Users (%)', 'Sentiment', 'User',
+                         figsize=(14, 10), tight=True, annot=True, fmt='.1f', cmap='coolwarm')
+
+            # Identify users with strong sentiment bias
+            if 'Positive' in user_sentiment.columns and 'Negative' in user_sentiment.columns:
+                user_sentiment['positivity_bias'] = user_sentiment['Positive'] - user_sentiment['Negative']
+                most_positive = user_sentiment.sort_values('positivity_bias', ascending=False).head(5)
+                most_negative = user_sentiment.sort_values('positivity_bias', ascending=True).head(5)
+
+                print("\nUsers with Strongest Positive Bias:")
+                for user, row in most_positive.iterrows():
+                    print(f"- {user}: {row['Positive']:.1f}% positive, {row['Negative']:.1f}% negative")
+
+                print("\nUsers with Strongest Negative Bias:")
+                for user, row in most_negative.iterrows():
+                    print(f"- {user}: {row['Positive']:.1f}% positive, {row['Negative']:.1f}% negative")
+
+    return {'user_activity': user_activity, 'user_sentiment': user_sentiment}
 
 # --- Geographic Analysis (if location data available) ---------------------------
-if 'user_location' in df.columns:
-    print("\n" + "=" * 50)
-    print("GEOGRAPHIC ANALYSIS")
-    print("=" * 50)
+@pipeline.stage('geography', inputs=['tweets'], outputs=['location_counts', 'location_sentiment'],
+                params={'top_locations': 10})
+def geography_stage(tweets, top_locations):
+    """Tweet volume and sentiment by user location"""
+    df = tweets
+    if 'user_location' not in df.columns:
+        return {'location_counts': None, 'location_sentiment': None}
+
+    print_section("GEOGRAPHIC ANALYSIS")
 
     location_counts = df['user_location'].value_counts()
-    top_locations = min(10, len(location_counts))
+    top_locations = min(top_locations, len(location_counts))
 
     print(f"\nTop {top_locations} User Locations:")
     for i, (location, count) in enumerate(location_counts.head(top_locations).items(), 1):
         print(f"{i}. {location}: {count} tweets ({count/len(df)*100:.1f}%)")
 
-    plt.figure(figsize=(12, 6))
-    sns.barplot(y=location_counts.head(top_locations).index,
-                x=location_counts.head(top_locations).values,
-                palette='viridis')
-    plt.title('Top User Locations', fontweight='bold')
-    plt.xlabel('Number of Tweets')
-    plt.ylabel('Location')
-    plt.tight_layout()
-    plt.show()
+    figures.show("geography_top", draw_ranking, location_counts.head(top_locations).index,
+                 location_counts.head(top_locations).values, 'Top User Locations', 'Number of Tweets', 'Location',
+                 figsize=(12, 6))
 
     # Sentiment by location
     location_sentiment = pd.crosstab(
@@ -958,20 +1204,18 @@ if 'user_location' in df.columns:
         normalize='index'
     ).mul(100).round(1)
 
-    plt.figure(figsize=(14, 8))
-    sns.heatmap(location_sentiment, annot=True, fmt='.1f', cmap='coolwarm')
-    plt.title('Sentiment Distribution by Location (%)', fontweight='bold')
-    plt.xlabel('Sentiment')
-    plt.ylabel('Location')
-    plt.tight_layout()
-    plt.show()
+    figures.show("geography_sentiment", draw_heatmap, location_sentiment,
+                 'Sentiment Distribution by Location (%)', 'Sentiment', 'Location',
+                 figsize=(14, 8), tight=True, annot=True, fmt='.1f', cmap='coolwarm')
+
+    return {'location_counts': location_counts, 'location_sentiment': location_sentiment}
 
 # --- Final Summary and Insights -------------------------------------------------
-print("\n" + "=" * 50)
-print("SUMMARY AND KEY INSIGHTS")
-print("=" * 50)
+def print_summary():
+    """Print the closing summary of the full analysis"""
+    print_section("SUMMARY AND KEY INSIGHTS")
 
-print("""
+    print("""
 This comprehensive analysis of COP tweets provides several key insights:
 
 1. Sentiment Analysis:
@@ -1003,5 +1247,107 @@ These insights can help organizations understand public perception of climate-re
 optimize communication strategies, and identify key influencers and topics in the climate conversation.
 """)
 
-print("\nAnalysis completed successfully!")
-print("=" * 80)
\ No newline at end of file
+# --- Command Line ---------------------------------------------------------------
+def parse_param(assignment):
+    """Parse a STAGE.PARAM=VALUE override; VALUE is read as JSON when it parses"""
+    name, sep, value = assignment.partition('=')
+    stage, dot, param = name.partition('.')
+    if not sep or not dot:
+        raise argparse.ArgumentTypeError(f"Expected STAGE.PARAM=VALUE, got {assignment!r}")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return stage, param, value
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="COP Twitter analysis. Runs the selected stages (default: every stage whose cached "
+                    "outputs are out of date), plus any upstream stage whose cached outputs are out of date."
+    )
+    parser.add_argument(
+        '--stages', nargs='+', choices=list(pipeline.stages), default=None,
+        help="Stages to run even if their cached outputs are up to date (default: all stale stages)"
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help="Re-run every stage, not only the stale ones"
+    )
+    parser.add_argument(
+        '--set', type=parse_param, action='append', default=[], dest='params', metavar='STAGE.PARAM=VALUE',
+        help="Override a stage parameter, e.g. clustering.max_k=12 or load.path=data.csv; may be repeated"
+    )
+    parser.add_argument(
+        '--cache-dir', default=ANALYSIS_CACHE_DIR,
+        help="Directory of the cached stage outputs (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--list', action='store_true',
+        help="List the stages and whether their cached outputs are up to date, then exit"
+    )
+    parser.add_argument(
+        '--export', action='store_true',
+        help="Render figures headless in worker processes and write them to --visuals-dir "
+             "instead of showing them"
+    )
+    parser.add_argument(
+        '--visuals-dir', default=VISUALS_DIR,
+        help="Directory of the exported figures (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--formats', nargs='+', choices=['png', 'svg'], default=['png'],
+        help="Exported figure formats (default: png)"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="Figure rendering processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        '--force-figures', action='store_true',
+        help="Re-render exported figures even when their data is unchanged"
+    )
+    return parser.parse_args()
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    pipeline.cache_dir = args.cache_dir
+    overrides = {}
+    for stage, param, value in args.params:
+        overrides.setdefault(stage, {})[param] = value
+
+    # The key file is part of the features stage's cache key, so it must exist first
+    load_key(pipeline.resolve_params(overrides)['features']['key_file'])
+
+    if args.list:
+        for name, key, fresh in pipeline.status(overrides):
+            stage = pipeline.stages[name]
+            print(f"{name:<12} {key}  {'cached' if fresh else 'stale '}  "
+                  f"inputs: {', '.join(stage.inputs) or '-'}  params: {stage.params or '-'}")
+        return
+
+    # Download required NLTK resources
+    nltk.download('punkt_tab', quiet=True)
+    nltk.download('stopwords', quiet=True)
+
+    print("=" * 80)
+    print("COP TWITTER ANALYSIS".center(80))
+    print("=" * 80)
+
+    if args.export:
+        figures.start(args.visuals_dir, args.formats, args.workers, force=args.force_figures)
+    try:
+        pipeline.run(args.stages, overrides, force=args.force)
+    finally:
+        # Wait for the figures still rendering in the workers
+        figures.close()
+
+    if not args.stages:
+        print_summary()
+
+    print("\nAnalysis completed successfully!")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
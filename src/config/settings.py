@@ -17,6 +17,34 @@ MAX_RETRIES = 10
 INITIAL_WAIT = 60
 MAX_WAIT = 3600
 
+# HTTP Transport Configuration
+POOL_SIZE = 10
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+# Rate Limiting Configuration (shared by every API request)
+REQUESTS_PER_SECOND = 2.0
+RATE_LIMIT_BURST = 5
+MIN_REQUESTS_PER_SECOND = 0.1
+HTTP_MAX_RETRIES = 5
+RETRY_BACKOFF = 2
+RETRY_BACKOFF_MAX = 120
+
+# Collection Configuration
+MAX_POSTS = 10000
+# Split each DateRange into shards of this many days (0 disables sharding);
+# shards that come back at MAX_POSTS are bisected down to single days
+SHARD_DAYS = 0
+DEFAULT_CONCURRENCY = 1
+STREAM_RESULTS = True
+# Only fetch tweets newer than each keyword/period's saved high-watermark
+# and append them to the existing output
+INCREMENTAL = False
+
+# Submission mode polls every outstanding task once per round
+POLL_INTERVAL_MAX = 300
+MAX_POLL_ROUNDS = 40
+
 # Date Ranges for COP29
 DATE_RANGES = [
     DateRange("PRE_COP", "2024-10-11", "2024-11-10"),
@@ -25,4 +53,31 @@ DATE_RANGES = [
 ]
 
 # Output Configuration
-OUTPUT_DIR = "twitter_data"
\ No newline at end of file
+OUTPUT_DIR = "twitter_data"
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "checkpoints.sqlite3")
+# "csv", "parquet" or "arrow" (Arrow IPC file). Parquet and Arrow keep counts
+# as integers and text_tags/text_tagged_users as lists, and need pyarrow
+OUTPUT_FORMAT = "csv"
+# zstd, snappy, gzip or none for parquet; zstd, lz4 or none for arrow
+OUTPUT_COMPRESSION = "zstd"
+# Deduplicated, keyword-attributed dataset built by src/consolidate.py,
+# partitioned as period=P/date=YYYY-MM-DD
+DATASET_DIR = os.path.join(OUTPUT_DIR, "dataset")
+# Log files are written to LOG_DIR, one per logger and day; LOG_JSON writes
+# them as JSON lines instead of plain text
+LOG_DIR = "logs"
+LOG_JSON = False
+# Per-run telemetry (telemetry.json and telemetry.prom) is exported here
+TELEMETRY_DIR = os.path.join(OUTPUT_DIR, "telemetry")
+
+# Raw API items are archived as compressed JSON Lines so outputs can be
+# rebuilt offline (src/reprocess.py); "auto" uses zstd when installed, else gzip
+ARCHIVE_RAW = True
+ARCHIVE_DIR = os.path.join(OUTPUT_DIR, "raw")
+ARCHIVE_CODEC = "auto"
+
+# Cross-keyword deduplication of tweet IDs
+DEDUPLICATE = False
+SEEN_INDEX_FILE = os.path.join(OUTPUT_DIR, "seen_ids.sqlite3")
+SEEN_INDEX_CAPACITY = 20_000_000
+SEEN_INDEX_ERROR_RATE = 0.001
\ No newline at end of file
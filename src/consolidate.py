@@ -0,0 +1,53 @@
+import argparse
+
+from config.settings import (
+    OUTPUT_DIR, DATASET_DIR, OUTPUT_FORMAT, OUTPUT_COMPRESSION, LOG_DIR, LOG_JSON, SEEN_INDEX_FILE
+)
+from utils.dataset import consolidate
+from utils.output import resolve_format
+from utils.logger import setup_logger, configure_logging
+
+logger = setup_logger('consolidate')
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Merge the per-keyword outputs into one deduplicated dataset partitioned by period and date."
+    )
+    parser.add_argument(
+        '--output-dir', default=OUTPUT_DIR,
+        help="Collection output directory to scan (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--dataset-dir', default=DATASET_DIR,
+        help="Where to write the partitioned dataset (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--output-format', choices=['csv', 'parquet', 'arrow'], default=OUTPUT_FORMAT,
+        help="File format of the partitions (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="Number of worker processes reading the outputs (default: one per CPU)"
+    )
+    parser.add_argument(
+        '--seen-index', default=SEEN_INDEX_FILE,
+        help="Seen-ID index of a --dedupe collection, whose duplicate sightings add keywords, "
+             "used if it exists (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help="Rebuild every partition, even if its inputs are unchanged"
+    )
+    return parser.parse_args()
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    configure_logging(json_lines=LOG_JSON, log_dir=LOG_DIR)
+    resolve_format(args.output_format, OUTPUT_COMPRESSION)
+    consolidate(args.output_dir, args.dataset_dir, args.output_format, OUTPUT_COMPRESSION,
+                args.workers, args.force, args.seen_index)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+from config.settings import OUTPUT_DIR, ARCHIVE_DIR, OUTPUT_FORMAT, OUTPUT_COMPRESSION, LOG_DIR, LOG_JSON
+from utils.archive import EXTENSIONS, iter_batches
+from utils.data_processor import create_tweet_dataframe, select_columns, clean_dataframe
+from utils.output import EXTENSIONS as OUTPUT_EXTENSIONS, resolve_format, staged_path, append_frame, write_output
+from utils.logger import setup_logger, configure_logging
+
+logger = setup_logger('reprocess')
+
+def find_archives(archive_dir: str, periods: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    List the published raw archives, largest first.
+
+    Args:
+        archive_dir: Root of the raw archive (one directory per period)
+        periods: Only include these periods, if given
+
+    Returns:
+        List[Tuple[str, str]]: (period, archive path) pairs
+    """
+    archives = []
+    if not os.path.isdir(archive_dir):
+        return archives
+
+    for period in sorted(os.listdir(archive_dir)):
+        period_dir = os.path.join(archive_dir, period)
+        if not os.path.isdir(period_dir) or (periods and period not in periods):
+            continue
+        for name in sorted(os.listdir(period_dir)):
+            if any(name.endswith(extension) for extension in EXTENSIONS.values()):
+                archives.append((period, os.path.join(period_dir, name)))
+
+    # Start the biggest files first so one large archive does not finish last on its own
+    return sorted(archives, key=lambda archive: os.path.getsize(archive[1]), reverse=True)
+
+def output_path_for(archive_path: str, period: str, output_dir: str, output_format: str = 'csv') -> str:
+    """Return the output an archive rebuilds, e.g. raw/COP/COP(COP29).jsonl.gz -> COP/COP(COP29).csv."""
+    name = os.path.basename(archive_path)
+    for extension in EXTENSIONS.values():
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return os.path.join(output_dir, period, f"{name}{OUTPUT_EXTENSIONS[output_format]}")
+
+def reprocess_archive(archive_path: str, output_path: str, batch_size: int = 5000,
+                      output_format: str = 'csv', compression: Optional[str] = None) -> Tuple[str, int, float]:
+    """
+    Rebuild one output file from its raw archive, streaming it in batches.
+
+    Args:
+        archive_path: Raw archive file
+        output_path: Output file to (re)write
+        batch_size: Records converted to a DataFrame at a time
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet or arrow output
+
+    Returns:
+        Tuple[str, int, float]: Output path, rows written and seconds taken
+    """
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    part_path = f"{staged_path(output_path, output_format)}.part"
+    rows = 0
+
+    try:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        for batch in iter_batches(archive_path, batch_size):
+            df = clean_dataframe(select_columns(create_tweet_dataframe(batch, parse_dates=output_format != 'csv')))
+            append_frame(part_path, df, output_format)
+            rows += len(df)
+
+        if rows and output_format == 'csv':
+            os.replace(part_path, output_path)
+        elif rows:
+            # Parquet/Arrow batches were staged as an Arrow stream; convert it in one go
+            write_output([part_path], f"{output_path}.tmp", output_format, compression)
+            os.replace(f"{output_path}.tmp", output_path)
+            os.remove(part_path)
+    except Exception:
+        for path in (part_path, f"{output_path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return output_path, rows, time.perf_counter() - start
+
+def reprocess_all(archive_dir: str = ARCHIVE_DIR, output_dir: str = OUTPUT_DIR,
+                  workers: Optional[int] = None, batch_size: int = 5000,
+                  periods: Optional[List[str]] = None, output_format: str = OUTPUT_FORMAT,
+                  compression: Optional[str] = OUTPUT_COMPRESSION) -> int:
+    """
+    Rebuild every per-period output from the raw archive across worker processes.
+
+    Args:
+        archive_dir: Root of the raw archive
+        output_dir: Root of the rebuilt outputs
+        workers: Worker processes (default: one per CPU)
+        batch_size: Records converted to a DataFrame at a time
+        periods: Only rebuild these periods, if given
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet or arrow output
+
+    Returns:
+        int: Total rows written
+    """
+    resolve_format(output_format, compression)
+    archives = find_archives(archive_dir, periods)
+    if not archives:
+        logger.warning(f"No raw archives found in {archive_dir}")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Reprocessing {len(archives)} archives with {workers} workers")
+
+    start = time.perf_counter()
+    total, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(reprocess_archive, path, output_path_for(path, period, output_dir, output_format),
+                            batch_size, output_format, compression): path
+            for period, path in archives
+        }
+        for future in as_completed(futures):
+            try:
+                output_path, rows, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to reprocess {futures[future]}: {e}")
+                continue
+
+            total += rows
+            logger.info(f"Rebuilt {output_path} ({rows} tweets) in {seconds:.2f}s")
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Reprocessed {total} tweets from {len(archives) - failed} archives in {elapsed:.2f}s"
+        + (f" ({failed} failed)" if failed else "")
+    )
+    return total
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Rebuild collected outputs from the raw response archive.")
+    parser.add_argument(
+        '--archive-dir', default=ARCHIVE_DIR,
+        help="Root of the raw archive (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--output-dir', default=OUTPUT_DIR,
+        help="Where to write the rebuilt per-period outputs (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--output-format', choices=['csv', 'parquet', 'arrow'], default=OUTPUT_FORMAT,
+        help="File format of the rebuilt outputs (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="Number of worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=5000,
+        help="Records converted to a DataFrame at a time (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--period', action='append', dest='periods',
+        help="Only rebuild this period; may be repeated"
+    )
+    return parser.parse_args()
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    configure_logging(json_lines=LOG_JSON, log_dir=LOG_DIR)
+    reprocess_all(args.archive_dir, args.output_dir, args.workers, args.batch_size, args.periods,
+                  args.output_format)
+
+if __name__ == "__main__":
+    main()
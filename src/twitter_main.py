@@ -1,16 +1,91 @@
+import argparse
+import asyncio
+
 from twitter_scraper import TwitterSearchAPI
-from config.settings import DATE_RANGES
+from config.settings import (
+    DATE_RANGES, DEFAULT_CONCURRENCY, POOL_SIZE, DEDUPLICATE, REQUESTS_PER_SECOND, SHARD_DAYS,
+    INCREMENTAL, OUTPUT_FORMAT, LOG_DIR, LOG_JSON
+)
 from config.keywords import CLIMATE_KEYWORDS
-from utils.logger import setup_logger
+from utils.logger import setup_logger, configure_logging
 
 logger = setup_logger('main')
 
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Collect COP29 tweets from Data365.")
+    parser.add_argument(
+        '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+        help="Number of search tasks to keep in flight at once (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--buffered', action='store_true',
+        help="Hold each task's results in memory and write them once instead of streaming pages to disk"
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Skip keyword/period pairs finished by an earlier run and continue partial ones from their saved cursor"
+    )
+    parser.add_argument(
+        '--submit-all', action='store_true',
+        help="Create every search task up front and poll them together, collecting each as it finishes"
+    )
+    parser.add_argument(
+        '--dedupe', action='store_true', default=DEDUPLICATE,
+        help="Write each tweet only under the first keyword/period that returns it"
+    )
+    parser.add_argument(
+        '--rps', type=float, default=REQUESTS_PER_SECOND,
+        help="Requests-per-second budget shared by all API calls (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--shard-days', type=int, default=SHARD_DAYS,
+        help="Split each date range into shards of this many days, collected in parallel (0 disables)"
+    )
+    parser.add_argument(
+        '--incremental', action='store_true', default=INCREMENTAL,
+        help="Only collect tweets newer than those already saved and append them to the existing files"
+    )
+    parser.add_argument(
+        '--output-format', choices=['csv', 'parquet', 'arrow'], default=OUTPUT_FORMAT,
+        help="File format of the collected tweets (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--log-json', action='store_true', default=LOG_JSON,
+        help="Write the log files as JSON lines"
+    )
+    return parser.parse_args()
+
 def main():
     """Main execution function."""
+    args = parse_args()
+    configure_logging(json_lines=args.log_json, log_dir=LOG_DIR)
+
     try:
-        twitter_search = TwitterSearchAPI()
-        twitter_search.process_keywords(CLIMATE_KEYWORDS, DATE_RANGES)
-        
+        twitter_search = TwitterSearchAPI(
+            pool_size=max(POOL_SIZE, args.concurrency),
+            stream_results=not args.buffered,
+            resume=args.resume,
+            deduplicate=args.dedupe,
+            requests_per_second=args.rps,
+            shard_days=args.shard_days,
+            incremental=args.incremental,
+            output_format=args.output_format
+        )
+        try:
+            if args.submit_all:
+                asyncio.run(twitter_search.process_keywords_submitted(
+                    CLIMATE_KEYWORDS, DATE_RANGES, concurrency=args.concurrency
+                ))
+            elif args.concurrency > 1 or twitter_search.shard_days:
+                asyncio.run(twitter_search.process_keywords_async(
+                    CLIMATE_KEYWORDS, DATE_RANGES, concurrency=args.concurrency
+                ))
+            else:
+                twitter_search.process_keywords(CLIMATE_KEYWORDS, DATE_RANGES)
+        finally:
+            twitter_search.close()
+
     except Exception as e:
         logger.error(f"Application error: {e}")
         raise
@@ -1,21 +1,45 @@
 import os
+import asyncio
+import functools
+import shutil
+import threading
 import requests
 import time
 import pandas as pd
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
-from config.settings import BASE_URL, MAX_RETRIES, INITIAL_WAIT, MAX_WAIT, DateRange, OUTPUT_DIR
+from config.settings import (
+    BASE_URL, MAX_RETRIES, INITIAL_WAIT, MAX_WAIT, DateRange, OUTPUT_DIR,
+    DEFAULT_CONCURRENCY, POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT, STREAM_RESULTS,
+    CHECKPOINT_FILE, POLL_INTERVAL_MAX, MAX_POLL_ROUNDS, DEDUPLICATE, SEEN_INDEX_FILE,
+    SEEN_INDEX_CAPACITY, SEEN_INDEX_ERROR_RATE, REQUESTS_PER_SECOND, RATE_LIMIT_BURST,
+    MIN_REQUESTS_PER_SECOND, HTTP_MAX_RETRIES, RETRY_BACKOFF, RETRY_BACKOFF_MAX, MAX_POSTS, SHARD_DAYS,
+    INCREMENTAL, TELEMETRY_DIR, ARCHIVE_RAW, ARCHIVE_DIR, ARCHIVE_CODEC, OUTPUT_FORMAT, OUTPUT_COMPRESSION
+)
 from utils.logger import setup_logger
+from utils.transport import HTTPTransport
+from utils.rate_limiter import AdaptiveRateLimiter
+from utils.telemetry import Telemetry
+from utils.archive import RawArchive
+from utils.checkpoint import CheckpointStore, COLLECTING, FINISHED, SPLIT
+from utils.seen_index import SeenIndex
+from utils.sharding import split_window, bisect_window
 from utils.data_processor import create_tweet_dataframe, select_columns, clean_dataframe
+from utils.output import EXTENSIONS, STAGING_EXTENSION, resolve_format, staged_path, append_frame, write_output
 
 logger = setup_logger('twitter_scraper')
 
 class TwitterSearchAPI:
     """Handles Twitter data collection using Data365.co API."""
     
-    def __init__(self):
+    def __init__(self, pool_size: int = POOL_SIZE, stream_results: bool = STREAM_RESULTS,
+                 resume: bool = False, deduplicate: bool = DEDUPLICATE,
+                 requests_per_second: float = REQUESTS_PER_SECOND, shard_days: int = SHARD_DAYS,
+                 incremental: bool = INCREMENTAL, archive_raw: bool = ARCHIVE_RAW,
+                 output_format: str = OUTPUT_FORMAT):
         load_dotenv()
         self.access_token = os.getenv('access_token')
         if not self.access_token:
@@ -23,16 +47,45 @@ class TwitterSearchAPI:
             
         self.base_url = BASE_URL
         self.metrics = []
+        self.stream_results = stream_results
+        self.resume = resume
+        self.incremental = incremental
+        self.archive = RawArchive(ARCHIVE_CODEC) if archive_raw else None
+        self.output_format = resolve_format(output_format, OUTPUT_COMPRESSION)
+        self.shard_days = shard_days
+        if shard_days and not stream_results:
+            logger.warning("Date-range sharding requires streamed results; sharding disabled")
+            self.shard_days = 0
+        self.telemetry = Telemetry()
+        self.rate_limiter = AdaptiveRateLimiter(
+            requests_per_second, burst=RATE_LIMIT_BURST, min_rate=MIN_REQUESTS_PER_SECOND
+        )
+        self.transport = HTTPTransport(
+            pool_size=pool_size,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            limiter=self.rate_limiter,
+            max_retries=HTTP_MAX_RETRIES,
+            backoff=RETRY_BACKOFF,
+            backoff_max=RETRY_BACKOFF_MAX,
+            telemetry=self.telemetry
+        )
+        self._executor = None
+        # Guards creating shard directories against removing their emptied parent
+        self._shard_dirs_lock = threading.Lock()
         
         # Create output directory
         os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.checkpoints = CheckpointStore(CHECKPOINT_FILE)
+        self.seen_index = SeenIndex(
+            SEEN_INDEX_FILE, capacity=SEEN_INDEX_CAPACITY, error_rate=SEEN_INDEX_ERROR_RATE
+        ) if deduplicate else None
 
     def _create_search_task(self, keywords: str, from_date: str, to_date: str) -> Dict[str, Any]:
         """Create a new search task on the API."""
         params = {
             "keywords": keywords,
             "search_type": "latest",
-            "max_posts": 10000,
+            "max_posts": MAX_POSTS,
             "from_date": from_date,
             "to_date": to_date,
             "load_replies": "true",
@@ -41,7 +94,7 @@ class TwitterSearchAPI:
         }
         
         try:
-            response = requests.post(f"{self.base_url}/post/update", params=params)
+            response = self.transport.post(f"{self.base_url}/post/update", params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -51,7 +104,7 @@ class TwitterSearchAPI:
     def _check_task_status(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Check the status of an ongoing search task."""
         try:
-            response = requests.get(f"{self.base_url}/post/update", params=params)
+            response = self.transport.get(f"{self.base_url}/post/update", params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -84,6 +137,7 @@ class TwitterSearchAPI:
             
             logger.info(f"Waiting {wait_time} seconds before next check...")
             time.sleep(wait_time)
+            self.telemetry.inc('sleep_seconds_total', wait_time, reason='poll')
             
             wait_time = min(wait_time * 2, MAX_WAIT)
             attempts += 1
@@ -91,12 +145,44 @@ class TwitterSearchAPI:
         logger.error("Max retries reached without completion")
         return False
 
-    def _collect_results(self, keywords: str, from_date: str, to_date: str) -> List[Dict[str, Any]]:
-        """Collect all results from a completed search task."""
-        all_results = []
-        cursor = None
-        page = 0
+    async def _wait_for_completion_async(self, keywords: str, from_date: str, to_date: str) -> bool:
+        """Wait for task completion with exponential backoff without blocking the event loop."""
+        wait_time = INITIAL_WAIT
+        attempts = 0
+
+        params = {
+            "keywords": keywords,
+            "from_date": from_date,
+            "to_date": to_date,
+            "access_token": self.access_token
+        }
+
+        while attempts < MAX_RETRIES:
+            status_response = await self._run_blocking(self._check_task_status, params)
+            status = status_response.get('data', {}).get('status', '').lower()
+
+            logger.info(f"Task status for {keywords}: {status} (Attempt {attempts + 1}/{MAX_RETRIES})")
 
+            if status == 'finished':
+                return True
+            elif status == 'failed':
+                logger.error(f"Search task failed for {keywords}")
+                return False
+
+            logger.info(f"Waiting {wait_time} seconds before next check of {keywords}...")
+            await asyncio.sleep(wait_time)
+            self.telemetry.inc('sleep_seconds_total', wait_time, reason='poll')
+
+            wait_time = min(wait_time * 2, MAX_WAIT)
+            attempts += 1
+
+        logger.error(f"Max retries reached without completion for {keywords}")
+        return False
+
+    def _iter_result_pages(self, keywords: str, from_date: str, to_date: str,
+                           cursor: Optional[str] = None,
+                           page: int = 0) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Yield (items, next_cursor) for each page of a completed search task, starting at `cursor`."""
         while True:
             params = {
                 "keywords": keywords,
@@ -108,58 +194,257 @@ class TwitterSearchAPI:
                 "cursor": cursor
             }
             
+            start = time.perf_counter()
             try:
-                response = requests.get(f"{self.base_url}/post/posts", params=params)
+                response = self.transport.get(f"{self.base_url}/post/posts", params=params)
                 response.raise_for_status()
                 page_data = response.json().get('data', {})
-                
-                if 'items' in page_data:
-                    items = page_data['items']
-                    all_results.extend(items)
-                    logger.info(f"Retrieved page {page + 1} with {len(items)} items")
-                
-                page_info = page_data.get('page_info', {})
-                if not page_info.get('has_next_page', False):
-                    break
-                    
-                cursor = page_info.get('cursor')
-                page += 1
-                
             except requests.exceptions.RequestException as e:
                 logger.error(f"Failed to collect results: {e}")
                 raise
+                
+            items = page_data.get('items', [])
+            self.telemetry.inc('page_fetch_seconds_total', time.perf_counter() - start, keyword=keywords)
+            self.telemetry.inc('pages_total', keyword=keywords)
+            self.telemetry.inc('items_total', len(items), keyword=keywords)
+            if 'items' in page_data:
+                logger.info(f"Retrieved page {page + 1} with {len(items)} items")
+            
+            page_info = page_data.get('page_info', {})
+            has_next_page = page_info.get('has_next_page', False)
+            cursor = page_info.get('cursor') if has_next_page else None
+            yield items, cursor
+
+            if not has_next_page:
+                break
+                
+            page += 1
+
+    def _collect_results(self, keywords: str, from_date: str, to_date: str) -> List[Dict[str, Any]]:
+        """Collect all results from a completed search task."""
+        all_results = []
+        for items, _ in self._iter_result_pages(keywords, from_date, to_date):
+            all_results.extend(items)
 
         logger.info(f"Total results retrieved: {len(all_results)}")
         return all_results
 
+    def _output_path(self, keyword: str, period: str) -> str:
+        """Return the output path for a keyword/period pair, creating the period directory."""
+        period_dir = os.path.join(OUTPUT_DIR, period)
+        os.makedirs(period_dir, exist_ok=True)
+
+        extension = EXTENSIONS[self.output_format]
+        return os.path.join(period_dir, f"{period}({self._safe_keyword(keyword)}){extension}")
+
+    def _safe_keyword(self, keyword: str) -> str:
+        """Return the keyword in the form used in output file names."""
+        return keyword.replace('#', '').replace('/', '_')
+
+    def _shard_key(self, period: str, from_date: str, to_date: str) -> str:
+        """Return the checkpoint key of a date-range shard."""
+        return f"{period}:{from_date}..{to_date}"
+
+    def _shard_dir(self, keyword: str, period: str) -> str:
+        """Return the directory holding the date-range shards of a keyword/period pair."""
+        return os.path.join(OUTPUT_DIR, period, '.shards', f"{period}({self._safe_keyword(keyword)})")
+
+    def _shard_path(self, keyword: str, period: str, from_date: str, to_date: str) -> str:
+        """Return the path of a date-range shard (a CSV or a staged Arrow stream), creating its directory."""
+        shard_dir = self._shard_dir(keyword, period)
+        with self._shard_dirs_lock:
+            os.makedirs(shard_dir, exist_ok=True)
+        extension = EXTENSIONS['csv'] if self.output_format == 'csv' else STAGING_EXTENSION
+        return os.path.join(shard_dir, f"{from_date}_{to_date}{extension}")
+
+    def _archive_path(self, keyword: str, period: str, from_date: Optional[str] = None,
+                      to_date: Optional[str] = None) -> str:
+        """Return the raw archive path of a keyword/period pair, or of one of its shards."""
+        if from_date:
+            return os.path.join(self._shard_dir(keyword, period), f"{from_date}_{to_date}{self.archive.extension}")
+
+        archive_dir = os.path.join(ARCHIVE_DIR, period)
+        os.makedirs(archive_dir, exist_ok=True)
+        return os.path.join(archive_dir, f"{period}({self._safe_keyword(keyword)}){self.archive.extension}")
+
+    def _drop_seen(self, items: List[Dict[str, Any]], keyword: str, period: str) -> List[Dict[str, Any]]:
+        """Drop tweets already saved under another keyword/period when deduplication is enabled."""
+        if self.seen_index is None:
+            return items
+        return self.seen_index.filter_new(items, keyword, period)
+
+    def _watermark_key(self, created_time: str, tweet_id: Any) -> Tuple[str, int]:
+        """Sort key ordering tweets by created_time, then by (snowflake) tweet id."""
+        tweet_id = str(tweet_id) if tweet_id is not None else ''
+        return created_time or '', int(tweet_id) if tweet_id.isdigit() else -1
+
+    def _newer(self, first: Optional[Dict[str, Any]],
+               second: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the newer of two watermarks, either of which may be None."""
+        if first is None:
+            return second
+        if second is None:
+            return first
+        if (self._watermark_key(second['created_time'], second['tweet_id']) >
+                self._watermark_key(first['created_time'], first['tweet_id'])):
+            return second
+        return first
+
+    def _newest(self, items: List[Dict[str, Any]],
+                newest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return the newer of `newest` and the newest tweet in `items`, as a watermark."""
+        for item in items:
+            if item.get('created_time'):
+                tweet_id = str(item['id']) if item.get('id') is not None else None
+                newest = self._newer(newest, {'created_time': item['created_time'], 'tweet_id': tweet_id})
+        return newest
+
+    def _drop_old(self, items: List[Dict[str, Any]], keyword: str, period: str) -> List[Dict[str, Any]]:
+        """Drop tweets at or below the saved high-watermark when collecting incrementally."""
+        if not self.incremental:
+            return items
+
+        watermark = self.checkpoints.get_watermark(keyword, period)
+        if watermark is None:
+            return items
+
+        floor = self._watermark_key(watermark['created_time'], watermark['tweet_id'])
+        return [
+            item for item in items
+            if self._watermark_key(item.get('created_time'), item.get('id')) > floor
+        ]
+
+    def _update_watermark(self, keyword: str, period: str, newest: Optional[Dict[str, Any]]):
+        """Raise the stored high-watermark of a keyword/period pair to `newest`."""
+        current = self.checkpoints.get_watermark(keyword, period)
+        if newest is not None and self._newer(current, newest) is not current:
+            self.checkpoints.set_watermark(keyword, period, newest['created_time'], newest['tweet_id'])
+
+    def _effective_range(self, keyword: str, date_range: DateRange) -> Optional[DateRange]:
+        """
+        Return the part of a date range still to be collected.
+        
+        Outside incremental mode this is the range itself. Incrementally, the
+        start moves up to the day of the saved high-watermark; None means the
+        watermark is already past the end of the range.
+        """
+        if not self.incremental:
+            return date_range
+
+        watermark = self.checkpoints.get_watermark(keyword, date_range.name)
+        if watermark is None:
+            return date_range
+
+        watermark_date = watermark['created_time'][:10]
+        try:
+            datetime.strptime(watermark_date, "%Y-%m-%d")
+        except ValueError:
+            return date_range
+
+        if watermark_date > date_range.end_date:
+            logger.info(f"Skipping {keyword} for {date_range.name}: nothing after {watermark['created_time']}")
+            return None
+
+        start_date = max(date_range.start_date, watermark_date)
+        if start_date != date_range.start_date:
+            logger.info(f"Collecting {keyword} for {date_range.name} incrementally from {start_date}")
+        return DateRange(date_range.name, start_date, date_range.end_date)
+
+    def _publish(self, part_filename: str, filename: str, header: bool = True):
+        """
+        Move a finished `.part` file into place.
+        
+        In incremental mode an existing output is kept and the new rows (without
+        the header, for CSVs) are appended to it; the combined file replaces the
+        old one atomically.
+        """
+        if not (self.incremental and os.path.exists(filename)):
+            os.replace(part_filename, filename)
+            return
+
+        tmp_filename = f"{filename}.tmp"
+        shutil.copyfile(filename, tmp_filename)
+        with open(tmp_filename, 'ab') as out, open(part_filename, 'rb') as part:
+            if header:
+                part.readline()
+            shutil.copyfileobj(part, out)
+
+        os.replace(tmp_filename, filename)
+        os.remove(part_filename)
+
+    def _publish_output(self, part_filenames: List[str], filename: str):
+        """
+        Write finished staged outputs into place in the output format.
+        
+        A single CSV part is moved (or appended) into place by _publish. Parquet
+        and Arrow parts are staged streams that are converted, together with
+        the existing output in incremental mode, into a temporary file that
+        then replaces the output atomically. Several CSV parts are concatenated
+        the same way.
+        """
+        if self.output_format == 'csv' and len(part_filenames) == 1:
+            self._publish(part_filenames[0], filename)
+            return
+
+        sources = list(part_filenames)
+        if self.incremental and os.path.exists(filename):
+            sources.insert(0, filename)
+
+        tmp_filename = f"{filename}.tmp"
+        write_output(sources, tmp_filename, self.output_format, OUTPUT_COMPRESSION)
+        os.replace(tmp_filename, filename)
+        for part_filename in part_filenames:
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+
+    def _prepare_dataframe(self, results: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Convert raw API items into the cleaned output DataFrame."""
+        with self.telemetry.timer('dataframe_build'):
+            # CSV output keeps the API's created_time strings; Parquet/Arrow store timestamps
+            df = create_tweet_dataframe(results, parse_dates=self.output_format != 'csv')
+            df = select_columns(df)
+            return clean_dataframe(df)
+
+    def _record_metrics(self, keyword: str, period: str, tweet_count: int):
+        """Append a collection metric entry for a saved keyword/period pair."""
+        self.metrics.append({
+            'keyword': keyword,
+            'period': period,
+            'tweet_count': tweet_count,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
     def _save_results(self, results: List[Dict[str, Any]], keyword: str, period: str):
-        """Save results to CSV file and update metrics."""
+        """Save results in the output format and update metrics."""
+        results = self._drop_old(results, keyword, period)
+        results = self._drop_seen(results, keyword, period)
         if not results:
             logger.warning(f"No results to save for {keyword} in {period}")
             return
 
         try:
-            # Create period directory
-            period_dir = os.path.join(OUTPUT_DIR, period)
-            os.makedirs(period_dir, exist_ok=True)
-
             # Process DataFrame
-            df = create_tweet_dataframe(results)
-            df = select_columns(df)
-            df = clean_dataframe(df)
+            df = self._prepare_dataframe(results)
             
             # Save to file
-            safe_keyword = keyword.replace('#', '').replace('/', '_')
-            filename = os.path.join(period_dir, f"{period}({safe_keyword}).csv")
-            df.to_csv(filename, index=False)
+            filename = self._output_path(keyword, period)
+            part_filename = f"{staged_path(filename, self.output_format)}.part"
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+            with self.telemetry.timer('output_write'):
+                append_frame(part_filename, df, self.output_format)
+                self._publish_output([part_filename], filename)
+
+            if self.archive is not None:
+                archive_filename = self._archive_path(keyword, period)
+                if os.path.exists(f"{archive_filename}.part"):
+                    os.remove(f"{archive_filename}.part")
+                self.archive.append(f"{archive_filename}.part", results)
+                self._publish(f"{archive_filename}.part", archive_filename, header=False)
             
             # Update metrics
-            self.metrics.append({
-                'keyword': keyword,
-                'period': period,
-                'tweet_count': len(results),
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
+            self._update_watermark(keyword, period, self._newest(results))
+            self._record_metrics(keyword, period, len(results))
             
             logger.info(f"Saved {len(results)} tweets to {filename}")
             
@@ -167,6 +452,262 @@ class TwitterSearchAPI:
             logger.error(f"Failed to save results: {e}")
             raise
 
+    def _stream_results(self, keywords: str, from_date: str, to_date: str, period: str,
+                        checkpoint: Optional[Dict[str, Any]] = None,
+                        shard_key: Optional[str] = None) -> int:
+        """
+        Collect a completed search task page by page, appending each page to disk.
+        
+        Pages are written to a `.part` file (a CSV, or an Arrow IPC stream for
+        Parquet/Arrow output) that is published over the final output once the
+        last cursor has been read, so peak memory is bounded by a
+        single page and an interrupted task never leaves a truncated output behind.
+        Progress is journalled after every page; given a `collecting`
+        checkpoint, the partial file is trimmed back to the last journalled
+        page and pagination continues from the saved cursor.
+        
+        When `shard_key` is given the task is one date-range shard of the
+        period: it is written to its shard file and journalled under the shard
+        key, and the caller merges and records the shards.
+        
+        In incremental mode, tweets at or below the period's high-watermark are
+        skipped and the new rows are appended to the existing output.
+        
+        The raw items of every written row are archived alongside, in a
+        `.part` archive journalled and published together with the output.
+        
+        Args:
+            keywords: Search keywords
+            from_date: Start date
+            to_date: End date
+            period: Date range name used for the output directory
+            checkpoint: Saved progress to resume from, if any
+            shard_key: Checkpoint key of the shard being collected, if any
+            
+        Returns:
+            int: Number of items returned by the API, before deduplication
+        """
+        if shard_key:
+            filename = self._shard_path(keywords, period, from_date, to_date)
+            task_key = shard_key
+        else:
+            filename = self._output_path(keywords, period)
+            task_key = period
+        part_filename = f"{staged_path(filename, self.output_format)}.part"
+        archive_filename = None
+        if self.archive is not None:
+            archive_filename = self._archive_path(keywords, period, *((from_date, to_date) if shard_key else ()))
+        archive_part = f"{archive_filename}.part" if archive_filename else None
+        cursor, pages, total, fetched = None, 0, 0, 0
+        archive_bytes = 0
+        finished_paging = False
+        newest = None
+
+        if checkpoint and checkpoint['state'] == COLLECTING and (
+                os.path.exists(part_filename) or checkpoint['rows_written'] == 0):
+            cursor = checkpoint['cursor']
+            pages = checkpoint['pages_written']
+            total = checkpoint['rows_written']
+            fetched = checkpoint['items_fetched']
+            newest = checkpoint['newest']
+            archive_bytes = checkpoint['archive_bytes']
+            finished_paging = cursor is None
+
+            # Drop any rows written after the last journalled page
+            if os.path.exists(part_filename):
+                with open(part_filename, 'r+b') as f:
+                    f.truncate(checkpoint['bytes_written'])
+            if archive_part and os.path.exists(archive_part):
+                with open(archive_part, 'r+b') as f:
+                    f.truncate(archive_bytes)
+
+            logger.info(f"Resuming {keywords} in {task_key} at page {pages + 1} ({total} tweets already saved)")
+        else:
+            for stale in (part_filename, archive_part):
+                if stale and os.path.exists(stale):
+                    os.remove(stale)
+
+        try:
+            if not finished_paging:
+                for items, cursor in self._iter_result_pages(keywords, from_date, to_date, cursor, pages):
+                    fetched += len(items)
+                    items = self._drop_old(items, keywords, period)
+                    items = self._drop_seen(items, keywords, period)
+                    newest = self._newest(items, newest)
+                    if items:
+                        df = self._prepare_dataframe(items)
+                        with self.telemetry.timer('output_write'):
+                            append_frame(part_filename, df, self.output_format)
+                        total += len(items)
+                        if archive_part:
+                            archive_bytes = self.archive.append(archive_part, items)
+
+                    pages += 1
+                    bytes_written = os.path.getsize(part_filename) if total else 0
+                    self.checkpoints.record_page(keywords, task_key, cursor, pages, total, bytes_written, fetched,
+                                                 newest, archive_bytes)
+
+        except Exception as e:
+            logger.error(f"Failed to stream results: {e}")
+            raise
+
+        self.checkpoints.mark_finished(keywords, task_key, pages, total, fetched, newest)
+
+        if total == 0:
+            logger.warning(f"No results to save for {keywords} in {task_key}")
+            return fetched
+
+        if shard_key:
+            os.replace(part_filename, filename)
+            if archive_part:
+                os.replace(archive_part, archive_filename)
+        else:
+            with self.telemetry.timer('output_write'):
+                self._publish_output([part_filename], filename)
+            if archive_part:
+                self._publish(archive_part, archive_filename, header=False)
+            self._update_watermark(keywords, period, newest)
+            self._record_metrics(keywords, period, total)
+        logger.info(f"Saved {total} tweets to {filename}")
+        return fetched
+
+    def _merge_shards(self, keyword: str, period: str, shards: List[Tuple[str, str]]):
+        """
+        Concatenate finished shard files, newest first, into the period's output
+        (and their raw archives into the period's archive).
+        
+        Args:
+            keyword: Search keyword
+            period: Date range name
+            shards: (shard_key, shard_file) pairs in output order
+        """
+        filename = self._output_path(keyword, period)
+        archive_filename = self._archive_path(keyword, period) if self.archive is not None else None
+        archive_part = f"{archive_filename}.part" if archive_filename else None
+        shard_files = []
+        total = 0
+        newest = None
+
+        if archive_part and os.path.exists(archive_part):
+            os.remove(archive_part)
+
+        with self.telemetry.timer('merge_shards'):
+            for shard_key, shard_file in shards:
+                checkpoint = self.checkpoints.get(keyword, shard_key)
+                if not checkpoint or not checkpoint['rows_written'] or not os.path.exists(shard_file):
+                    continue
+
+                shard_files.append(shard_file)
+                total += checkpoint['rows_written']
+
+                # Compressed members concatenate into a valid archive as they are
+                shard_archive = f"{os.path.splitext(shard_file)[0]}{self.archive.extension}" if archive_part else None
+                if shard_archive and os.path.exists(shard_archive):
+                    with open(archive_part, 'ab') as archive_out, open(shard_archive, 'rb') as f:
+                        shutil.copyfileobj(f, archive_out)
+                newest = self._newer(newest, checkpoint['newest'])
+
+            if shard_files:
+                self._publish_output(shard_files, filename)
+
+        self.checkpoints.mark_finished(keyword, period, len(shards), total)
+
+        if total == 0:
+            logger.warning(f"No results to save for {keyword} in {period}")
+        else:
+            if archive_part and os.path.exists(archive_part):
+                self._publish(archive_part, archive_filename, header=False)
+            self._update_watermark(keyword, period, newest)
+            self._record_metrics(keyword, period, total)
+            logger.info(f"Saved {total} tweets from {len(shards)} shards to {filename}")
+
+        shard_dir = self._shard_dir(keyword, period)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        with self._shard_dirs_lock:
+            try:
+                # Drop the period's .shards directory once its last keyword is merged
+                os.rmdir(os.path.dirname(shard_dir))
+            except OSError:
+                pass
+
+    def _task_checkpoint(self, keyword: str, period: str) -> Optional[Dict[str, Any]]:
+        """Return the saved progress of a task when resuming, or None to start it afresh."""
+        if not self.resume:
+            return None
+
+        checkpoint = self.checkpoints.get(keyword, period)
+        if checkpoint and checkpoint['state'] == FINISHED:
+            logger.info(f"Skipping {keyword} for {period}: already finished")
+        return checkpoint
+
+    def _collect_task(self, keyword: str, date_range: DateRange,
+                      checkpoint: Optional[Dict[str, Any]] = None):
+        """Collect and save the results of a finished search task."""
+        if self.stream_results:
+            self._stream_results(keyword, date_range.start_date, date_range.end_date,
+                                 date_range.name, checkpoint)
+            return
+
+        results = self._collect_results(keyword, date_range.start_date, date_range.end_date)
+        if results:
+            self._save_results(results, keyword, date_range.name)
+        self.checkpoints.mark_finished(keyword, date_range.name, 0, len(results))
+
+    def _run_task(self, keyword: str, date_range: DateRange):
+        """Search, collect and save one keyword/period pair."""
+        checkpoint = self._task_checkpoint(keyword, date_range.name)
+        if checkpoint and checkpoint['state'] == FINISHED:
+            return
+
+        date_range = self._effective_range(keyword, date_range)
+        if date_range is None:
+            return
+
+        if self.stream_results and checkpoint and checkpoint['state'] == COLLECTING:
+            self._collect_task(keyword, date_range, checkpoint)
+            return
+
+        logger.info(f"Starting search for period: {date_range.start_date} to {date_range.end_date}")
+        
+        self.checkpoints.mark_created(keyword, date_range.name)
+        self._create_search_task(keyword, date_range.start_date, date_range.end_date)
+        if not self._wait_for_completion(keyword, date_range.start_date, date_range.end_date):
+            self.checkpoints.mark_failed(keyword, date_range.name)
+            raise Exception("Search task failed to complete")
+
+        self._collect_task(keyword, date_range)
+
+    def export_telemetry(self, directory: str = TELEMETRY_DIR) -> Tuple[str, str]:
+        """
+        Write the run's telemetry as JSON and Prometheus text.
+        
+        Can be called at any point of a run; each call replaces the previous
+        export. The JSON export also carries the per-task metrics and the
+        transport and rate limiter counters.
+        
+        Args:
+            directory: Output directory for telemetry.json and telemetry.prom
+            
+        Returns:
+            Tuple[str, str]: Paths of the JSON and Prometheus files
+        """
+        self.telemetry.log_summary()
+        paths = self.telemetry.export(
+            directory,
+            tasks=self.metrics,
+            transport=self.transport.get_stats(),
+            rate_limiter=self.rate_limiter.get_stats()
+        )
+        logger.info(f"Telemetry exported to {paths[0]} and {paths[1]}")
+        return paths
+
+    def close(self):
+        """Release pooled connections and flush the checkpoint and seen-ID stores."""
+        self.transport.close()
+        self.checkpoints.close()
+        if self.seen_index is not None:
+            self.seen_index.close()
+
     def search_all(self, keywords: str, from_date: str, to_date: str) -> List[Dict[str, Any]]:
         """
         Perform complete search operation for given parameters.
@@ -202,16 +743,331 @@ class TwitterSearchAPI:
         for keyword in keywords:
             for date_range in date_ranges:
                 try:
-                    results = self.search_all(
-                        keyword, 
-                        date_range.start_date, 
-                        date_range.end_date
-                    )
-                    
-                    if results:
-                        self._save_results(results, keyword, date_range.name)
+                    self._run_task(keyword, date_range)
                         
                 except Exception as e:
                     logger.error(f"Error processing {keyword} for {date_range.name}: {e}")
-                
-                time.sleep(2) 
\ No newline at end of file
+
+        self.transport.log_stats()
+        logger.info(f"Rate limiter: {self.rate_limiter.get_stats()}")
+        self.export_telemetry()
+
+    async def _run_blocking(self, func, *args):
+        """Run a blocking call (HTTP request, DataFrame work) on the collector thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def search_all_async(self, keywords: str, from_date: str, to_date: str) -> List[Dict[str, Any]]:
+        """
+        Asynchronous counterpart of search_all.
+        
+        Task creation, status checks and pagination run on worker threads while
+        backoff waits are awaited, so other tasks progress in the meantime.
+        
+        Args:
+            keywords: Search keywords
+            from_date: Start date
+            to_date: End date
+            
+        Returns:
+            List of tweet data
+        """
+        logger.info(f"Starting search for {keywords}, period: {from_date} to {to_date}")
+        
+        await self._run_blocking(self._create_search_task, keywords, from_date, to_date)
+        if not await self._wait_for_completion_async(keywords, from_date, to_date):
+            raise Exception("Search task failed to complete")
+
+        return await self._run_blocking(self._collect_results, keywords, from_date, to_date)
+
+    async def _run_task_async(self, keyword: str, date_range: DateRange):
+        """Asynchronous counterpart of _run_task."""
+        checkpoint = self._task_checkpoint(keyword, date_range.name)
+        if checkpoint and checkpoint['state'] == FINISHED:
+            return
+
+        date_range = self._effective_range(keyword, date_range)
+        if date_range is None:
+            return
+
+        if self.stream_results and checkpoint and checkpoint['state'] == COLLECTING:
+            await self._run_blocking(self._collect_task, keyword, date_range, checkpoint)
+            return
+
+        logger.info(f"Starting search for {keyword}, period: {date_range.start_date} to {date_range.end_date}")
+
+        self.checkpoints.mark_created(keyword, date_range.name)
+        await self._run_blocking(self._create_search_task, keyword,
+                                 date_range.start_date, date_range.end_date)
+        if not await self._wait_for_completion_async(keyword, date_range.start_date, date_range.end_date):
+            self.checkpoints.mark_failed(keyword, date_range.name)
+            raise Exception("Search task failed to complete")
+
+        await self._run_blocking(self._collect_task, keyword, date_range)
+
+    async def _run_shard_async(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange,
+                               from_date: str, to_date: str) -> List[Tuple[str, str]]:
+        """
+        Collect one date-range shard, bisecting it while it comes back at the post cap.
+        
+        Returns:
+            List[Tuple[str, str]]: (shard_key, shard_file) of every leaf shard, newest first
+        """
+        shard_key = self._shard_key(date_range.name, from_date, to_date)
+        shard_file = self._shard_path(keyword, date_range.name, from_date, to_date)
+        checkpoint = self.checkpoints.get(keyword, shard_key) if self.resume else None
+        state = checkpoint['state'] if checkpoint else None
+
+        if state in (FINISHED, SPLIT):
+            fetched = checkpoint['items_fetched']
+        else:
+            async with semaphore:
+                if state == COLLECTING:
+                    fetched = await self._run_blocking(self._stream_results, keyword, from_date, to_date,
+                                                       date_range.name, checkpoint, shard_key)
+                else:
+                    logger.info(f"Starting search for {keyword}, shard {shard_key}")
+                    self.checkpoints.mark_created(keyword, shard_key)
+                    await self._run_blocking(self._create_search_task, keyword, from_date, to_date)
+                    if not await self._wait_for_completion_async(keyword, from_date, to_date):
+                        self.checkpoints.mark_failed(keyword, shard_key)
+                        raise Exception(f"Search task failed to complete for {shard_key}")
+
+                    fetched = await self._run_blocking(self._stream_results, keyword, from_date, to_date,
+                                                       date_range.name, None, shard_key)
+
+        if fetched < MAX_POSTS:
+            return [(shard_key, shard_file)]
+
+        halves = bisect_window(from_date, to_date)
+        if halves is None:
+            logger.warning(f"{keyword} reached the {MAX_POSTS} post cap on {from_date}; that day may be truncated")
+            return [(shard_key, shard_file)]
+
+        logger.info(f"{keyword} reached the {MAX_POSTS} post cap in {shard_key}; splitting it in two")
+        self.checkpoints.mark_split(keyword, shard_key, fetched)
+        if os.path.exists(shard_file):
+            os.remove(shard_file)
+
+        parts = await asyncio.gather(*(
+            self._run_shard_async(semaphore, keyword, date_range, start, end)
+            for start, end in halves
+        ))
+        return [shard for part in parts for shard in part]
+
+    async def _run_sharded_async(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange):
+        """Collect a keyword/period pair as parallel date-range shards and merge them."""
+        checkpoint = self._task_checkpoint(keyword, date_range.name)
+        if checkpoint and checkpoint['state'] == FINISHED:
+            return
+
+        date_range = self._effective_range(keyword, date_range)
+        if date_range is None:
+            return
+
+        windows = split_window(date_range.start_date, date_range.end_date, self.shard_days)
+        logger.info(f"Collecting {keyword} for {date_range.name} as {len(windows)} shards")
+
+        parts = await asyncio.gather(*(
+            self._run_shard_async(semaphore, keyword, date_range, start, end)
+            for start, end in windows
+        ))
+        shards = [shard for part in parts for shard in part]
+        await self._run_blocking(self._merge_shards, keyword, date_range.name, shards)
+
+    async def _process_keyword_async(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange):
+        """Run one create/poll/paginate/save workflow while holding a concurrency slot."""
+        try:
+            if self.shard_days:
+                # Each shard takes its own slot, so the pair itself must not hold one
+                await self._run_sharded_async(semaphore, keyword, date_range)
+            else:
+                async with semaphore:
+                    await self._run_task_async(keyword, date_range)
+
+        except Exception as e:
+            logger.error(f"Error processing {keyword} for {date_range.name}: {e}")
+
+    async def process_keywords_async(self, keywords: List[str], date_ranges: List[DateRange],
+                                     concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Process multiple keywords across date ranges with up to `concurrency`
+        search workflows in flight at once.
+        
+        Each (keyword, date range) pair is saved to the same file as in
+        process_keywords, so outputs are identical to a sequential run.
+        
+        Args:
+            keywords: List of keywords to search
+            date_ranges: List of date ranges to search within
+            concurrency: Maximum number of concurrent search workflows
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        logger.info(
+            f"Processing {len(keywords)} keywords across {len(date_ranges)} date ranges "
+            f"with concurrency {concurrency}"
+        )
+
+        semaphore = asyncio.Semaphore(concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='collector') as executor:
+            self._executor = executor
+            try:
+                await asyncio.gather(*(
+                    self._process_keyword_async(semaphore, keyword, date_range)
+                    for keyword in keywords
+                    for date_range in date_ranges
+                ))
+            finally:
+                self._executor = None
+
+        self.transport.log_stats()
+        logger.info(f"Rate limiter: {self.rate_limiter.get_stats()}")
+        self.export_telemetry()
+
+    async def _submit_task(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange) -> bool:
+        """Create the search task for one keyword/period pair, returning whether it was accepted."""
+        async with semaphore:
+            try:
+                self.checkpoints.mark_created(keyword, date_range.name)
+                await self._run_blocking(self._create_search_task, keyword,
+                                         date_range.start_date, date_range.end_date)
+                return True
+            except Exception as e:
+                logger.error(f"Error creating search task for {keyword} in {date_range.name}: {e}")
+                return False
+
+    async def _poll_task(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange) -> str:
+        """Return the current status of one outstanding search task."""
+        params = {
+            "keywords": keyword,
+            "from_date": date_range.start_date,
+            "to_date": date_range.end_date,
+            "access_token": self.access_token
+        }
+
+        async with semaphore:
+            try:
+                status_response = await self._run_blocking(self._check_task_status, params)
+                return status_response.get('data', {}).get('status', '').lower()
+            except Exception as e:
+                logger.error(f"Error checking task status for {keyword} in {date_range.name}: {e}")
+                return ''
+
+    async def _collect_task_async(self, semaphore: asyncio.Semaphore, keyword: str, date_range: DateRange,
+                                  checkpoint: Optional[Dict[str, Any]] = None):
+        """Collect a finished search task while holding a collection slot."""
+        async with semaphore:
+            try:
+                await self._run_blocking(self._collect_task, keyword, date_range, checkpoint)
+            except Exception as e:
+                logger.error(f"Error processing {keyword} for {date_range.name}: {e}")
+
+    async def process_keywords_submitted(self, keywords: List[str], date_ranges: List[DateRange],
+                                         concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Create every search task up front, then poll all outstanding tasks
+        together and collect each one as soon as it reports `finished`.
+        
+        Server-side processing of all tasks overlaps instead of each task
+        waiting behind the previous task's backoff. A single poller checks
+        every outstanding task once per round; the interval between rounds
+        starts at INITIAL_WAIT and doubles up to POLL_INTERVAL_MAX.
+        
+        Args:
+            keywords: List of keywords to search
+            date_ranges: List of date ranges to search within
+            concurrency: Maximum number of concurrent collections (and of
+                concurrent create/status requests)
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        if self.shard_days:
+            logger.warning("Date-range sharding is not applied in submission mode")
+
+        logger.info(
+            f"Submitting {len(keywords) * len(date_ranges)} search tasks "
+            f"with collection concurrency {concurrency}"
+        )
+
+        request_slots = asyncio.Semaphore(concurrency)
+        collection_slots = asyncio.Semaphore(concurrency)
+        collections = []
+
+        with ThreadPoolExecutor(max_workers=concurrency * 2, thread_name_prefix='collector') as executor:
+            self._executor = executor
+            try:
+                to_submit = []
+                for keyword in keywords:
+                    for date_range in date_ranges:
+                        checkpoint = self._task_checkpoint(keyword, date_range.name)
+                        if checkpoint and checkpoint['state'] == FINISHED:
+                            continue
+
+                        date_range = self._effective_range(keyword, date_range)
+                        if date_range is None:
+                            continue
+
+                        if self.stream_results and checkpoint and checkpoint['state'] == COLLECTING:
+                            collections.append(asyncio.create_task(
+                                self._collect_task_async(collection_slots, keyword, date_range, checkpoint)
+                            ))
+                        else:
+                            to_submit.append((keyword, date_range))
+
+                accepted = await asyncio.gather(*(
+                    self._submit_task(request_slots, keyword, date_range)
+                    for keyword, date_range in to_submit
+                ))
+                outstanding = [task for task, ok in zip(to_submit, accepted) if ok]
+                logger.info(f"Created {len(outstanding)} of {len(to_submit)} search tasks")
+
+                wait_time = INITIAL_WAIT
+                rounds = 0
+                while outstanding:
+                    statuses = await asyncio.gather(*(
+                        self._poll_task(request_slots, keyword, date_range)
+                        for keyword, date_range in outstanding
+                    ))
+                    rounds += 1
+
+                    pending = []
+                    for (keyword, date_range), status in zip(outstanding, statuses):
+                        if status == 'finished':
+                            logger.info(f"Search task finished for {keyword} in {date_range.name}")
+                            collections.append(asyncio.create_task(
+                                self._collect_task_async(collection_slots, keyword, date_range)
+                            ))
+                        elif status == 'failed':
+                            logger.error(f"Search task failed for {keyword} in {date_range.name}")
+                            self.checkpoints.mark_failed(keyword, date_range.name)
+                        else:
+                            pending.append((keyword, date_range))
+                    outstanding = pending
+
+                    if not outstanding:
+                        break
+
+                    if rounds >= MAX_POLL_ROUNDS:
+                        for keyword, date_range in outstanding:
+                            logger.error(f"Max polling rounds reached without completion for {keyword} in {date_range.name}")
+                            self.checkpoints.mark_failed(keyword, date_range.name)
+                        break
+
+                    logger.info(
+                        f"{len(outstanding)} search tasks still processing "
+                        f"(round {rounds}/{MAX_POLL_ROUNDS}); next check in {wait_time} seconds"
+                    )
+                    await asyncio.sleep(wait_time)
+                    self.telemetry.inc('sleep_seconds_total', wait_time, reason='poll')
+                    wait_time = min(wait_time * 2, POLL_INTERVAL_MAX)
+
+                await asyncio.gather(*collections)
+            finally:
+                self._executor = None
+
+        self.transport.log_stats()
+        logger.info(f"Rate limiter: {self.rate_limiter.get_stats()}")
+        self.export_telemetry()
\ No newline at end of file
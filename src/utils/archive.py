@@ -0,0 +1,117 @@
+import gzip
+import io
+import json
+import os
+from typing import Dict, Any, Iterator, List
+from src.utils.logger import setup_logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = setup_logger('archive')
+
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+def resolve_codec(codec: str = 'auto') -> str:
+    """
+    Pick the archive compression codec.
+
+    Args:
+        codec: 'zstd', 'gzip' or 'auto' (zstd when the zstandard package is installed)
+
+    Returns:
+        str: 'zstd' or 'gzip'
+    """
+    if codec == 'auto':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if codec not in EXTENSIONS:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError("The zstandard package is required for zstd archives")
+    return codec
+
+def codec_for_path(path: str) -> str:
+    """Return the codec of an archive file from its extension."""
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension) or path.endswith(f"{extension}.part"):
+            return codec
+    raise ValueError(f"Not a raw archive file: {path}")
+
+class RawArchive:
+    """
+    Append-only archive of raw API items as compressed JSON Lines.
+
+    Each appended batch (one result page) becomes its own gzip member or zstd
+    frame, so a file can be extended, truncated back to a batch boundary or
+    concatenated with another archive of the same codec without
+    recompressing anything. Readers decode every member in order.
+    """
+
+    def __init__(self, codec: str = 'auto', level: int = 3):
+        """
+        Args:
+            codec: 'zstd', 'gzip' or 'auto'
+            level: Compression level
+        """
+        self.codec = resolve_codec(codec)
+        self.level = level
+        self.extension = EXTENSIONS[self.codec]
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=self.level)
+
+    def append(self, path: str, records: List[Dict[str, Any]]) -> int:
+        """
+        Append records to an archive file as one compressed batch.
+
+        Args:
+            path: Archive file, created if missing
+            records: Raw items to archive
+
+        Returns:
+            int: Size of the archive file after the append
+        """
+        if records:
+            data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            with open(path, 'ab') as f:
+                f.write(self._compress(data.encode('utf-8')))
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the records of an archive file.
+
+    Args:
+        path: Archive file written by RawArchive
+
+    Yields:
+        Dict[str, Any]: Raw items in the order they were archived
+    """
+    codec = codec_for_path(path)
+    with open(path, 'rb') as raw:
+        if codec == 'zstd':
+            if zstandard is None:
+                raise ImportError("The zstandard package is required to read zstd archives")
+            binary = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            binary = gzip.GzipFile(fileobj=raw)
+
+        with io.TextIOWrapper(binary, encoding='utf-8') as lines:
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+def iter_batches(path: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Stream the records of an archive file in lists of up to `batch_size`."""
+    batch = []
+    for record in iter_records(path):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+from src.utils.logger import setup_logger
+
+logger = setup_logger('checkpoint')
+
+# Task states recorded per (keyword, period)
+CREATED = 'created'
+COLLECTING = 'collecting'
+FINISHED = 'finished'
+FAILED = 'failed'
+SPLIT = 'split'
+
+class CheckpointStore:
+    """
+    Durable per-task progress journal backed by SQLite.
+
+    One row is kept per (keyword, period) with the task state, the cursor of
+    the next page to fetch, how many items have been fetched and how many
+    pages, rows and bytes have been written to the partial output file. Every
+    update is committed immediately, so the journal always describes what is
+    safely on disk. Date-range shards are journalled under their own period
+    key, e.g. "PRE_COP:2024-10-11..2024-10-17".
+
+    The store also keeps a high-watermark per (keyword, period): the newest
+    (created_time, tweet id) already saved, used by incremental collection.
+    While a task is collecting, the newest tweet written so far is journalled
+    with its progress so a resumed task still knows it.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Location of the SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                keyword TEXT NOT NULL,
+                period TEXT NOT NULL,
+                state TEXT NOT NULL,
+                cursor TEXT,
+                pages_written INTEGER NOT NULL DEFAULT 0,
+                rows_written INTEGER NOT NULL DEFAULT 0,
+                bytes_written INTEGER NOT NULL DEFAULT 0,
+                items_fetched INTEGER NOT NULL DEFAULT 0,
+                newest_time TEXT,
+                newest_id TEXT,
+                archive_bytes INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (keyword, period)
+            )
+        """)
+
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                keyword TEXT NOT NULL,
+                period TEXT NOT NULL,
+                created_time TEXT NOT NULL,
+                tweet_id TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (keyword, period)
+            )
+        """)
+
+        # Journals created before items_fetched, the newest tweet and the archive size were tracked
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'items_fetched' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN items_fetched INTEGER NOT NULL DEFAULT 0")
+        if 'newest_time' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN newest_time TEXT")
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN newest_id TEXT")
+        if 'archive_bytes' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN archive_bytes INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    def get(self, keyword: str, period: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded progress of a task.
+
+        Args:
+            keyword: Search keyword
+            period: Date range name
+
+        Returns:
+            Optional[Dict[str, Any]]: Checkpoint row, or None if the task was never started
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, cursor, pages_written, rows_written, bytes_written, items_fetched, "
+                "newest_time, newest_id, archive_bytes, updated_at "
+                "FROM tasks WHERE keyword = ? AND period = ?",
+                (keyword, period)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'state': row[0],
+            'cursor': row[1],
+            'pages_written': row[2],
+            'rows_written': row[3],
+            'bytes_written': row[4],
+            'items_fetched': row[5],
+            'newest': {'created_time': row[6], 'tweet_id': row[7]} if row[6] else None,
+            'archive_bytes': row[8],
+            'updated_at': row[9]
+        }
+
+    def _write(self, keyword: str, period: str, state: str, cursor: Optional[str] = None,
+               pages_written: int = 0, rows_written: int = 0, bytes_written: int = 0,
+               items_fetched: int = 0, newest: Optional[Dict[str, Any]] = None,
+               archive_bytes: int = 0):
+        newest = newest or {}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks "
+                "(keyword, period, state, cursor, pages_written, rows_written, bytes_written, "
+                "items_fetched, newest_time, newest_id, archive_bytes, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (keyword, period, state, cursor, pages_written, rows_written, bytes_written,
+                 items_fetched, newest.get('created_time'), newest.get('tweet_id'), archive_bytes,
+                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            self._conn.commit()
+
+    def mark_created(self, keyword: str, period: str):
+        """Record that a search task was (re)created, discarding earlier progress."""
+        self._write(keyword, period, CREATED)
+
+    def record_page(self, keyword: str, period: str, cursor: Optional[str],
+                    pages_written: int, rows_written: int, bytes_written: int,
+                    items_fetched: int, newest: Optional[Dict[str, Any]] = None,
+                    archive_bytes: int = 0):
+        """
+        Record that a page has been flushed to the partial output file.
+
+        Args:
+            keyword: Search keyword
+            period: Date range name
+            cursor: Cursor of the next page, or None when the last page was written
+            pages_written: Pages written so far
+            rows_written: Rows written so far
+            bytes_written: Size of the partial output file after the page
+            items_fetched: Items returned by the API so far, before deduplication
+            newest: created_time and tweet_id of the newest tweet written so far
+            archive_bytes: Size of the partial raw archive file after the page
+        """
+        self._write(keyword, period, COLLECTING, cursor, pages_written, rows_written, bytes_written,
+                    items_fetched, newest, archive_bytes)
+
+    def mark_finished(self, keyword: str, period: str, pages_written: int, rows_written: int,
+                      items_fetched: int = 0, newest: Optional[Dict[str, Any]] = None):
+        """Record that a task's output is complete."""
+        self._write(keyword, period, FINISHED, None, pages_written, rows_written, 0, items_fetched, newest)
+
+    def mark_split(self, keyword: str, period: str, items_fetched: int):
+        """Record that a shard hit the post cap and was replaced by smaller shards."""
+        self._write(keyword, period, SPLIT, items_fetched=items_fetched)
+
+    def mark_failed(self, keyword: str, period: str):
+        """Record that a task failed and must be started again."""
+        self._write(keyword, period, FAILED)
+
+    def get_watermark(self, keyword: str, period: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the newest tweet already saved for a keyword/period pair.
+
+        Args:
+            keyword: Search keyword
+            period: Date range name (or shard key)
+
+        Returns:
+            Optional[Dict[str, Any]]: created_time and tweet_id, or None if nothing was saved yet
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_time, tweet_id FROM watermarks WHERE keyword = ? AND period = ?",
+                (keyword, period)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {'created_time': row[0], 'tweet_id': row[1]}
+
+    def set_watermark(self, keyword: str, period: str, created_time: str, tweet_id: Optional[str]):
+        """Record the newest tweet saved for a keyword/period pair."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (keyword, period, created_time, tweet_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (keyword, period, created_time, tweet_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
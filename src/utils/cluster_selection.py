@@ -0,0 +1,177 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+try:
+    import scipy.sparse as sp
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.metrics import silhouette_samples
+except ImportError:
+    KMeans = None
+
+logger = setup_logger('cluster_selection')
+
+CRITERIA = ('silhouette', 'elbow', 'calinski_harabasz')
+ALGORITHMS = ('auto', 'kmeans', 'minibatch')
+
+# Two-sided 95% normal quantile for the silhouette confidence interval
+Z_95 = 1.959964
+
+def _fit(matrix, k: int, algorithm: str, n_init: int, random_state: int, batch_size: int,
+         sample_weight: Optional[np.ndarray]):
+    """Fit one k of the sweep (runs in a worker process)."""
+    start = time.perf_counter()
+    if algorithm == 'minibatch':
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=n_init, batch_size=batch_size)
+    else:
+        model = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+    labels = model.fit_predict(matrix, sample_weight=sample_weight)
+    return model, labels, time.perf_counter() - start
+
+def stratified_sample(labels: np.ndarray, size: int, random_state: int = 42) -> np.ndarray:
+    """
+    Pick about `size` positions with every cluster in proportion to its size.
+
+    Every cluster keeps at least two points (when it has them), so each
+    sampled point has a cluster-mate to measure its silhouette against.
+    """
+    if size >= len(labels):
+        return np.arange(len(labels))
+    rng = np.random.default_rng(random_state)
+    clusters, counts = np.unique(labels, return_counts=True)
+    quota = np.minimum(np.maximum(np.round(counts * size / len(labels)).astype(int), 2), counts)
+    picked = [rng.choice(np.flatnonzero(labels == cluster), n, replace=False) for cluster, n in zip(clusters, quota)]
+    return np.sort(np.concatenate(picked))
+
+def sampled_silhouette(matrix, labels: np.ndarray, sample_size: int, random_state: int = 42) -> Dict[str, float]:
+    """
+    Estimate the mean silhouette from a stratified sample.
+
+    With `sample_size` at least the number of points this is the exact
+    silhouette score. Otherwise the interval is the mean plus or minus 1.96
+    standard errors of the sampled points' silhouettes (with the finite
+    population correction).
+
+    Returns:
+        Dict[str, float]: silhouette, silhouette_low, silhouette_high, sample size
+    """
+    sample = stratified_sample(labels, sample_size, random_state)
+    values = silhouette_samples(matrix[sample], labels[sample])
+    mean = float(values.mean())
+    n, population = len(sample), len(labels)
+    if n >= population:
+        margin = 0.0
+    else:
+        margin = Z_95 * values.std(ddof=1) / np.sqrt(n) * np.sqrt((population - n) / (population - 1))
+    return {'silhouette': mean, 'silhouette_low': mean - margin, 'silhouette_high': mean + margin,
+            'silhouette_sample': n}
+
+def calinski_harabasz(matrix, labels: np.ndarray) -> float:
+    """
+    Calinski-Harabasz score, computed from per-cluster sums so sparse matrices stay sparse.
+
+    Matches sklearn.metrics.calinski_harabasz_score, which needs a dense matrix.
+    """
+    n, k = matrix.shape[0], len(np.unique(labels))
+    _, codes = np.unique(labels, return_inverse=True)
+    indicator = sp.csr_matrix((np.ones(n), (codes, np.arange(n))), shape=(k, n))
+    sums = indicator @ matrix
+    sums = sums.toarray() if sp.issparse(sums) else np.asarray(sums)
+    sizes = np.bincount(codes).astype(float)
+    mean = sums.sum(axis=0) / n
+    squared_norms = matrix.multiply(matrix).sum() if sp.issparse(matrix) else float((matrix ** 2).sum())
+    # Total = within + between; within = sum ||x||^2 - sum n_k ||c_k||^2
+    between = float((sizes[:, None] * (sums / sizes[:, None] - mean) ** 2).sum())
+    within = float(squared_norms) - float(((sums ** 2).sum(axis=1) / sizes).sum())
+    if within <= 0:
+        return 1.0
+    return between * (n - k) / (within * (k - 1))
+
+def elbow(k_values: Iterable[int], inertias: Iterable[float]) -> int:
+    """The k farthest below the straight line from the first to the last inertia."""
+    k_values, inertias = np.asarray(list(k_values), dtype=float), np.asarray(list(inertias), dtype=float)
+    if len(k_values) < 3:
+        return int(k_values[np.argmin(inertias)])
+    x = (k_values - k_values[0]) / (k_values[-1] - k_values[0])
+    span = inertias[0] - inertias[-1]
+    y = (inertias - inertias[-1]) / span if span > 0 else np.zeros_like(inertias)
+    # The chord runs from (0, 1) to (1, 0); the knee is furthest below it
+    return int(k_values[np.argmax((1 - x) - y)])
+
+def select_k(matrix, k_values: Iterable[int], criterion: str = 'silhouette', algorithm: str = 'auto',
+             n_init: int = 10, random_state: int = 42, sample_size: int = 10_000,
+             minibatch_above: int = 20_000, batch_size: int = 4096,
+             sample_weight: Optional[np.ndarray] = None,
+             workers: Optional[int] = None) -> Tuple[int, pd.DataFrame, Dict[int, tuple]]:
+    """
+    Fit k-means for every k in parallel and choose k by one of several criteria.
+
+    Args:
+        matrix: Feature matrix (e.g. TF-IDF, sparse or dense)
+        k_values: Numbers of clusters to try
+        criterion: 'silhouette' (highest sampled silhouette), 'elbow' (knee
+            of the inertia curve) or 'calinski_harabasz' (highest score)
+        algorithm: 'kmeans', 'minibatch', or 'auto' (MiniBatchKMeans above
+            `minibatch_above` rows)
+        n_init: Initializations per k
+        random_state: Seed of the fits and of the silhouette sample
+        sample_size: Points in the silhouette sample; with at least as many
+            rows the silhouette is exact
+        minibatch_above: Row count from which 'auto' uses MiniBatchKMeans
+        batch_size: MiniBatchKMeans batch size
+        sample_weight: Weight of each row in the fits
+        workers: Processes fitting the sweep (default: one per CPU, at most one per k)
+
+    Returns:
+        Tuple[int, pd.DataFrame, dict]: The chosen k; per k the inertia,
+        silhouette with its 95% interval, Calinski-Harabasz score and fit
+        time; and the fitted model and labels of every k
+    """
+    if KMeans is None:
+        raise ImportError("scikit-learn and scipy are required for cluster selection")
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {list(CRITERIA)}, not {criterion!r}")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"algorithm must be one of {list(ALGORITHMS)}, not {algorithm!r}")
+    k_values = list(k_values)
+    if not k_values:
+        raise ValueError("No numbers of clusters to try")
+    if algorithm == 'auto':
+        algorithm = 'minibatch' if matrix.shape[0] > minibatch_above else 'kmeans'
+
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(k_values))
+    args = (algorithm, n_init, random_state, batch_size, sample_weight)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fits = list(executor.map(_fit, *zip(*[(matrix, k) + args for k in k_values])))
+    else:
+        fits = [_fit(matrix, k, *args) for k in k_values]
+
+    rows, models = [], {}
+    for k, (model, labels, fit_seconds) in zip(k_values, fits):
+        models[k] = (model, labels)
+        row = {'k': k, 'inertia': float(model.inertia_), 'fit_seconds': fit_seconds}
+        # Silhouette is the quadratic criterion, so it is only computed when chosen by it
+        if criterion == 'silhouette':
+            row.update(sampled_silhouette(matrix, labels, sample_size, random_state))
+        row['calinski_harabasz'] = calinski_harabasz(matrix, labels)
+        rows.append(row)
+    scores = pd.DataFrame(rows).set_index('k')
+
+    if criterion == 'silhouette':
+        best_k = int(scores['silhouette'].idxmax())
+    elif criterion == 'calinski_harabasz':
+        best_k = int(scores['calinski_harabasz'].idxmax())
+    else:
+        best_k = elbow(scores.index, scores['inertia'])
+
+    logger.info(
+        f"Chose k={best_k} by {criterion} from k={k_values[0]}..{k_values[-1]} "
+        f"({algorithm}, {workers} workers) in {time.perf_counter() - start:.1f}s"
+    )
+    return best_k, scores, models
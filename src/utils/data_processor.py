@@ -1,19 +1,255 @@
-import re
+from itertools import chain
+from operator import itemgetter, ne
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from src.utils.logger import setup_logger
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
 logger = setup_logger('data_processor')
 
-def create_tweet_dataframe(tweets: List[Dict[str, Any]]) -> pd.DataFrame:
+# Raw field -> output column for each kind of column the builder fills
+STRING_FIELDS = {'id': 'tweet_id', 'author_username': 'author_username', 'text': 'text'}
+CATEGORY_FIELDS = {'text_lang': 'text_lang', 'post_type': 'post_type', 'source': 'source'}
+COUNT_FIELDS = {
+    'favorite_count': ('favorite_count', np.int32),
+    'reply_count': ('reply_count', np.int32),
+    'retweet_count': ('retweet_count', np.int32),
+    'view_count': ('view_count', np.int64)
+}
+LIST_FIELDS = {
+    'text_tags': 'text_tags',
+    'text_tagged_users': 'text_tagged_users',
+    'attached_links_expanded_url': 'attached_links'
+}
+COLUMN_ORDER = [
+    'tweet_id', 'author_username', 'created_time', 'text', 'text_lang', 'post_type',
+    'favorite_count', 'reply_count', 'retweet_count', 'view_count', 'source',
+    'text_tags', 'text_tagged_users', 'attached_links'
+]
+
+# Fields read in the single walk over a batch (the list fields are taken as they are)
+SCALAR_FIELDS = [*STRING_FIELDS, 'created_time', *CATEGORY_FIELDS, *COUNT_FIELDS]
+
+# Characters clean_dataframe strips from every string and list item
+CLEAN_CHARS = '"[]'
+_CLEAN_TABLE = str.maketrans('', '', CLEAN_CHARS)
+_SEPARATOR = '\x1f'
+
+def _record_type() -> 'pa.DataType':
+    """Arrow struct type of the scalar fields of a raw tweet."""
+    types = {field: pa.string() for field in SCALAR_FIELDS}
+    types.update({field: pa.from_numpy_dtype(dtype) for field, (_, dtype) in COUNT_FIELDS.items()})
+    return pa.struct([(field, types[field]) for field in SCALAR_FIELDS])
+
+class TweetFrameBuilder:
+    """
+    Columnar builder for typed tweet DataFrames.
+    
+    With pyarrow, the scalar fields of a batch are read in one walk over the
+    records, in C++, straight into typed Arrow buffers: strings stay Arrow
+    strings (pandas' own string storage), counts come out as int32/int64
+    with a null mask, and text_lang, post_type and source are
+    dictionary-encoded. Without pyarrow, or for a batch whose values do not
+    have the expected types (e.g. numeric ids), each field is pulled out with
+    a C-level itemgetter map instead. Either way counts and category codes
+    are written into preallocated arrays that grow geometrically, and the
+    list fields are kept as the records' own lists. created_time is parsed
+    to datetime64 in one vectorized call when the frame is built, or kept as
+    the API's strings for CSV output. A missing field becomes a missing
+    value instead of failing the batch.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: Number of tweets to preallocate room for
+        """
+        self._size = 0
+        self._capacity = 0
+        self._missing: Dict[str, int] = {}
+        self._categories: Dict[str, Dict[str, int]] = {column: {} for column in CATEGORY_FIELDS.values()}
+        self._chunks: Dict[str, list] = {column: [] for column in [*STRING_FIELDS.values(), 'created_time']}
+        self._lists: Dict[str, list] = {column: [] for column in LIST_FIELDS.values()}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, np.ndarray] = {}
+        self._count_mask: Dict[str, np.ndarray] = {}
+        self._record_type = _record_type() if pa is not None else None
+        self._grow(max(1, capacity))
+        
+    def __len__(self) -> int:
+        return self._size
+        
+    def _grow(self, capacity: int):
+        """Reallocate every count and category code array to hold `capacity` tweets."""
+        def resize(array: Optional[np.ndarray], dtype, fill) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                grown[:self._size] = array[:self._size]
+            return grown
+            
+        for column in CATEGORY_FIELDS.values():
+            self._codes[column] = resize(self._codes.get(column), np.int32, -1)
+        for column, dtype in COUNT_FIELDS.values():
+            self._counts[column] = resize(self._counts.get(column), dtype, 0)
+            self._count_mask[column] = resize(self._count_mask.get(column), bool, True)
+        self._capacity = capacity
+        
+    def add(self, tweets: List[Dict[str, Any]]):
+        """
+        Append a batch of raw tweets.
+        
+        Args:
+            tweets: List of tweet dictionaries
+        """
+        n = len(tweets)
+        if not n:
+            return
+        if self._size + n > self._capacity:
+            self._grow(max(self._size + n, self._capacity * 2))
+            
+        start, stop = self._size, self._size + n
+        scalars = self._walk(tweets)
+        for field, column in STRING_FIELDS.items():
+            self._chunks[column].append(scalars[field])
+        self._chunks['created_time'].append(scalars['created_time'])
+        for field, column in CATEGORY_FIELDS.items():
+            self._codes[column][start:stop] = self._encode(column, scalars[field])
+        for field, (column, dtype) in COUNT_FIELDS.items():
+            self._counts[column][start:stop], self._count_mask[column][start:stop] = self._count(scalars[field], dtype)
+        for field, column in LIST_FIELDS.items():
+            try:
+                column_values = list(map(itemgetter(field), tweets))
+            except KeyError:
+                column_values = [tweet.get(field, []) for tweet in tweets]
+            self._lists[column].extend(column_values)
+        
+        self._size = stop
+        
+    def _walk(self, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Read the scalar fields of a batch: Arrow arrays from one walk, or lists from one map per field."""
+        if self._record_type is not None:
+            try:
+                batch = pa.array(tweets, type=self._record_type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                batch = None
+            if batch is not None:
+                scalars = {field: batch.field(field) for field in SCALAR_FIELDS}
+                for field, values in scalars.items():
+                    if values.null_count:
+                        self._missing[field] = self._missing.get(field, 0) + values.null_count
+                return scalars
+        return {field: self._extract(tweets, field) for field in SCALAR_FIELDS}
+        
+    def _extract(self, tweets: List[Dict[str, Any]], field: str) -> list:
+        """Pull one field out of every record, with None (counted and logged) where the key is missing."""
+        try:
+            # itemgetter maps at C speed; most batches have every field
+            return list(map(itemgetter(field), tweets))
+        except KeyError:
+            column_values = [tweet.get(field) for tweet in tweets]
+            
+        missing = column_values.count(None)
+        if missing:
+            self._missing[field] = self._missing.get(field, 0) + missing
+        return column_values
+        
+    def _encode(self, column: str, column_values) -> np.ndarray:
+        """Map a batch of category values to the builder's running category codes."""
+        if isinstance(column_values, list):
+            batch_codes, uniques = pd.factorize(np.asarray(column_values, dtype=object))
+        else:
+            encoded = column_values.dictionary_encode()
+            batch_codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            uniques = encoded.dictionary.to_pylist()
+        categories = self._categories[column]
+        remap = np.array([categories.setdefault(value, len(categories)) for value in uniques] + [-1],
+                         dtype=np.int32)
+        # Missing values are coded -1, which indexes the trailing -1
+        return remap[batch_codes]
+        
+    @staticmethod
+    def _count(column_values, dtype):
+        """Return a batch of counts as (values, missing mask)."""
+        if not isinstance(column_values, list):
+            mask = column_values.is_null().to_numpy(zero_copy_only=False)
+            return column_values.fill_null(0).to_numpy(zero_copy_only=False), mask
+        try:
+            return np.asarray(column_values, dtype=dtype), False
+        except TypeError:
+            # Missing (None) counts are masked rather than failing the batch
+            mask = np.fromiter((value is None for value in column_values), dtype=bool, count=len(column_values))
+            return np.asarray([0 if value is None else value for value in column_values], dtype=dtype), mask
+        
+    @staticmethod
+    def _concat(chunks: list):
+        """Join a column's batches: one pandas string column from Arrow chunks, else one list."""
+        if pa is not None and chunks and all(isinstance(chunk, pa.Array) for chunk in chunks):
+            return pa.chunked_array(chunks).to_pandas()
+        return list(chain.from_iterable(chunk if isinstance(chunk, list) else chunk.to_pylist() for chunk in chunks))
+        
+    def build(self, parse_dates: bool = True) -> pd.DataFrame:
+        """
+        Return the tweets added so far as a typed DataFrame.
+        
+        Args:
+            parse_dates: Parse created_time to datetime64; otherwise keep the
+                API's strings, which the CSV output writes as they are
+        
+        Returns:
+            pd.DataFrame: Tweet data with the columns of COLUMN_ORDER
+        """
+        n = self._size
+        if self._missing:
+            logger.warning(f"Tweets with missing fields (left empty): {self._missing}")
+            
+        columns: Dict[str, Any] = {}
+        for column, chunks in self._chunks.items():
+            columns[column] = self._concat(chunks)
+        for column, values in self._lists.items():
+            columns[column] = pd.Series(values, dtype=object)
+        for column, array in self._codes.items():
+            categories = pd.Index(list(self._categories[column]), dtype=object)
+            columns[column] = pd.Categorical.from_codes(array[:n].copy(), categories=categories)
+        for column, array in self._counts.items():
+            mask = self._count_mask[column][:n]
+            values = array[:n].copy()
+            columns[column] = pd.arrays.IntegerArray(values, mask.copy()) if mask.any() else values
+        if parse_dates:
+            columns['created_time'] = parse_created_time(columns['created_time'])
+        
+        return pd.DataFrame(columns, columns=COLUMN_ORDER)
+
+def parse_created_time(values) -> pd.Series:
+    """
+    Parse ISO-8601 created_time strings to datetime64, converting to UTC if offsets are mixed.
+    
+    Values that do not parse become NaT and are counted in a warning.
+    """
+    try:
+        parsed = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(values, format='ISO8601', errors='coerce', utc=True)
+        
+    unparsed = int(pd.isna(parsed).sum()) - int(pd.isna(values).sum())
+    if unparsed:
+        logger.warning(f"{unparsed} created_time values could not be parsed")
+    return parsed
+
+def create_tweet_dataframe(tweets: List[Dict[str, Any]], parse_dates: bool = True) -> pd.DataFrame:
     """
     Convert tweet data to pandas DataFrame with selected fields.
     
     Args:
         tweets: List of tweet dictionaries
+        parse_dates: Parse created_time to datetime64 (keep the raw strings for CSV output)
         
     Returns:
-        pd.DataFrame: Formatted tweet data
+        pd.DataFrame: Formatted tweet data, typed as described in TweetFrameBuilder
     """
     if not isinstance(tweets, list):
         tweets = [tweets]
@@ -21,29 +257,13 @@ def create_tweet_dataframe(tweets: List[Dict[str, Any]]) -> pd.DataFrame:
     logger.info(f"Creating DataFrame from {len(tweets)} tweets")
 
     try:
-        df = pd.DataFrame({
-            'tweet_id': [tweet['id'] for tweet in tweets],
-            'author_username': [tweet['author_username'] for tweet in tweets],
-            'created_time': [tweet['created_time'] for tweet in tweets],
-            'text': [tweet['text'] for tweet in tweets],
-            'text_lang': [tweet['text_lang'] for tweet in tweets],
-            'post_type': [tweet['post_type'] for tweet in tweets],
-            'favorite_count': [tweet['favorite_count'] for tweet in tweets],
-            'reply_count': [tweet['reply_count'] for tweet in tweets],
-            'retweet_count': [tweet['retweet_count'] for tweet in tweets],
-            'view_count': [tweet['view_count'] for tweet in tweets],
-            'source': [tweet['source'] for tweet in tweets],
-            'text_tags': [tweet.get('text_tags', []) for tweet in tweets],
-            'text_tagged_users': [tweet.get('text_tagged_users', []) for tweet in tweets],
-            'attached_links': [tweet.get('attached_links_expanded_url', []) for tweet in tweets]
-        })
+        builder = TweetFrameBuilder(capacity=len(tweets))
+        builder.add(tweets)
+        df = builder.build(parse_dates)
         
         logger.info("DataFrame created successfully")
         return df
         
-    except KeyError as e:
-        logger.error(f"Missing key in tweet data: {e}")
-        raise
     except Exception as e:
         logger.error(f"Error creating DataFrame: {e}")
         raise
@@ -81,35 +301,96 @@ def select_columns(df: pd.DataFrame) -> pd.DataFrame:
     logger.info(f"Selected {len(selected_columns)} columns from DataFrame")
     return df[selected_columns]
 
+def _clean_strings(values: List[Any]) -> List[Any]:
+    """
+    Strip CLEAN_CHARS from a flat list of values in one C-level pass.
+    
+    The strings are joined on a separator that cannot occur in them,
+    translated as a single string and split back apart, so the cost is one
+    translate() over the whole column instead of one call per value.
+    Non-string values are passed through unchanged, and `values` itself is
+    returned when nothing needed cleaning.
+    """
+    strings = [value for value in values if isinstance(value, str)]
+    if not strings:
+        return values
+    
+    joined = _SEPARATOR.join(strings)
+    translated = joined.translate(_CLEAN_TABLE)
+    if len(translated) == len(joined):
+        return values
+    
+    if joined.count(_SEPARATOR) != len(strings) - 1:
+        # A value contains the separator itself; translate value by value
+        cleaned = iter([value.translate(_CLEAN_TABLE) for value in strings])
+    else:
+        cleaned = iter(translated.split(_SEPARATOR))
+    
+    if len(strings) == len(values):
+        return list(cleaned)
+    return [next(cleaned) if isinstance(value, str) else value for value in values]
+
+def _clean_lists(series: pd.Series) -> pd.Series:
+    """
+    Clean every item of a column of lists through one flat array.
+    
+    The lists are flattened into a single values array plus per-row offsets
+    (the explode layout) and the values are cleaned in one pass. Only the
+    rows holding a changed item are rebuilt, by slicing the cleaned array
+    between their offsets; every other cell keeps its original list.
+    """
+    cells = series.to_numpy(dtype=object)
+    is_list = np.fromiter((isinstance(cell, list) for cell in cells), dtype=bool, count=len(cells))
+    rows = np.flatnonzero(is_list)
+    if not len(rows):
+        return series
+    
+    lists = cells[rows].tolist()
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    flat = list(chain.from_iterable(lists))
+    cleaned = _clean_strings(flat)
+    if cleaned is flat:
+        return series
+    
+    changed = np.fromiter(map(ne, flat, cleaned), dtype=bool, count=len(flat))
+    owners = np.repeat(np.arange(len(lists)), lengths)
+    values = cells.copy()
+    for i in np.unique(owners[changed]).tolist():
+        values[rows[i]] = cleaned[offsets[i]:offsets[i + 1]]
+    return pd.Series(values, index=series.index, name=series.name)
+
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Clean DataFrame by removing unwanted characters and formatting lists.
     
+    String columns are translated as a whole, categorical columns once per
+    category and list columns through a flat values array, so no column is
+    walked cell by cell with a regex.
+    
     Args:
         df: Input DataFrame
         
     Returns:
         pd.DataFrame: Cleaned DataFrame
     """
-    chars_to_remove = ['"', r'\[', r'\]']
-
-    def clean_string(value):
-        if isinstance(value, str):
-            for char in chars_to_remove:
-                value = re.sub(char, '', value)
-        return value
-
-    def clean_list(lst):
-        if isinstance(lst, list):
-            return [clean_string(item) for item in lst]
-        return lst
-
     try:
         for col in df.columns:
-            if pd.api.types.is_string_dtype(df[col]):
-                df[col] = df[col].apply(clean_string)
-            elif pd.api.types.is_list_like(df[col]):
-                df[col] = df[col].apply(clean_list)
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Clean each distinct value once rather than every row
+                categories = df[col].cat.categories
+                cleaned = pd.Index(_clean_strings(list(categories)), dtype=categories.dtype)
+                if cleaned.is_unique:
+                    df[col] = df[col].cat.rename_categories(cleaned)
+                else:
+                    df[col] = df[col].astype(object).map(dict(zip(categories, cleaned))).astype('category')
+            elif pd.api.types.is_string_dtype(df[col]):
+                values = df[col].tolist()
+                cleaned = _clean_strings(values)
+                if cleaned is not values:
+                    df[col] = pd.Series(cleaned, index=df.index, dtype=df[col].dtype)
+            elif df[col].dtype == object:
+                df[col] = _clean_lists(df[col])
         
         logger.info("DataFrame cleaned successfully")
         return df
@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+from src.utils.logger import setup_logger
+from src.utils.data_processor import clean_dataframe
+from src.utils.output import EXTENSIONS, LIST_COLUMNS, read_output, write_frame
+from src.utils.seen_index import MEMBERSHIP_FIELDS, iter_memberships
+
+logger = setup_logger('dataset')
+
+# A tweet is identified by these columns; the outputs carry no tweet id
+KEY_COLUMNS = ['author_username', 'created_time', 'text']
+
+MANIFEST_FILE = '_manifest.json'
+MANIFEST_VERSION = 1
+UNKNOWN_DATE = 'unknown'
+
+# Per-period outputs are named PERIOD(KEYWORD).ext
+_OUTPUT_NAME = re.compile(r'^(?P<period>.+?)\((?P<keyword>.+)\)(?P<extension>\.[a-z]+)$')
+
+def find_outputs(output_dir: str, exclude: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """
+    List the per-keyword outputs of a collection run.
+
+    Args:
+        output_dir: Collection output directory (one directory per period)
+        exclude: Directories inside `output_dir` to skip, e.g. the dataset itself
+
+    Returns:
+        List[Dict[str, Any]]: One entry per file with its period, keyword,
+        path, size and modification time
+    """
+    outputs = []
+    if not os.path.isdir(output_dir):
+        return outputs
+
+    excluded = {os.path.abspath(path) for path in exclude}
+    for period in sorted(os.listdir(output_dir)):
+        period_dir = os.path.join(output_dir, period)
+        if not os.path.isdir(period_dir) or os.path.abspath(period_dir) in excluded:
+            continue
+        for name in sorted(os.listdir(period_dir)):
+            match = _OUTPUT_NAME.match(name)
+            if not match or match['period'] != period or match['extension'] not in EXTENSIONS.values():
+                continue
+            path = os.path.join(period_dir, name)
+            stat = os.stat(path)
+            outputs.append({
+                'period': period,
+                'keyword': match['keyword'],
+                'path': path,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            })
+    return outputs
+
+def _read_keyword_output(path: str, keyword: str, mtime_ns: int) -> pd.DataFrame:
+    """Load one per-keyword output, tagged with its keyword and file age."""
+    df = read_output(path)
+    df['keyword'] = keyword
+    df['_mtime_ns'] = mtime_ns
+    return df
+
+def load_memberships(seen_index_path: str) -> pd.DataFrame:
+    """
+    Load the duplicate sightings of a deduplicating collection as keyword matches.
+
+    With deduplication a tweet is only written under the first keyword that
+    found it; every other keyword that found it is a membership in the
+    seen-ID index. Their tweet fields are cleaned as the outputs are, so
+    they match the saved rows.
+
+    Args:
+        seen_index_path: SQLite database of the seen-ID index
+
+    Returns:
+        pd.DataFrame: KEY_COLUMNS and `keyword` of every sighting
+    """
+    columns = ['tweet_id', 'keyword', 'period', *MEMBERSHIP_FIELDS]
+    memberships = pd.DataFrame(list(iter_memberships(seen_index_path)), columns=columns, dtype=object)
+    complete = memberships[KEY_COLUMNS].notna().all(axis=1)
+    if not complete.all():
+        logger.warning(f"{int((~complete).sum())} sightings in {seen_index_path} were recorded without "
+                       f"their tweet fields and cannot be attributed")
+    memberships = memberships.loc[complete, KEY_COLUMNS + ['keyword']].reset_index(drop=True)
+    if len(memberships):
+        memberships = clean_dataframe(memberships)
+    return memberships
+
+def _match_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    KEY_COLUMNS with created_time as naive UTC to the second.
+
+    CSV rows, Parquet/Arrow rows and raw API values of the same tweet then
+    compare equal, whatever offset or precision each kept.
+    """
+    created_time = pd.to_datetime(df['created_time'], format='ISO8601', utc=True, errors='coerce')
+    return df[KEY_COLUMNS].assign(created_time=created_time.dt.tz_localize(None).dt.floor('s'))
+
+def attribute_keywords(frames: List[pd.DataFrame], memberships: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Merge per-keyword outputs into one row per tweet with the keywords that matched it.
+
+    When a tweet appears in several files the row from the most recently
+    written file is kept, so its engagement counts are the freshest ones.
+
+    Args:
+        frames: Outputs tagged with `keyword` and `_mtime_ns` columns
+        memberships: Further keyword matches (KEY_COLUMNS and `keyword`),
+            e.g. from load_memberships; matches of tweets not in `frames` are ignored
+
+    Returns:
+        pd.DataFrame: Deduplicated tweets with a sorted `keywords` list column
+    """
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(['_mtime_ns', 'keyword'], ascending=[False, True], kind='stable')
+
+    keys = _match_keys(df)
+    sightings = keys.assign(keyword=df['keyword'])
+    if memberships is not None and len(memberships):
+        sightings = pd.concat([sightings, _match_keys(memberships).assign(keyword=memberships['keyword'])],
+                              ignore_index=True)
+    keywords = (
+        sightings.drop_duplicates()
+        .sort_values('keyword', kind='stable')
+        .groupby(KEY_COLUMNS, sort=False, dropna=False)['keyword']
+        .agg(list)
+    )
+    first = ~keys.duplicated()
+    tweets = df[first].drop(columns=['keyword', '_mtime_ns'])
+    tweets['keywords'] = keywords.reindex(pd.MultiIndex.from_frame(keys[first])).to_numpy()
+    order = ['created_time', 'author_username', 'text']
+    return tweets.sort_values(order, kind='stable', na_position='last').reset_index(drop=True)
+
+def partition_dates(df: pd.DataFrame) -> pd.Series:
+    """Return the date partition (YYYY-MM-DD) of every row."""
+    created_time = pd.to_datetime(df['created_time'], errors='coerce')
+    return created_time.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_DATE)
+
+def partition_hash(df: pd.DataFrame) -> str:
+    """Content hash of a partition, used to skip rewriting unchanged partitions."""
+    digest = hashlib.sha1()
+    scalar_columns = [column for column in df.columns if column not in LIST_COLUMNS]
+    digest.update(','.join(df.columns).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df[scalar_columns], index=False).to_numpy().tobytes())
+    for column in df.columns.intersection(LIST_COLUMNS):
+        digest.update('\x1e'.join('\x1f'.join(cell) if isinstance(cell, list) else ''
+                                  for cell in df[column].tolist()).encode('utf-8'))
+    return digest.hexdigest()
+
+def partition_path(dataset_dir: str, period: str, date: str, output_format: str) -> str:
+    """Return the file of one period/date partition."""
+    return os.path.join(dataset_dir, f"period={period}", f"date={date}", f"part-0{EXTENSIONS[output_format]}")
+
+def load_manifest(dataset_dir: str) -> Dict[str, Any]:
+    """Load the dataset manifest, or an empty one."""
+    path = os.path.join(dataset_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+        logger.warning(f"Ignoring manifest {path} written by another version")
+    return {'version': MANIFEST_VERSION, 'format': None, 'periods': {}}
+
+def save_manifest(dataset_dir: str, manifest: Dict[str, Any]):
+    """Write the dataset manifest atomically."""
+    path = os.path.join(dataset_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def _input_signature(outputs: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Identify a period's inputs by file name, size and modification time."""
+    return {os.path.basename(output['path']): [output['size'], output['mtime_ns']] for output in outputs}
+
+def consolidate(output_dir: str, dataset_dir: str, output_format: str = 'csv',
+                compression: Optional[str] = None, workers: Optional[int] = None,
+                force: bool = False, seen_index_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Merge every per-keyword output into one deduplicated dataset partitioned by period and date.
+
+    Inputs are read in parallel worker processes. Each tweet is kept once per
+    period, with a `keywords` column listing every keyword that matched it
+    (including, for a deduplicating collection, the keywords whose sightings
+    the seen-ID index recorded instead of writing), and written to `period=P/date=YYYY-MM-DD/part-0.<ext>`. A manifest records
+    each period's input files and each partition's content hash, so a
+    re-run only reads the periods whose inputs changed and only rewrites the
+    partitions whose rows changed.
+
+    Args:
+        output_dir: Collection output directory
+        dataset_dir: Dataset directory
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet or arrow output
+        workers: Worker processes (default: one per CPU)
+        force: Rebuild every partition regardless of the manifest
+        seen_index_path: Seen-ID index of a deduplicating collection, if it exists
+
+    Returns:
+        Dict[str, int]: Tweets in the re-read periods, partitions written,
+        unchanged and removed, and periods skipped as up to date
+    """
+    start = time.perf_counter()
+    manifest = load_manifest(dataset_dir)
+    if force or manifest['format'] != output_format:
+        # Start over, dropping partitions written by an earlier run
+        if os.path.isdir(dataset_dir):
+            for name in os.listdir(dataset_dir):
+                if name.startswith('period='):
+                    shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+        manifest = {'version': MANIFEST_VERSION, 'format': output_format, 'periods': {}}
+
+    memberships = None
+    if seen_index_path and os.path.exists(seen_index_path):
+        memberships = load_memberships(seen_index_path)
+    membership_count = 0 if memberships is None else len(memberships)
+
+    by_period: Dict[str, List[Dict[str, Any]]] = {}
+    for output in find_outputs(output_dir, exclude=(dataset_dir,)):
+        by_period.setdefault(output['period'], []).append(output)
+
+    stats = {'tweets': 0, 'written': 0, 'unchanged': 0, 'removed': 0, 'periods_skipped': 0}
+    # A sighting can add a keyword to a tweet of any period, so new ones re-read them all
+    memberships_changed = manifest.get('memberships', 0) != membership_count
+    changed = {
+        period: outputs for period, outputs in by_period.items()
+        if memberships_changed or manifest['periods'].get(period, {}).get('inputs') != _input_signature(outputs)
+    }
+    stats['periods_skipped'] = len(by_period) - len(changed)
+
+    frames: Dict[str, List[pd.DataFrame]] = {period: [] for period in changed}
+    if changed:
+        jobs = [output for outputs in changed.values() for output in outputs]
+        logger.info(f"Reading {len(jobs)} outputs from {len(changed)} changed periods")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            results = executor.map(
+                _read_keyword_output,
+                [job['path'] for job in jobs], [job['keyword'] for job in jobs], [job['mtime_ns'] for job in jobs]
+            )
+            for job, df in zip(jobs, results):
+                frames[job['period']].append(df)
+
+    for period, outputs in changed.items():
+        previous = manifest['periods'].get(period, {}).get('partitions', {})
+        tweets = attribute_keywords(frames.pop(period), memberships)
+        partitions = {}
+
+        for date, rows in tweets.groupby(partition_dates(tweets), sort=True):
+            rows = rows.reset_index(drop=True)
+            digest = partition_hash(rows)
+            path = partition_path(dataset_dir, period, date, output_format)
+            partitions[date] = {'rows': len(rows), 'hash': digest}
+            stats['tweets'] += len(rows)
+
+            if previous.get(date, {}).get('hash') == digest and os.path.exists(path):
+                stats['unchanged'] += 1
+                continue
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_frame(rows, path, output_format, compression)
+            stats['written'] += 1
+
+        for date in set(previous) - set(partitions):
+            shutil.rmtree(os.path.dirname(partition_path(dataset_dir, period, date, output_format)),
+                          ignore_errors=True)
+            stats['removed'] += 1
+
+        manifest['periods'][period] = {'inputs': _input_signature(outputs), 'partitions': partitions}
+
+    # Periods whose outputs have all gone are dropped from the dataset too
+    for period in set(manifest['periods']) - set(by_period):
+        shutil.rmtree(os.path.join(dataset_dir, f"period={period}"), ignore_errors=True)
+        stats['removed'] += len(manifest['periods'].pop(period)['partitions'])
+
+    manifest['memberships'] = membership_count
+    os.makedirs(dataset_dir, exist_ok=True)
+    save_manifest(dataset_dir, manifest)
+
+    logger.info(
+        f"Consolidated {stats['tweets']} tweets in {time.perf_counter() - start:.2f}s: "
+        f"{stats['written']} partitions written, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed, {stats['periods_skipped']} periods up to date"
+    )
+    return stats
+
+def read_dataset(dataset_dir: str, periods: Optional[List[str]] = None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load the partitions of a consolidated dataset that fall in a slice.
+
+    Only the matching partition files are opened.
+
+    Args:
+        dataset_dir: Dataset directory
+        periods: Only these periods, if given
+        start_date: First date (YYYY-MM-DD) to include, if given
+        end_date: Last date (YYYY-MM-DD) to include, if given
+
+    Returns:
+        pd.DataFrame: The selected tweets, with `period` and `date` columns
+    """
+    manifest = load_manifest(dataset_dir)
+    output_format = manifest['format']
+    frames = []
+    for period, entry in sorted(manifest['periods'].items()):
+        if periods and period not in periods:
+            continue
+        for date in sorted(entry['partitions']):
+            dated = date != UNKNOWN_DATE
+            if (start_date and (not dated or date < start_date)) or (end_date and (not dated or date > end_date)):
+                continue
+            df = read_output(partition_path(dataset_dir, period, date, output_format))
+            frames.append(df.assign(period=period, date=date))
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,172 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from src.utils.logger import setup_logger
+
+logger = setup_logger('figures')
+
+# Records the data hash each exported figure was rendered from
+MANIFEST_FILE = '_figures.json'
+FORMATS = ('png', 'svg')
+
+def figure_hash(plot: Callable, args: tuple, kwargs: dict, options: dict) -> str:
+    """
+    Hash a figure spec: the plotting function's code, its pickled arguments
+    and the export options.
+    """
+    digest = hashlib.sha256()
+    digest.update(plot.__qualname__.encode('utf-8'))
+    try:
+        digest.update(inspect.getsource(plot).encode('utf-8'))
+    except (OSError, TypeError):
+        pass
+    digest.update(pickle.dumps((args, sorted(kwargs.items()), sorted(options.items())),
+                               protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+def _render(plot: Callable, args: tuple, kwargs: dict, paths: Tuple[str, ...], dpi: int) -> float:
+    """Draw one figure with the Agg backend and save it in every format (worker process)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    try:
+        plot(*args, **kwargs)
+        figure = plt.gcf()
+        for path in paths:
+            tmp_path = f"{path}.tmp"
+            figure.savefig(tmp_path, format=os.path.splitext(path)[1][1:], dpi=dpi, bbox_inches='tight')
+            os.replace(tmp_path, path)
+    finally:
+        plt.close('all')
+    return time.perf_counter() - start
+
+class FigureRenderer:
+    """
+    Show figures inline, or render them headless in worker processes and export them.
+
+    Plotting code hands over a figure spec (a function that draws one figure
+    on the current pyplot figure, plus its arguments) instead of calling
+    plt.show(). Inline, the function is called and the figure shown. Once
+    `start` is called, each spec is hashed and submitted to a process pool
+    that renders it with Agg and writes `<output_dir>/<name>.<format>`;
+    specs whose hash matches the one recorded for files already on disk
+    are skipped. Arguments are pickled to the workers, so pass only the
+    columns a plot needs.
+    """
+
+    def __init__(self):
+        self.output_dir: Optional[str] = None
+        self.formats: Tuple[str, ...] = ('png',)
+        self.dpi = 150
+        self.force = False
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manifest: Dict[str, str] = {}
+        self._pending: Dict[str, Tuple[str, Future]] = {}
+        self._seen = set()
+        self._stats = {'rendered': 0, 'skipped': 0, 'failed': 0}
+
+    @property
+    def exporting(self) -> bool:
+        """Whether figures are exported rather than shown."""
+        return self._executor is not None
+
+    def start(self, output_dir: str, formats: Iterable[str] = ('png',), workers: Optional[int] = None,
+              dpi: int = 150, force: bool = False):
+        """
+        Switch to headless export.
+
+        Args:
+            output_dir: Directory the figures are written to
+            formats: Any of 'png' and 'svg'
+            workers: Rendering processes (default: one per CPU)
+            dpi: Resolution of raster output
+            force: Render every figure even if its data is unchanged
+        """
+        import matplotlib
+        matplotlib.use('Agg')
+
+        formats = tuple(formats)
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unsupported figure formats: {sorted(unknown)}")
+
+        self.output_dir, self.formats, self.dpi, self.force = output_dir, formats, dpi, force
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+
+    def show(self, name: str, plot: Callable, *args: Any, **kwargs: Any):
+        """
+        Show or export one figure.
+
+        Args:
+            name: File name of the figure, without extension; unique per run
+            plot: Function drawing the figure from `args` and `kwargs`
+        """
+        if not self.exporting:
+            import matplotlib.pyplot as plt
+            plot(*args, **kwargs)
+            plt.show()
+            return
+
+        if name in self._seen:
+            raise ValueError(f"Duplicate figure name: {name}")
+        self._seen.add(name)
+
+        paths = tuple(os.path.join(self.output_dir, f"{name}.{fmt}") for fmt in self.formats)
+        digest = figure_hash(plot, args, kwargs, {'formats': self.formats, 'dpi': self.dpi})
+        if not self.force and self._manifest.get(name) == digest and all(os.path.exists(path) for path in paths):
+            self._stats['skipped'] += 1
+            return
+
+        future = self._executor.submit(_render, plot, args, kwargs, paths, self.dpi)
+        self._pending[name] = (digest, future)
+
+    def close(self) -> Dict[str, int]:
+        """
+        Wait for every submitted figure and record the rendered ones.
+
+        Returns:
+            Dict[str, int]: Figures rendered, skipped as unchanged, and failed
+        """
+        if not self.exporting:
+            return dict(self._stats)
+
+        start = time.perf_counter()
+        try:
+            for name, (digest, future) in self._pending.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    self._stats['failed'] += 1
+                    self._manifest.pop(name, None)
+                    logger.error(f"Failed to render figure {name}: {e}")
+                    continue
+                self._manifest[name] = digest
+                self._stats['rendered'] += 1
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+            self._pending.clear()
+
+            manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+            with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(self._manifest, f, indent=2, sort_keys=True)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        logger.info(
+            f"Figures in {self.output_dir}: {self._stats['rendered']} rendered, "
+            f"{self._stats['skipped']} unchanged, {self._stats['failed']} failed "
+            f"(waited {time.perf_counter() - start:.2f}s for the workers)"
+        )
+        return dict(self._stats)
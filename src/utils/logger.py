@@ -1,46 +1,233 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
+
+# Name of the handler, shared by every logger from setup_logger, that puts
+# records on the queue. Loggers only enqueue their records; one listener
+# thread per process does the formatting and every file and console write
+QUEUE_HANDLER_NAME = 'queue'
+
+# Logger the queue handler is kept on from the moment it is created, so it
+# can be found before setup_logger has attached it to any other logger
+HOLDER_LOGGER_NAME = 'logger'
+
+# Seconds flush_logging waits for the listener to catch up
+FLUSH_TIMEOUT = 10
+
+_lock = threading.Lock()
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps a record's traceback, as text, for the listener's formatters."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # exc_info does not outlive the except block, so the traceback is
+        # formatted here; the message is merged with its args as usual
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Queue listener that also sets the threading.Events flush_logging queues."""
+
+    def handle(self, record):
+        if isinstance(record, threading.Event):
+            record.set()
+            return
+        super().handle(record)
+
+class _PerLoggerFileHandler(logging.Handler):
+    """
+    Write each logger's records to its own daily file, logs/<name>_<YYYYMMDD>.log.
+
+    Only the listener thread calls this handler, so the underlying file
+    handlers are opened lazily without any extra locking.
+    """
+
+    def __init__(self, log_dir: str, formatter: logging.Formatter, extension: str = '.log'):
+        super().__init__()
+        self.log_dir = Path(log_dir)
+        self.extension = extension
+        self.setFormatter(formatter)
+        self._files: Dict[str, logging.FileHandler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        filename = self.log_dir / f"{record.name}_{datetime.now().strftime('%Y%m%d')}{self.extension}"
+        handler = self._files.get(record.name)
+        if handler is None or handler.baseFilename != str(filename.absolute()):
+            if handler is not None:
+                handler.close()
+            self.log_dir.mkdir(exist_ok=True)
+            handler = self._files[record.name] = logging.FileHandler(filename)
+            handler.setFormatter(self.formatter)
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+def _build_handlers(json_lines: bool, log_dir: str):
+    """Create the console and file handlers driven by the listener thread."""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+
+    if json_lines:
+        file_handler = _PerLoggerFileHandler(log_dir, JsonLinesFormatter(), '.jsonl')
+    else:
+        file_handler = _PerLoggerFileHandler(
+            log_dir, logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        )
+    return console_handler, file_handler
+
+def _find_queue_handler() -> Optional[logging.handlers.QueueHandler]:
+    """
+    Return the process-wide queue handler, if it has been created.
+
+    The handler is kept on a logger rather than in this module because
+    scripts import this module as utils.logger while the utils package
+    imports it as src.utils.logger; both copies must share one queue and
+    one listener.
+    """
+    for handler in logging.getLogger(HOLDER_LOGGER_NAME).handlers:
+        if handler.get_name() == QUEUE_HANDLER_NAME:
+            return handler
+    return None
+
+def _queue_handler() -> logging.handlers.QueueHandler:
+    """Return the process-wide queue handler, creating it and starting its listener as needed."""
+    handler = _find_queue_handler()
+    if handler is None:
+        handler = _QueueHandler(queue.SimpleQueue())
+        handler.set_name(QUEUE_HANDLER_NAME)
+        handler.listener = None
+        handler.options = {'json_lines': False, 'log_dir': 'logs'}
+        handler.pid = os.getpid()
+        logging.getLogger(HOLDER_LOGGER_NAME).addHandler(handler)
+    elif handler.pid != os.getpid():
+        # Forked child: the listener thread did not survive the fork
+        handler.queue = queue.SimpleQueue()
+        handler.listener = None
+        handler.pid = os.getpid()
+        # multiprocessing children leave through os._exit, skipping atexit
+        multiprocessing.util.Finalize(None, shutdown_logging, exitpriority=0)
+
+    if handler.listener is None:
+        handler.listener = _QueueListener(handler.queue, *_build_handlers(**handler.options))
+        handler.listener.start()
+    return handler
+
+def _stop_listener(handler: logging.handlers.QueueHandler):
+    """Drain the queue and stop the listener thread, closing its handlers."""
+    if handler.listener is None or handler.pid != os.getpid():
+        return
+    handler.listener.stop()
+    for target in handler.listener.handlers:
+        target.close()
+    handler.listener = None
+
+def configure_logging(json_lines: bool = False, log_dir: str = 'logs'):
+    """
+    Set the output options of every logger, replacing the running handlers.
+
+    Records already queued are written with the previous options first.
+
+    Args:
+        json_lines: Write the log files as JSON lines (<name>_<date>.jsonl)
+        log_dir: Directory of the log files
+    """
+    with _lock:
+        handler = _queue_handler()
+        _stop_listener(handler)
+        handler.options = {'json_lines': json_lines, 'log_dir': log_dir}
+        _queue_handler()
+
+def flush_logging():
+    """
+    Wait until every record logged so far has been written.
+
+    Records are written by the listener thread, so without this they can
+    appear on the console after print() output that followed them in the code.
+    """
+    with _lock:
+        handler = _find_queue_handler()
+        if handler is None or handler.listener is None or handler.pid != os.getpid():
+            return
+        written = threading.Event()
+        handler.queue.put_nowait(written)
+    written.wait(FLUSH_TIMEOUT)
+
+def shutdown_logging():
+    """Flush every queued record and stop the listener thread."""
+    with _lock:
+        handler = _find_queue_handler()
+        if handler is not None:
+            _stop_listener(handler)
 
 def setup_logger(name: str) -> logging.Logger:
     """
     Configure and return a logger instance.
-    
+
+    Records are handed to a queue and written by one background listener
+    thread, so logging never blocks the caller on file or console I/O. Every
+    logger set up here shares the one queue handler; other libraries'
+    loggers are left alone. Calling this again for a name adds nothing.
+
     Args:
         name: Name of the logger
-        
+
     Returns:
         logging.Logger: Configured logger instance
     """
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
-    
-    # Create formatters
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_formatter = logging.Formatter(
-        '%(levelname)s: %(message)s'
-    )
-    
-    # File handler
-    file_handler = logging.FileHandler(
-        log_dir / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
-    )
-    file_handler.setFormatter(file_formatter)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+    with _lock:
+        handler = _queue_handler()
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+
+    return logger
+
+def _restart_after_fork():
+    # Give a forked child its own queue and listener as soon as it starts,
+    # before any inherited logger enqueues a record nobody would read
+    global _lock
+    _lock = threading.Lock()
+    if _find_queue_handler() is not None:
+        _queue_handler()
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
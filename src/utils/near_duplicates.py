@@ -0,0 +1,219 @@
+import time
+from itertools import chain
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+logger = setup_logger('near_duplicates')
+
+# MinHash entries computed per batch (permutations x shingles), ~128 MB of uint64
+BATCH_ENTRIES = 16_000_000
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spread the bits of uint64 values (wraps mod 2**64)."""
+    values = values.copy()
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+def shingle_hashes(texts: pd.Series, shingle_words: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the word shingles of every text into one flat array.
+
+    Texts are lowercased and split on whitespace; every distinct word gets an
+    integer id, and each run of `shingle_words` consecutive ids is combined
+    into one 64-bit hash. Texts shorter than a shingle count as one shingle.
+
+    Args:
+        texts: Texts to shingle
+        shingle_words: Words per shingle
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Shingle hashes (uint64) and per-text
+        offsets into them (len(texts) + 1 entries)
+    """
+    words = texts.fillna('').astype(str).str.lower().str.split().tolist()
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    ids, _ = pd.factorize(np.fromiter(chain.from_iterable(words), dtype=object, count=int(lengths.sum())))
+    ids = ids.astype(np.uint64) + np.uint64(1)
+
+    starts = np.cumsum(lengths) - lengths
+    position = np.arange(len(ids)) - np.repeat(starts, lengths)
+    owner_length = np.repeat(lengths, lengths)
+    # A shingle starts at every word with a full shingle after it, or at the
+    # first word of a text shorter than one shingle
+    is_start = position <= np.maximum(owner_length - shingle_words, 0)
+    first = np.flatnonzero(is_start)
+
+    hashes = np.zeros(len(first), dtype=np.uint64)
+    for offset in range(shingle_words):
+        index = first + offset
+        inside = position[first] + offset < owner_length[first]
+        token = np.zeros(len(first), dtype=np.uint64)
+        token[inside] = ids[index[inside]]
+        hashes = _mix64(hashes * np.uint64(1000003) ^ token)
+
+    counts = np.minimum(lengths, np.maximum(lengths - shingle_words + 1, 1))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return hashes, offsets
+
+def minhash_signatures(hashes: np.ndarray, offsets: np.ndarray, num_perm: int = 128,
+                       seed: int = 42) -> np.ndarray:
+    """
+    Compute MinHash signatures from flat shingle hashes, in batches of texts.
+
+    Each permutation is a multiply-shift hash ((a * h + b) mod 2**64) >> 32,
+    evaluated for every shingle of a batch at once and reduced to its
+    minimum per text with np.minimum.reduceat.
+
+    Args:
+        hashes: Shingle hashes from shingle_hashes
+        offsets: Per-text offsets into `hashes`
+        num_perm: Signature length
+        seed: Seed of the hash functions
+
+    Returns:
+        np.ndarray: (texts, num_perm) uint32 signatures; texts without
+        shingles get all-max rows
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, np.iinfo(np.int64).max, num_perm, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.int64).max, num_perm, dtype=np.int64).astype(np.uint64)
+
+    n = len(offsets) - 1
+    signatures = np.full((n, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    per_batch = max(BATCH_ENTRIES // num_perm, 1)
+    start = 0
+    while start < n:
+        # Extend the batch until it holds per_batch shingles (at least one text)
+        end = max(int(np.searchsorted(offsets, offsets[start] + per_batch, side='right')) - 1, start + 1)
+        end = min(end, n)
+        lo, hi = offsets[start], offsets[end]
+        if hi > lo:
+            values = np.multiply(a[:, None], hashes[None, lo:hi])
+            values += b[:, None]
+            values >>= np.uint64(32)
+            counts = np.diff(offsets[start:end + 1])
+            nonempty = counts > 0
+            reduced = np.minimum.reduceat(values, offsets[start:end][nonempty] - lo, axis=1)
+            signatures[start:end][nonempty] = reduced.T.astype(np.uint32)
+        start = end
+    return signatures
+
+def lsh_parameters(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose (bands, rows) for LSH banding.
+
+    Minimizes the equally weighted probability of missing a pair above the
+    threshold and of proposing one below it, integrated over Jaccard similarity.
+    """
+    best, best_error = (1, num_perm), np.inf
+    grid = np.linspace(0, 1, 1001)
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        probability = 1 - (1 - grid ** rows) ** bands
+        false_positive = np.trapezoid(probability[grid < threshold], grid[grid < threshold])
+        false_negative = np.trapezoid(1 - probability[grid >= threshold], grid[grid >= threshold])
+        if false_positive + false_negative < best_error:
+            best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+def _connected_components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Label each node with the smallest node of its component (vectorized union-find)."""
+    parent = np.arange(n)
+    while len(left):
+        # Hook every edge's larger root under its smaller root, then flatten
+        root_left, root_right = parent[left], parent[right]
+        low, high = np.minimum(root_left, root_right), np.maximum(root_left, root_right)
+        np.minimum.at(parent, high, low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        settled = parent[left] == parent[right]
+        left, right = left[~settled], right[~settled]
+    return parent
+
+def near_duplicate_groups(texts: pd.Series, threshold: float = 0.7, num_perm: int = 128,
+                          shingle_words: int = 2, seed: int = 42,
+                          bands: Optional[int] = None) -> pd.Series:
+    """
+    Group near-duplicate texts (copy-pastes, lightly edited retweets).
+
+    MinHash signatures of the word shingles are split into bands; texts
+    sharing any band's values are candidates, and a candidate pair is kept
+    when its signatures estimate a Jaccard similarity of at least
+    `threshold`. Groups are the connected components of the kept pairs.
+    Every step is a vectorized pass or a sort, so the cost grows roughly
+    linearly with the number of texts.
+
+    Args:
+        texts: Texts to group
+        threshold: Minimum estimated Jaccard similarity of duplicates
+        num_perm: MinHash signature length
+        shingle_words: Words per shingle
+        seed: Seed of the MinHash functions
+        bands: LSH bands (default: chosen for the threshold)
+
+    Returns:
+        pd.Series: `dup_group` per text: the position of the first text of
+        its group, so texts without duplicates are their own group
+    """
+    start = time.perf_counter()
+    n = len(texts)
+    if not n:
+        return pd.Series(np.empty(0, dtype=np.int64), index=texts.index, name='dup_group')
+    hashes, offsets = shingle_hashes(texts, shingle_words)
+    signatures = minhash_signatures(hashes, offsets, num_perm, seed)
+
+    if bands is None:
+        bands, rows = lsh_parameters(threshold, num_perm)
+    else:
+        rows = num_perm // bands
+    candidates = np.flatnonzero(np.diff(offsets) > 0)
+
+    left, right = [], []
+    for band in (range(bands) if len(candidates) else []):
+        # One 64-bit key per text for this band's rows
+        key = np.zeros(n, dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            key = _mix64(key ^ column.astype(np.uint64))
+        order = candidates[np.argsort(key[candidates], kind='stable')]
+        sorted_keys = key[order]
+        # Pair every text with the first text of its bucket
+        bucket_start = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        first = order[np.flatnonzero(bucket_start)[np.cumsum(bucket_start) - 1]]
+        paired = first != order
+        left.append(first[paired])
+        right.append(order[paired])
+
+    left = np.concatenate(left) if left else np.empty(0, dtype=np.int64)
+    right = np.concatenate(right) if right else np.empty(0, dtype=np.int64)
+    if len(left):
+        pairs = np.unique(np.stack([left, right], axis=1), axis=0)
+        left, right = pairs[:, 0], pairs[:, 1]
+        # Drop band collisions whose signatures disagree too often
+        similarity = (signatures[left] == signatures[right]).mean(axis=1)
+        keep = similarity >= threshold
+        left, right = left[keep], right[keep]
+
+    groups = _connected_components(n, left, right)
+    logger.info(
+        f"Grouped {n} texts into {len(np.unique(groups))} groups "
+        f"({bands} bands x {rows} rows, {len(left)} similar pairs) in {time.perf_counter() - start:.2f}s"
+    )
+    return pd.Series(groups, index=texts.index, name='dup_group')
+
+def collapse_duplicates(df: pd.DataFrame, group_column: str = 'dup_group') -> pd.DataFrame:
+    """Keep the first row of each duplicate group, with the group's size in `dup_size`."""
+    sizes = df[group_column].map(df[group_column].value_counts())
+    return df.assign(dup_size=sizes).drop_duplicates(group_column)
+
+def duplicate_weights(df: pd.DataFrame, group_column: str = 'dup_group') -> pd.Series:
+    """Weight each row by one over its duplicate group's size, so every group counts once."""
+    return 1 / df[group_column].map(df[group_column].value_counts())
@@ -0,0 +1,444 @@
+import re
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+logger = setup_logger('ngrams')
+
+# Same tokens as scikit-learn's CountVectorizer: two or more word characters
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Bits of a word id inside an n-gram key; n-grams of up to 3 words fit in an int64
+WORD_BITS = 21
+MAX_N = 3
+
+OVERALL = 'overall'
+
+class NgramCounter:
+    """
+    Count word n-grams per tweet, streaming, with a bounded summary per group.
+
+    Every tweet is tokenized on its own, so no n-gram spans two tweets, and
+    all n-gram sizes are counted in the same pass. Each n-gram is an int64
+    key packing its word ids, and a chunk's keys are counted per group with
+    one sort. The counts are folded into a Misra-Gries summary per (group,
+    n) of at most `capacity` n-grams: when a summary overflows, the
+    (capacity + 1)-th largest count is subtracted from every entry and the
+    non-positive ones dropped. Memory then depends on `capacity` and the
+    vocabulary, not on the number of tweets. Any n-gram more frequent than
+    1/(capacity + 1) of its group's n-grams is kept, and counts are exact as
+    long as a group never overflows (`error` records how far they may be
+    under).
+
+    The vocabulary is bounded too: when a chunk's new words would take it
+    past `vocabulary_size`, it is compacted to the words the summaries still
+    reference and the summaries' keys are renumbered. If the summaries alone
+    reference more than half of `vocabulary_size` words, they are trimmed
+    further first, so a large multilingual stream degrades into coarser
+    counts instead of failing.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 3), capacity: int = 50_000,
+                 stop_words: Iterable[str] = (), token_pattern: str = TOKEN_PATTERN,
+                 vocabulary_size: int = 1 << WORD_BITS):
+        """
+        Args:
+            ngram_range: Smallest and largest n-gram size (at most 3 words)
+            capacity: N-grams kept per group and size
+            stop_words: Words dropped before forming n-grams
+            token_pattern: Regular expression of a token
+            vocabulary_size: Most distinct words held at once (at most 2**21)
+        """
+        low, high = ngram_range
+        if not 1 <= low <= high <= MAX_N:
+            raise ValueError(f"ngram_range must be within (1, {MAX_N}), not {ngram_range}")
+        if not 2 <= vocabulary_size <= 1 << WORD_BITS:
+            raise ValueError(f"vocabulary_size must be within (2, {1 << WORD_BITS}), not {vocabulary_size}")
+        self.vocabulary_size = vocabulary_size
+        self.sizes = tuple(range(low, high + 1))
+        self.capacity = capacity
+        self.stop_words = frozenset(stop_words)
+        self.token_pattern = token_pattern
+        self._vocabulary: Dict[str, int] = {}
+        self._words: List[str] = []
+        # (n, group column, group) -> (keys, counts)
+        self._summaries: Dict[Tuple[int, str, object], Tuple[np.ndarray, np.ndarray]] = {}
+        self.error: Dict[Tuple[int, str, object], float] = {}
+        self.documents = 0
+
+    def _tokenize(self, texts: pd.Series) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Word ids of every text, flattened, and the number of words of each text.
+
+        Returns None when the chunk has more new words than the vocabulary
+        can take even after compaction; the caller then splits the chunk.
+        """
+        pattern = re.compile(self.token_pattern)
+        stop_words = self.stop_words
+        tokens = [
+            [word for word in pattern.findall(text.lower()) if word not in stop_words]
+            for text in texts.fillna('').astype(str).tolist()
+        ]
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+        codes, uniques = pd.factorize(np.fromiter(chain.from_iterable(tokens), dtype=object,
+                                                  count=int(lengths.sum())))
+
+        # Make room for the chunk's new words before numbering them
+        words = uniques.tolist()
+        new_words = sum(word not in self._vocabulary for word in words)
+        if len(self._words) + new_words > self.vocabulary_size:
+            self._compact()
+            new_words = sum(word not in self._vocabulary for word in words)
+            if len(self._words) + new_words > self.vocabulary_size:
+                return None
+
+        # Map the chunk's distinct words to ids shared by every chunk
+        lookup = np.empty(len(words), dtype=np.int64)
+        for i, word in enumerate(words):
+            word_id = self._vocabulary.get(word)
+            if word_id is None:
+                word_id = self._vocabulary[word] = len(self._words)
+                self._words.append(word)
+            lookup[i] = word_id
+        return lookup[codes], lengths
+
+    def _word_ids(self, keys: np.ndarray, n: int) -> List[np.ndarray]:
+        """The word ids packed in n-gram keys, first word first."""
+        mask = (1 << WORD_BITS) - 1
+        return [(keys >> (WORD_BITS * (n - 1 - i))) & mask for i in range(n)]
+
+    def _referenced(self) -> np.ndarray:
+        """Ids of the words some summary still holds an n-gram of, sorted."""
+        parts = [ids for (n, _, _), (keys, _) in self._summaries.items() for ids in self._word_ids(keys, n)]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _compact(self):
+        """Drop the words no summary references and renumber the rest, keeping their order."""
+        referenced = self._referenced()
+        while len(referenced) > self.vocabulary_size // 2:
+            # The summaries alone fill the vocabulary: halve every summary
+            for summary_key, (keys, _) in list(self._summaries.items()):
+                self._trim(summary_key, max(len(keys) // 2, 1))
+            referenced = self._referenced()
+
+        remap = np.full(len(self._words), -1, dtype=np.int64)
+        remap[referenced] = np.arange(len(referenced))
+        for (n, column, group), (keys, counts) in list(self._summaries.items()):
+            renumbered = np.zeros(len(keys), dtype=np.int64)
+            for ids in self._word_ids(keys, n):
+                renumbered = (renumbered << WORD_BITS) | remap[ids]
+            self._summaries[(n, column, group)] = (renumbered, counts)
+
+        dropped = len(self._words) - len(referenced)
+        self._words = [self._words[i] for i in referenced.tolist()]
+        self._vocabulary = {word: i for i, word in enumerate(self._words)}
+        if dropped:
+            logger.info(f"Compacted the n-gram vocabulary: dropped {dropped:,} words, kept {len(self._words):,}")
+
+    def _merge(self, summary_key: Tuple[int, str, object], keys: np.ndarray, counts: np.ndarray):
+        """Fold one chunk's counts into a summary, trimming it back to capacity."""
+        if summary_key in self._summaries:
+            old_keys, old_counts = self._summaries[summary_key]
+            keys, inverse = np.unique(np.concatenate([old_keys, keys]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([old_counts, counts]))
+
+        self._summaries[summary_key] = (keys, counts)
+        self._trim(summary_key, self.capacity)
+
+    def _trim(self, summary_key: Tuple[int, str, object], capacity: int):
+        """Misra-Gries trim: subtract the (capacity + 1)-th largest count and drop what reaches zero."""
+        keys, counts = self._summaries[summary_key]
+        if len(keys) <= capacity:
+            return
+        cut = np.partition(counts, len(counts) - capacity - 1)[len(counts) - capacity - 1]
+        counts = counts - cut
+        kept = counts > 0
+        self._summaries[summary_key] = (keys[kept], counts[kept])
+        self.error[summary_key] = self.error.get(summary_key, 0.0) + cut
+
+    def update(self, texts: pd.Series, groups: Optional[pd.DataFrame] = None,
+               weights: Optional[pd.Series] = None):
+        """
+        Count the n-grams of one chunk of tweets.
+
+        Args:
+            texts: Tweet texts
+            groups: Columns to group by (e.g. sentiment, aspect, period), aligned with `texts`
+            weights: Weight of each tweet (default 1)
+        """
+        if not len(texts):
+            return
+        tokenized = self._tokenize(texts)
+        if tokenized is None:
+            if len(texts) == 1:
+                raise ValueError(f"One text has more distinct words than vocabulary_size ({self.vocabulary_size:,})")
+            # Too many new words for one chunk: count it in halves
+            half = len(texts) // 2
+            for part in (slice(0, half), slice(half, None)):
+                self.update(texts.iloc[part], None if groups is None else groups.iloc[part],
+                            None if weights is None else weights.iloc[part])
+            return
+        ids, lengths = tokenized
+        self.documents += len(texts)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(ids)) - np.repeat(starts, lengths)
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        owner_length = lengths[owner]
+        doc_weights = np.ones(len(texts)) if weights is None else np.asarray(weights, dtype='float64')
+
+        group_codes = {OVERALL: (np.zeros(len(texts), dtype=np.int64), np.array([None], dtype=object))}
+        for column in ([] if groups is None else groups.columns):
+            codes, uniques = pd.factorize(groups[column], use_na_sentinel=True)
+            group_codes[column] = (codes, np.asarray(uniques, dtype=object))
+
+        for n in self.sizes:
+            # An n-gram starts at every word followed by n - 1 words of the same tweet
+            first = np.flatnonzero(position <= owner_length - n)
+            keys = np.zeros(len(first), dtype=np.int64)
+            for offset in range(n):
+                keys = (keys << WORD_BITS) | ids[first + offset]
+            # Sort by key once; each group column then only needs a stable sort by group
+            by_key = np.argsort(keys, kind='stable')
+            keys, docs = keys[by_key], owner[first][by_key]
+            ngram_weights = doc_weights[docs]
+
+            for column, (codes, uniques) in group_codes.items():
+                group = codes[docs]
+                order = np.argsort(group, kind='stable')
+                order = order[group[order] >= 0]
+                if not len(order):
+                    continue
+                sorted_groups, sorted_keys = group[order], keys[order]
+                run_start = np.flatnonzero(np.concatenate((
+                    [True], (sorted_groups[1:] != sorted_groups[:-1]) | (sorted_keys[1:] != sorted_keys[:-1]))))
+                run_groups, run_keys = sorted_groups[run_start], sorted_keys[run_start]
+                run_counts = np.add.reduceat(ngram_weights[order], run_start)
+
+                bounds = np.flatnonzero(np.diff(run_groups)) + 1
+                for part_keys, part_counts, code in zip(np.split(run_keys, bounds), np.split(run_counts, bounds),
+                                                        run_groups[np.concatenate(([0], bounds))]):
+                    self._merge((n, column, uniques[code]), part_keys, part_counts)
+
+    def _decode(self, keys: np.ndarray, n: int) -> List[str]:
+        """N-gram text of packed keys."""
+        words = np.array(self._words, dtype=object)
+        parts = [words[ids] for ids in self._word_ids(keys, n)]
+        return [' '.join(gram) for gram in zip(*parts)]
+
+    def groups(self, column: str = OVERALL) -> List[object]:
+        """Groups of a column that have n-grams."""
+        return sorted({group for (_, col, group) in self._summaries if col == column}, key=str)
+
+    def top(self, n: int, k: int = 20, column: str = OVERALL, group: object = None) -> pd.DataFrame:
+        """
+        Most frequent n-grams of one group.
+
+        Args:
+            n: N-gram size
+            k: Number of n-grams
+            column: Group column, or 'overall'
+            group: Group value (ignored for 'overall')
+
+        Returns:
+            pd.DataFrame: `ngram` and `count`, most frequent first
+        """
+        keys, counts = self._summaries.get((n, column, group), (np.empty(0, dtype=np.int64), np.empty(0)))
+        # Candidates are everything tied with the k-th count; ties are broken
+        # by the n-gram itself, since word ids change when the vocabulary is compacted
+        if len(counts) > k:
+            candidates = counts >= np.partition(counts, len(counts) - k)[len(counts) - k]
+            keys, counts = keys[candidates], counts[candidates]
+        ngrams = np.array(self._decode(keys, n), dtype=object)
+        order = np.lexsort((ngrams.astype(str), -counts))[:k]
+        return pd.DataFrame({'ngram': ngrams[order], 'count': counts[order]})
+
+    def top_table(self, k: int = 20, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Top-k n-grams of every size and group, as one long table.
+
+        Args:
+            k: N-grams per group and size
+            columns: Group columns to include (default: all, overall first)
+
+        Returns:
+            pd.DataFrame: n, group_column, group, rank, ngram, count
+        """
+        columns = columns or list(dict.fromkeys(col for (_, col, _) in self._summaries))
+        frames = []
+        for column in columns:
+            for group in self.groups(column):
+                for n in self.sizes:
+                    top = self.top(n, k, column, group)
+                    frames.append(top.assign(n=n, group_column=column, group=group,
+                                             rank=np.arange(1, len(top) + 1)))
+        if not frames:
+            return pd.DataFrame(columns=['n', 'group_column', 'group', 'rank', 'ngram', 'count'])
+        return pd.concat(frames, ignore_index=True)[['n', 'group_column', 'group', 'rank', 'ngram', 'count']]
+
+def count_ngrams(texts: pd.Series, groups: Optional[pd.DataFrame] = None, weights: Optional[pd.Series] = None,
+                 chunk_size: int = 50_000, **kwargs) -> NgramCounter:
+    """
+    Count the n-grams of a column of tweets in chunks.
+
+    Args:
+        texts: Tweet texts
+        groups: Columns to group by, aligned with `texts`
+        weights: Weight of each tweet (default 1)
+        chunk_size: Tweets per chunk
+        **kwargs: Passed to NgramCounter
+
+    Returns:
+        NgramCounter: The filled counter
+    """
+    counter = NgramCounter(**kwargs)
+    for start in range(0, len(texts), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        counter.update(texts.iloc[chunk],
+                       None if groups is None else groups.iloc[chunk],
+                       None if weights is None else weights.iloc[chunk])
+    logger.info(f"Counted the n-grams of {counter.documents} tweets in chunks of {chunk_size}")
+    return counter
+
+# Tokens as WordCloud.process_text splits them (words may contain apostrophes)
+WORD_PATTERN = r"\w[\w']*"
+
+class WordCounter:
+    """
+    Count word frequencies per group in one streaming pass, for word clouds.
+
+    Each chunk's words are factorized once and counted for every group
+    column with a single sort of (group, word) codes, so overall and
+    per-group tables come from one tokenization of every tweet. Stop words
+    are filtered from the finished tables (see `frequencies`) rather than
+    from every token.
+    """
+
+    def __init__(self, token_pattern: str = WORD_PATTERN):
+        """
+        Args:
+            token_pattern: Regular expression of a word
+        """
+        self.token_pattern = token_pattern
+        # (group column, group) -> word counts
+        self._counts: Dict[Tuple[str, object], pd.Series] = {}
+        self.documents = 0
+
+    def update(self, texts: pd.Series, groups: Optional[pd.DataFrame] = None,
+               weights: Optional[pd.Series] = None):
+        """
+        Count the words of one chunk of tweets.
+
+        Args:
+            texts: Tweet texts
+            groups: Columns to group by (e.g. sentiment), aligned with `texts`
+            weights: Weight of each tweet (default 1)
+        """
+        if not len(texts):
+            return
+        pattern = re.compile(self.token_pattern)
+        tokens = [pattern.findall(text.lower()) for text in texts.fillna('').astype(str).tolist()]
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+        codes, words = pd.factorize(np.fromiter(chain.from_iterable(tokens), dtype=object,
+                                                count=int(lengths.sum())))
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        token_weights = (np.ones(len(texts)) if weights is None else np.asarray(weights, dtype='float64'))[owner]
+        self.documents += len(texts)
+
+        group_codes = {OVERALL: (np.zeros(len(texts), dtype=np.int64), np.array([None], dtype=object))}
+        for column in ([] if groups is None else groups.columns):
+            group, uniques = pd.factorize(groups[column], use_na_sentinel=True)
+            group_codes[column] = (group, np.asarray(uniques, dtype=object))
+
+        for column, (group, uniques) in group_codes.items():
+            token_group = group[owner]
+            valid = token_group >= 0
+            combined, inverse = np.unique(token_group[valid] * len(words) + codes[valid], return_inverse=True)
+            if not len(combined):
+                continue
+            totals = np.bincount(inverse, weights=token_weights[valid])
+            combined_group, combined_word = np.divmod(combined, len(words))
+            bounds = np.flatnonzero(np.diff(combined_group)) + 1
+            for part_words, part_totals, code in zip(np.split(combined_word, bounds), np.split(totals, bounds),
+                                                     combined_group[np.concatenate(([0], bounds))]):
+                counts = pd.Series(part_totals, index=pd.Index(words[part_words], dtype=object))
+                key = (column, uniques[code])
+                self._counts[key] = counts if key not in self._counts else self._counts[key].add(counts, fill_value=0)
+
+    def groups(self, column: str = OVERALL) -> List[object]:
+        """Groups of a column that have words."""
+        return sorted({group for (col, group) in self._counts if col == column}, key=str)
+
+    def total(self, column: str = OVERALL, group: object = None) -> float:
+        """Number of words (weighted) in a group, stop words included."""
+        counts = self._counts.get((column, group))
+        return 0.0 if counts is None else float(counts.sum())
+
+    def frequencies(self, column: str = OVERALL, group: object = None, stop_words: Iterable[str] = (),
+                    max_words: Optional[int] = None) -> Dict[str, float]:
+        """
+        Word frequencies of one group, cleaned the way WordCloud.process_text does.
+
+        Stop words are dropped, a trailing "'s" is stripped, numbers are
+        dropped, and a plural ending in 's' is merged into its singular when
+        both occur.
+
+        Args:
+            column: Group column, or 'overall'
+            group: Group value (ignored for 'overall')
+            stop_words: Words to drop (case-insensitive)
+            max_words: Keep only this many of the most frequent words
+
+        Returns:
+            Dict[str, float]: Word -> count, most frequent first
+        """
+        counts = self._counts.get((column, group))
+        if counts is None:
+            return {}
+        stop_words = {word.lower() for word in stop_words}
+
+        words = counts.index.to_series()
+        words = words.where(~words.str.endswith("'s"), words.str[:-2])
+        counts = counts.groupby(words.to_numpy()).sum()
+        counts = counts[[word not in stop_words and not word.isdigit() for word in counts.index.tolist()]]
+
+        # Fold plurals into singulars that also occur
+        vocabulary = set(counts.index.tolist())
+        plurals = [word for word in vocabulary
+                   if word.endswith('s') and not word.endswith('ss') and word[:-1] in vocabulary]
+        if plurals:
+            singulars = pd.Series(counts[plurals].to_numpy(), index=[word[:-1] for word in plurals])
+            counts = counts.drop(plurals).add(singulars, fill_value=0)
+
+        # Most frequent first, ties alphabetically so the layout is stable
+        counts = counts[counts > 0]
+        order = np.lexsort((counts.index.to_numpy(dtype=str), -counts.to_numpy()))
+        counts = counts.iloc[order]
+        if max_words is not None:
+            counts = counts.head(max_words)
+        return counts.to_dict()
+
+def count_words(texts: pd.Series, groups: Optional[pd.DataFrame] = None, weights: Optional[pd.Series] = None,
+                chunk_size: int = 50_000, **kwargs) -> WordCounter:
+    """
+    Count the words of a column of tweets in chunks.
+
+    Args:
+        texts: Tweet texts
+        groups: Columns to group by, aligned with `texts`
+        weights: Weight of each tweet (default 1)
+        chunk_size: Tweets per chunk
+        **kwargs: Passed to WordCounter
+
+    Returns:
+        WordCounter: The filled counter
+    """
+    counter = WordCounter(**kwargs)
+    for start in range(0, len(texts), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        counter.update(texts.iloc[chunk],
+                       None if groups is None else groups.iloc[chunk],
+                       None if weights is None else weights.iloc[chunk])
+    logger.info(f"Counted the words of {counter.documents} tweets in chunks of {chunk_size}")
+    return counter
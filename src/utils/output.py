@@ -0,0 +1,315 @@
+import ast
+import os
+import shutil
+from typing import Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+from src.utils.data_processor import CATEGORY_FIELDS, COUNT_FIELDS, LIST_FIELDS, STRING_FIELDS, parse_created_time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+logger = setup_logger('output')
+
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Unfinished Parquet/Arrow outputs (`.part` files and date-range shards) are
+# staged as Arrow IPC streams: one schema message, then one record batch per
+# page, so they can be appended to and truncated back to a page boundary
+# just like a CSV
+STAGING_EXTENSION = '.arrows'
+
+# Rows per Parquet row group / Arrow record batch in finished files
+ROW_GROUP_ROWS = 65536
+
+# List-valued columns; `keywords` is added by the consolidated dataset
+LIST_COLUMNS = tuple(LIST_FIELDS.values()) + ('keywords',)
+
+COMPRESSIONS = {'parquet': ('zstd', 'snappy', 'gzip', 'none'), 'arrow': ('zstd', 'lz4', 'none')}
+
+def resolve_format(output_format: str, compression: Optional[str] = None) -> str:
+    """
+    Check an output format and its compression codec.
+
+    Args:
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet ('zstd', 'snappy', 'gzip', 'none')
+            or arrow ('zstd', 'lz4', 'none'); ignored for csv
+
+    Returns:
+        str: The output format
+    """
+    if output_format not in EXTENSIONS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format == 'csv':
+        return output_format
+    if pa is None:
+        raise ImportError(f"The pyarrow package is required for {output_format} output")
+    if compression and compression not in COMPRESSIONS[output_format]:
+        raise ValueError(f"Unsupported {output_format} compression: {compression}")
+    return output_format
+
+def _column_types() -> dict:
+    """Arrow type of every column the tweet DataFrame can hold."""
+    types = {column: pa.string() for column in STRING_FIELDS.values()}
+    types.update({column: pa.string() for column in CATEGORY_FIELDS.values()})
+    types.update({column: pa.from_numpy_dtype(dtype) for column, dtype in COUNT_FIELDS.values()})
+    types.update({column: pa.list_(pa.string()) for column in LIST_COLUMNS})
+    types['created_time'] = pa.timestamp('us')
+    return types
+
+def to_arrow(df: pd.DataFrame) -> 'pa.Table':
+    """
+    Convert an output DataFrame to an Arrow table with a fixed schema.
+
+    The types come from the column, not from the values of each page, so
+    every batch of a file shares one schema: counts stay integers (nullable),
+    created_time a timestamp and the tag columns lists of strings.
+    Categorical columns are stored as plain strings, which Parquet
+    dictionary-encodes on its own, so pages with different categories still
+    line up. Timezone-aware timestamps are stored as naive UTC.
+    """
+    types = _column_types()
+    created_time = df.get('created_time')
+    if created_time is not None and getattr(created_time.dtype, 'tz', None) is not None:
+        df = df.assign(created_time=created_time.dt.tz_convert('UTC').dt.tz_localize(None))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([
+        pa.field(field.name, types.get(field.name, pa.string() if pa.types.is_null(field.type) else field.type))
+        for field in table.schema
+    ])
+    return table.cast(schema)
+
+def _format_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Write a parsed created_time back out as ISO 8601 text for CSV output.
+
+    Seconds carry as many fractional digits as the column needs, and
+    timezone-aware values are written in UTC with a Z, so nothing is lost.
+    Raw created_time strings (see create_tweet_dataframe) are left as they are.
+    """
+    created_time = df.get('created_time')
+    if created_time is None or not pd.api.types.is_datetime64_any_dtype(created_time):
+        return df
+    aware = getattr(created_time.dtype, 'tz', None) is not None
+    if aware:
+        created_time = created_time.dt.tz_convert('UTC').dt.tz_localize(None)
+    values = created_time.to_numpy().astype('datetime64[us]')
+    missing = np.isnat(values)
+    micros = values[~missing].astype(np.int64) % 1_000_000
+    unit = 's' if not micros.any() else 'ms' if not (micros % 1000).any() else 'us'
+    text = np.datetime_as_string(values, unit=unit, timezone='UTC' if aware else 'naive').astype(object)
+    text[missing] = None
+    return df.assign(created_time=text)
+
+def staged_path(path: str, output_format: str) -> str:
+    """Return the file an output is staged in while it is being written."""
+    if output_format == 'csv':
+        return path
+    return f"{os.path.splitext(path)[0]}{STAGING_EXTENSION}"
+
+def append_frame(path: str, df: pd.DataFrame, output_format: str) -> int:
+    """
+    Append rows to a staged output file, creating it if missing or empty.
+
+    CSVs get a header when the file is new. Any other format is appended as
+    one record batch of an Arrow IPC stream, preceded by the schema message
+    when the file is new.
+
+    Args:
+        path: Staged file (a CSV, or an Arrow IPC stream)
+        df: Rows to append
+        output_format: 'csv', 'parquet' or 'arrow'
+
+    Returns:
+        int: Size of the file after the append
+    """
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    if output_format == 'csv':
+        _format_dates(df).to_csv(path, mode='w' if new_file else 'a', header=new_file, index=False)
+        return os.path.getsize(path)
+
+    table = to_arrow(df)
+    with open(path, 'wb' if new_file else 'ab') as f:
+        if new_file:
+            f.write(table.schema.serialize())
+        for batch in table.to_batches():
+            f.write(batch.serialize())
+    return os.path.getsize(path)
+
+def iter_batches(path: str) -> Iterator['pa.RecordBatch']:
+    """Stream the record batches of a staged stream or a finished Parquet/Arrow file."""
+    if path.endswith(STAGING_EXTENSION) or path.endswith(f"{STAGING_EXTENSION}.part"):
+        with pa.OSFile(path, 'rb') as source:
+            yield from pa.ipc.open_stream(source)
+    elif path.endswith(EXTENSIONS['parquet']):
+        yield from pa.parquet.ParquetFile(path).iter_batches()
+    else:
+        with pa.memory_map(path, 'rb') as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+def write_output(sources: List[str], path: str, output_format: str, compression: Optional[str] = None):
+    """
+    Write the concatenation of output files to `path` in the final format.
+
+    CSV sources are concatenated with a single header. Parquet/Arrow sources
+    (staged streams or finished files) are regrouped into row groups (record
+    batches for Arrow) of up to ROW_GROUP_ROWS rows, since one small batch
+    per page compresses and scans poorly. `path` is written in place;
+    callers write to a temporary name and rename it.
+
+    Args:
+        sources: Files to concatenate, in order; missing files are skipped
+        path: Output file
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet or arrow output
+    """
+    sources = [source for source in sources if os.path.exists(source)]
+    if output_format == 'csv':
+        with open(path, 'wb') as out:
+            for i, source in enumerate(sources):
+                with open(source, 'rb') as f:
+                    if i:
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+        return
+
+    compression = None if compression in (None, 'none') else compression
+    writer, pending, pending_rows = None, [], 0
+
+    def flush():
+        table = pa.Table.from_batches(pending).combine_chunks()
+        if output_format == 'parquet':
+            writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+        else:
+            writer.write_table(table, max_chunksize=ROW_GROUP_ROWS)
+        pending.clear()
+
+    try:
+        for source in sources:
+            for batch in iter_batches(source):
+                if writer is None:
+                    if output_format == 'parquet':
+                        writer = pa.parquet.ParquetWriter(path, batch.schema, compression=compression or 'none')
+                    else:
+                        options = pa.ipc.IpcWriteOptions(compression=compression)
+                        writer = pa.ipc.new_file(path, batch.schema, options=options)
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= ROW_GROUP_ROWS:
+                    flush()
+                    pending_rows = 0
+        if pending:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_frame(df: pd.DataFrame, path: str, output_format: str, compression: Optional[str] = None):
+    """
+    Write a whole DataFrame to `path` in the output format, replacing it atomically.
+
+    Args:
+        df: Rows to write
+        path: Output file
+        output_format: 'csv', 'parquet' or 'arrow'
+        compression: Codec for parquet or arrow output
+    """
+    tmp_path = f"{path}.tmp"
+    compression = None if compression in (None, 'none') else compression
+    try:
+        if output_format == 'csv':
+            _format_dates(df).to_csv(tmp_path, index=False)
+        elif output_format == 'parquet':
+            pa.parquet.write_table(to_arrow(df), tmp_path, compression=compression or 'none',
+                                   row_group_size=ROW_GROUP_ROWS)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            table = to_arrow(df)
+            with pa.ipc.new_file(tmp_path, table.schema, options=options) as writer:
+                writer.write_table(table, max_chunksize=ROW_GROUP_ROWS)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def parse_list_cells(series: pd.Series) -> pd.Series:
+    """Parse list cells written to CSV as Python literals, once per distinct value."""
+    parsed = {}
+    for value in series.dropna().unique():
+        try:
+            cell = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            cell = None
+        parsed[value] = cell if isinstance(cell, list) else []
+
+    values = np.empty(len(series), dtype=object)
+    values[:] = [list(parsed[value]) if value in parsed else [] for value in series.tolist()]
+    return pd.Series(values, index=series.index, name=series.name)
+
+def _read_csv_output(path: str) -> pd.DataFrame:
+    """Load an output CSV with the same column types as a Parquet/Arrow output."""
+    df = pd.read_csv(path)
+    if 'created_time' in df.columns:
+        df['created_time'] = parse_created_time(df['created_time'])
+    for column, dtype in COUNT_FIELDS.values():
+        if column in df.columns:
+            bits = np.dtype(dtype).itemsize * 8
+            df[column] = df[column].astype(f"Int{bits}" if df[column].isna().any() else dtype)
+    for column in CATEGORY_FIELDS.values():
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_list_cells(df[column])
+    return df
+
+def read_output(path: str) -> pd.DataFrame:
+    """
+    Load an output file written in any format as a DataFrame.
+
+    Every format comes back with the same types: integer counts, a datetime
+    created_time, categorical text_lang/post_type/source and the list
+    columns as Python lists (parsed back from their text form for CSVs).
+
+    Args:
+        path: Output file (.csv, .parquet, .arrow or a staged .arrows stream)
+
+    Returns:
+        pd.DataFrame: The output rows
+    """
+    if path.endswith(EXTENSIONS['csv']):
+        return _read_csv_output(path)
+    if pa is None:
+        raise ImportError(f"The pyarrow package is required to read {path}")
+
+    if path.endswith(EXTENSIONS['parquet']):
+        table = pa.parquet.read_table(path)
+    else:
+        table = pa.Table.from_batches(list(iter_batches(path)))
+
+    df = table.to_pandas()
+    for column, _ in COUNT_FIELDS.values():
+        # Counts with gaps would otherwise come back as floats
+        if column in df.columns and table.column(column).null_count:
+            df[column] = table.column(column).to_pandas(types_mapper=pd.ArrowDtype).astype(
+                f"Int{table.schema.field(column).type.bit_width}"
+            )
+    for column in CATEGORY_FIELDS.values():
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            values = np.empty(len(df), dtype=object)
+            values[:] = table.column(column).to_pylist()
+            df[column] = values
+    return df
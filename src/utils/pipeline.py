@@ -0,0 +1,314 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.utils.logger import setup_logger
+
+logger = setup_logger('pipeline')
+
+@dataclass
+class Stage:
+    """A named analysis step with declared input and output artifacts."""
+    name: str
+    func: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Parameters naming files whose contents are part of the cache key
+    files: Tuple[str, ...] = ()
+
+# Digests of input files, remembered by size and modification time
+FILE_DIGESTS = '_files.json'
+
+def _file_digest(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _stable_json(value: Any) -> str:
+    """JSON of a constant, with sets sorted so it hashes the same in every process."""
+    def default(obj):
+        if isinstance(obj, (set, frozenset)):
+            return sorted(obj, key=str)
+        return repr(obj)
+    try:
+        return json.dumps(value, sort_keys=True, default=default)
+    except TypeError:
+        return repr(value)
+
+def _in_packages(module_name: Optional[str], packages: Tuple[str, ...]) -> bool:
+    return bool(module_name) and any(module_name == p or module_name.startswith(f"{p}.") for p in packages)
+
+def code_digest(func: Callable, packages: Tuple[str, ...] = ('src',)) -> str:
+    """
+    Hash the code a stage function runs.
+
+    Covers the function's source, every function and class of its own
+    module that it reaches by name (transitively, including ones only
+    passed along, like plotting functions), the constants of that module it
+    reads, and the source files of every module under `packages` that any
+    of them uses, along with those modules' own imports from `packages`.
+    """
+    digest = hashlib.sha256()
+    home = func.__module__
+    seen: Set[int] = set()
+    pending: List[Callable] = [func]
+    modules: Set[str] = set()
+
+    def reach(value: Any):
+        if inspect.ismodule(value):
+            name = value.__name__
+        else:
+            name = getattr(value, '__module__', None)
+        if _in_packages(name, packages) and name not in modules:
+            modules.add(name)
+            # A module's own imports from the packages are part of its code too
+            module = sys.modules.get(name)
+            for member in vars(module).values() if module else ():
+                reach(member)
+
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        try:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+        except (OSError, TypeError):
+            pass
+        if not inspect.isfunction(obj):
+            continue
+
+        names: Set[str] = set()
+        codes = [obj.__code__]
+        while codes:
+            code = codes.pop()
+            names.update(code.co_names)
+            codes.extend(const for const in code.co_consts if inspect.iscode(const))
+
+        for name in sorted(names):
+            if name not in obj.__globals__:
+                continue
+            value = obj.__globals__[name]
+            if (inspect.isfunction(value) or inspect.isclass(value)) and value.__module__ == home:
+                pending.append(value)
+            elif inspect.ismodule(value) or callable(value) or _in_packages(getattr(value, '__module__', None), packages):
+                reach(value)
+            else:
+                digest.update(f"{name}={_stable_json(value)}".encode('utf-8'))
+
+    for name in sorted(modules):
+        path = getattr(sys.modules.get(name), '__file__', None)
+        if path and os.path.exists(path):
+            digest.update(name.encode('utf-8'))
+            digest.update(_file_digest(path).encode('utf-8'))
+    return digest.hexdigest()
+
+class Pipeline:
+    """
+    Dependency-aware runner for cached analysis stages.
+
+    Each stage declares the artifacts it reads and writes. Its cache key is a
+    hash of its code (see `code_digest`: the stage function, the helpers and
+    constants it reaches, and the project modules they use), its parameters (plus the contents of any input files)
+    and the keys of the stages producing its inputs, so a change anywhere
+    upstream invalidates everything downstream of it and nothing else.
+    Outputs are pickled under `cache_dir/<stage>/<key>.pkl`.
+
+    Running a selection of stages executes exactly those stages, plus any
+    upstream stage whose outputs are not cached under its current key;
+    fresh upstream outputs are loaded from the cache only when a running
+    stage needs them.
+    """
+
+    def __init__(self, cache_dir: str, keep: int = 3, packages: Iterable[str] = ('src',)):
+        """
+        Args:
+            cache_dir: Root directory of the artifact cache
+            keep: Cached results kept per stage (the most recent ones)
+            packages: Packages whose modules count as a stage's code
+        """
+        self.cache_dir = cache_dir
+        self.keep = keep
+        self.packages = tuple(packages)
+        self.stages: Dict[str, Stage] = {}
+        self._producers: Dict[str, str] = {}
+
+    def file_digest(self, path: str) -> str:
+        """
+        Content hash of an input file.
+
+        Hashes are remembered in the cache under the file's size and
+        modification time, so an unchanged dataset is not re-read on every run.
+        """
+        memo_path = os.path.join(self.cache_dir, FILE_DIGESTS)
+        memo = {}
+        if os.path.exists(memo_path):
+            with open(memo_path, encoding='utf-8') as f:
+                memo = json.load(f)
+
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        entry = memo.get(os.path.abspath(path))
+        if entry and entry['signature'] == signature:
+            return entry['digest']
+
+        digest = _file_digest(path)
+        memo[os.path.abspath(path)] = {'signature': signature, 'digest': digest}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f"{memo_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(memo, f, indent=2)
+        os.replace(f"{memo_path}.tmp", memo_path)
+        return digest
+
+    def stage(self, name: str, inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+              params: Optional[Dict[str, Any]] = None, files: Iterable[str] = ()):
+        """
+        Register a stage function. It is called with its input artifacts and
+        parameters as keyword arguments and returns a dict of its outputs.
+        """
+        def register(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+            stage = Stage(name, func, tuple(inputs), tuple(outputs), dict(params or {}), tuple(files))
+            for artifact in stage.inputs:
+                if artifact not in self._producers:
+                    raise ValueError(f"Stage {name} reads {artifact}, which no earlier stage produces")
+            for artifact in stage.outputs:
+                self._producers[artifact] = name
+            self.stages[name] = stage
+            return func
+        return register
+
+    def upstream(self, names: Iterable[str]) -> List[str]:
+        """Return the named stages and every stage they depend on, in run order."""
+        needed: Set[str] = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self._producers[artifact] for artifact in self.stages[name].inputs)
+        return [name for name in self.stages if name in needed]
+
+    def resolve_params(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Merge per-stage parameter overrides into the declared defaults."""
+        overrides = overrides or {}
+        resolved = {}
+        for name, stage in self.stages.items():
+            unknown = set(overrides.get(name, {})) - set(stage.params)
+            if unknown:
+                raise KeyError(f"Unknown parameters for stage {name}: {sorted(unknown)}")
+            resolved[name] = {**stage.params, **overrides.get(name, {})}
+        for name in set(overrides) - set(self.stages):
+            raise KeyError(f"Unknown stage: {name}")
+        return resolved
+
+    def keys(self, names: Iterable[str], params: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Compute the cache key of the named stages and of everything upstream."""
+        keys: Dict[str, str] = {}
+        for name in self.upstream(names):
+            stage = self.stages[name]
+            digest = hashlib.sha256()
+            digest.update(name.encode('utf-8'))
+            digest.update(code_digest(stage.func, self.packages).encode('utf-8'))
+            digest.update(json.dumps(params[name], sort_keys=True, default=str).encode('utf-8'))
+            for param in stage.files:
+                digest.update(self.file_digest(params[name][param]).encode('utf-8'))
+            for artifact in stage.inputs:
+                digest.update(keys[self._producers[artifact]].encode('utf-8'))
+            keys[name] = digest.hexdigest()[:16]
+        return keys
+
+    def _cache_path(self, name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, name, f"{key}.pkl")
+
+    def is_fresh(self, name: str, key: str) -> bool:
+        """Whether the outputs of a stage are cached under its current key."""
+        return os.path.exists(self._cache_path(name, key))
+
+    def _load(self, name: str, key: str) -> Dict[str, Any]:
+        with open(self._cache_path(name, key), 'rb') as f:
+            return pickle.load(f)
+
+    def _save(self, name: str, key: str, outputs: Dict[str, Any]):
+        path = self._cache_path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'wb') as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+
+        # Keep only the most recent results of this stage
+        stage_dir = os.path.dirname(path)
+        entries = sorted(
+            (entry for entry in os.scandir(stage_dir) if entry.name.endswith('.pkl')),
+            key=lambda entry: entry.stat().st_mtime, reverse=True
+        )
+        for entry in entries[self.keep:]:
+            os.remove(entry.path)
+
+    def status(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Tuple[str, str, bool]]:
+        """Return (stage, key, fresh) for every stage."""
+        params = self.resolve_params(overrides)
+        keys = self.keys(self.stages, params)
+        return [(name, keys[name], self.is_fresh(name, keys[name])) for name in self.stages]
+
+    def run(self, names: Optional[Iterable[str]] = None,
+            overrides: Optional[Dict[str, Dict[str, Any]]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Run the stale stages, plus the named stages whether or not they are stale.
+
+        With no `names`, every stage is considered and the ones whose outputs
+        are cached under their current key are skipped, so changing one
+        parameter only re-runs its stage and what depends on it. Named stages
+        always run, along with whatever upstream of them is stale.
+
+        Args:
+            names: Stages to run (default: all stale stages)
+            overrides: Parameter overrides, {stage: {param: value}}
+            force: With no `names`, re-run every stage, cached or not
+
+        Returns:
+            Dict[str, Any]: Every artifact produced or loaded during the run
+        """
+        selected = list(names) if names else list(self.stages)
+        forced = set(selected) if names or force else set()
+        params = self.resolve_params(overrides)
+        keys = self.keys(selected, params)
+        artifacts: Dict[str, Any] = {}
+
+        def fetch(artifact: str) -> Any:
+            if artifact not in artifacts:
+                producer = self._producers[artifact]
+                logger.info(f"Loading {producer} outputs from cache ({keys[producer]})")
+                artifacts.update(self._load(producer, keys[producer]))
+            return artifacts[artifact]
+
+        for name in self.upstream(selected):
+            stage = self.stages[name]
+            if name not in forced and self.is_fresh(name, keys[name]):
+                if name in selected:
+                    logger.info(f"Stage {name} is up to date ({keys[name]})")
+                continue
+
+            logger.info(f"Running stage {name} ({keys[name]})")
+            start = time.perf_counter()
+            outputs = stage.func(**{artifact: fetch(artifact) for artifact in stage.inputs}, **params[name])
+            missing = set(stage.outputs) - set(outputs or {})
+            if missing:
+                raise ValueError(f"Stage {name} did not return {sorted(missing)}")
+
+            outputs = {artifact: outputs[artifact] for artifact in stage.outputs}
+            self._save(name, keys[name], outputs)
+            artifacts.update(outputs)
+            logger.info(f"Stage {name} finished in {time.perf_counter() - start:.2f}s")
+
+        return artifacts
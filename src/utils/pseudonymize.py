@@ -0,0 +1,151 @@
+import hashlib
+import os
+import secrets
+from itertools import chain
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+logger = setup_logger('pseudonymize')
+
+# Bytes of keyed hash in each pseudonym (64 bits, 16 hex digits)
+TOKEN_BYTES = 8
+KEY_BYTES = 32
+
+def load_key(key_file: str) -> bytes:
+    """
+    Read the pseudonymization key, creating a random one if the file is missing.
+
+    Every dataset pseudonymized with the same key file gets the same IDs, so
+    share the file (not the IDs' raw names) between machines that need to
+    join their outputs.
+
+    Args:
+        key_file: File holding the key as hex
+
+    Returns:
+        bytes: The key
+    """
+    if not os.path.exists(key_file):
+        os.makedirs(os.path.dirname(key_file) or '.', exist_ok=True)
+        # Readable by the owner only; the key is what keeps the names unguessable
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(KEY_BYTES))
+        logger.info(f"Created pseudonymization key {key_file}")
+
+    with open(key_file, encoding='utf-8') as f:
+        return bytes.fromhex(f.read().strip())
+
+class Pseudonymizer:
+    """
+    Replace user names with keyed-hash pseudonyms.
+
+    A name maps to `<prefix><16 hex digits of keyed BLAKE2b(key, name)>`,
+    after stripping a leading '@' and lowercasing (handles are
+    case-insensitive), so the same user gets the same ID in every file,
+    chunk and run that uses the same key, whether they appear as an author
+    or as a tagged user. Without the key the names cannot be recovered by
+    hashing candidate handles.
+
+    Each distinct name in a column is hashed once and the IDs are
+    broadcast back through the factorized codes. Names already seen are
+    remembered, so streaming chunks through one instance only hashes the
+    names new to each chunk.
+    """
+
+    def __init__(self, key: bytes, prefix: str = 'user_'):
+        """
+        Args:
+            key: Secret hashing key
+            prefix: Prefix of every pseudonym
+        """
+        if not key or len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise ValueError(f"The pseudonymization key must be 1 to {hashlib.blake2b.MAX_KEY_SIZE} bytes")
+        # BLAKE2 in keyed mode is a MAC; names hash from a copy of the keyed state
+        self._hash = hashlib.blake2b(key=key, digest_size=TOKEN_BYTES)
+        self.prefix = prefix
+        self._tokens: Dict[str, str] = {}
+
+    def token(self, name: str) -> str:
+        """Return the pseudonym of one name."""
+        token = self._tokens.get(name)
+        if token is None:
+            normalized = name.strip().lstrip('@').lower()
+            digest = self._hash.copy()
+            digest.update(normalized.encode('utf-8'))
+            token = self._tokens[name] = f"{self.prefix}{digest.hexdigest()}"
+        return token
+
+    def _lookup(self, values) -> np.ndarray:
+        """Pseudonyms of `values` through their distinct values; missing values stay None."""
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        # Code -1 (missing) picks the trailing None
+        lookup = np.empty(len(uniques) + 1, dtype=object)
+        lookup[:-1] = [self.token(name if isinstance(name, str) else str(name)) for name in uniques.tolist()]
+        lookup[-1] = None
+        return lookup[codes]
+
+    def pseudonymize(self, series: pd.Series) -> pd.Series:
+        """
+        Pseudonymize a column of names.
+
+        Args:
+            series: Names (strings or categorical)
+
+        Returns:
+            pd.Series: Pseudonyms, missing where the name was missing
+        """
+        return pd.Series(self._lookup(series), index=series.index, name=series.name, dtype='str')
+
+    def pseudonymize_lists(self, series: pd.Series) -> pd.Series:
+        """
+        Pseudonymize a column of name lists, such as text_tagged_users.
+
+        The lists are flattened so every distinct name in the column is
+        hashed once, then cut back into lists at the original offsets.
+        Cells that are not lists are left as they are.
+
+        Args:
+            series: Lists of names
+
+        Returns:
+            pd.Series: Lists of pseudonyms
+        """
+        cells = series.to_numpy(dtype=object)
+        rows = np.flatnonzero([isinstance(cell, list) for cell in cells])
+        if not len(rows):
+            return series
+
+        lists = cells[rows].tolist()
+        offsets = np.concatenate(([0], np.cumsum([len(cell) for cell in lists]))).tolist()
+        flat = self._lookup(np.array(list(chain.from_iterable(lists)), dtype=object)).tolist()
+
+        values = cells.copy()
+        for i, row in enumerate(rows.tolist()):
+            values[row] = flat[offsets[i]:offsets[i + 1]]
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def pseudonymize_frame(self, df: pd.DataFrame, columns: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """
+        Pseudonymize the user columns of a DataFrame (or one chunk of a stream).
+
+        Args:
+            df: Rows to pseudonymize
+            columns: Column -> 'name' or 'list'; defaults to author_username
+                and text_tagged_users
+
+        Returns:
+            pd.DataFrame: A copy with the present columns replaced
+        """
+        columns = columns or {'author_username': 'name', 'text_tagged_users': 'list'}
+        replaced = {}
+        for column, kind in columns.items():
+            if column not in df.columns:
+                continue
+            if kind == 'list':
+                replaced[column] = self.pseudonymize_lists(df[column])
+            else:
+                replaced[column] = self.pseudonymize(df[column])
+        return df.assign(**replaced)
@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Dict, Any, Optional
+from src.utils.logger import setup_logger
+
+logger = setup_logger('rate_limiter')
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose refill rate adapts to server feedback.
+
+    Callers take one token per request. The rate starts at the configured
+    budget, is halved whenever the server throttles (429), and creeps back up
+    by `recovery_step` requests/second for every healthy response until it
+    reaches the budget again. A Retry-After value pauses every caller until it
+    has elapsed.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.1,
+                 recovery_step: float = 0.05):
+        """
+        Args:
+            rate: Requests-per-second budget (the ceiling the limiter recovers to)
+            burst: Maximum number of tokens that can accumulate
+            min_rate: Lowest rate the limiter backs off to
+            recovery_step: Rate increase applied after each healthy response
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.recovery_step = recovery_step
+        self.burst = max(1, burst)
+
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+        self._throttled = 0
+        self._total_wait = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Current refill rate in requests per second."""
+        with self._lock:
+            return self._rate
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    self._total_wait += waited
+                    return waited
+                else:
+                    delay = (1 - self._tokens) / self._rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        """Record a healthy response and speed back up towards the budget."""
+        with self._lock:
+            if self._rate < self.max_rate:
+                self._rate = min(self.max_rate, self._rate + self.recovery_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        Record a 429 response: halve the rate and honour Retry-After.
+
+        Args:
+            retry_after: Seconds the server asked us to wait, if given
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._throttled += 1
+            self._rate = max(self.min_rate, self._rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            rate = self._rate
+
+        logger.warning(
+            f"Throttled by server; rate lowered to {rate:.2f} req/s"
+            + (f", pausing {retry_after:.0f}s" if retry_after else "")
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the limiter state.
+
+        Returns:
+            Dict[str, Any]: Current rate, throttle count and total wait time
+        """
+        with self._lock:
+            return {
+                'rate': round(self._rate, 3),
+                'max_rate': self.max_rate,
+                'throttled': self._throttled,
+                'total_wait': round(self._total_wait, 3)
+            }
@@ -0,0 +1,265 @@
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+import threading
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+from src.utils.logger import setup_logger
+
+logger = setup_logger('seen_index')
+
+# Tweet fields stored with each membership, so consolidation can find the
+# saved row a duplicate sighting belongs to (the outputs carry no tweet id)
+MEMBERSHIP_FIELDS = ('author_username', 'created_time', 'text')
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys, stored in a bytearray."""
+
+    _HEADER = struct.Struct('<QQQ')
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Args:
+            capacity: Number of keys the filter is sized for
+            error_rate: Target false-positive rate at full capacity
+        """
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        """Add a key to the filter."""
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path: str):
+        """Write the filter to disk atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._HEADER.pack(self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Load a previously saved filter with the same geometry.
+
+        Returns:
+            bool: True if the file matched this filter's size and was loaded
+        """
+        with open(path, 'rb') as f:
+            num_bits, num_hashes, count = self._HEADER.unpack(f.read(self._HEADER.size))
+            if num_bits != self.num_bits or num_hashes != self.num_hashes:
+                return False
+            bits = f.read()
+
+        if len(bits) != len(self.bits):
+            return False
+
+        self.bits = bytearray(bits)
+        self.count = count
+        return True
+
+class SeenIndex:
+    """
+    Persistent index of tweet IDs already written by the collector.
+
+    An in-memory Bloom filter answers "definitely new" for most lookups without
+    touching disk; possible hits are confirmed against an exact SQLite table.
+    Each ID is owned by the first (keyword, period) that saved it. Later
+    sightings under other keywords or periods are recorded as memberships
+    instead of being written again. IDs owned by the task being collected are
+    always treated as new, so re-running or resuming a task rewrites its own
+    tweets.
+    """
+
+    def __init__(self, path: str, capacity: int = 20_000_000, error_rate: float = 0.001):
+        """
+        Args:
+            path: Location of the SQLite database; the Bloom filter is saved next to it
+            capacity: Expected number of distinct tweet IDs
+            error_rate: Bloom filter false-positive rate at full capacity
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.bloom_path = f"{os.path.splitext(path)[0]}.bloom"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                tweet_id TEXT PRIMARY KEY,
+                keyword TEXT NOT NULL,
+                period TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS memberships (
+                tweet_id TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                period TEXT NOT NULL,
+                author_username TEXT,
+                created_time TEXT,
+                text TEXT,
+                PRIMARY KEY (tweet_id, keyword, period)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('count', 0);
+        """)
+        # Indexes created before memberships stored their tweet's fields
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(memberships)")}
+        for field in MEMBERSHIP_FIELDS:
+            if field not in columns:
+                self._conn.execute(f"ALTER TABLE memberships ADD COLUMN {field} TEXT")
+        self._conn.commit()
+
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._load_bloom()
+
+    def _stored_count(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'count'").fetchone()[0]
+
+    def _load_bloom(self):
+        """Load the saved Bloom filter, rebuilding it from SQLite if it is stale or missing."""
+        stored = self._stored_count()
+        if os.path.exists(self.bloom_path) and self.bloom.load(self.bloom_path) and self.bloom.count == stored:
+            logger.info(f"Loaded seen-ID index with {stored:,} tweet IDs")
+            return
+
+        if stored:
+            logger.info(f"Rebuilding Bloom filter from {stored:,} stored tweet IDs")
+        self.bloom.bits = bytearray(len(self.bloom.bits))
+        self.bloom.count = 0
+        for (tweet_id,) in self._conn.execute("SELECT tweet_id FROM seen"):
+            self.bloom.add(tweet_id)
+
+    def filter_new(self, items: List[Dict[str, Any]], keyword: str, period: str) -> List[Dict[str, Any]]:
+        """
+        Return the items whose tweet ID has not been saved by another task.
+
+        New IDs are claimed for (keyword, period); duplicates are recorded as
+        memberships of (keyword, period). Items without an ID are kept.
+
+        Args:
+            items: Raw tweet dictionaries from one API page
+            keyword: Search keyword being collected
+            period: Date range name being collected
+
+        Returns:
+            List[Dict[str, Any]]: Items to write for this keyword/period
+        """
+        kept, claims, memberships = [], [], []
+        batch_ids = set()
+
+        with self._lock:
+            for item in items:
+                tweet_id = item.get('id')
+                if tweet_id is None:
+                    kept.append(item)
+                    continue
+
+                tweet_id = str(tweet_id)
+                if tweet_id in batch_ids:
+                    continue
+                batch_ids.add(tweet_id)
+
+                if tweet_id in self.bloom:
+                    row = self._conn.execute(
+                        "SELECT keyword, period FROM seen WHERE tweet_id = ?", (tweet_id,)
+                    ).fetchone()
+                    if row is not None:
+                        if row == (keyword, period):
+                            kept.append(item)
+                        else:
+                            memberships.append((tweet_id, keyword, period,
+                                                *(item.get(field) for field in MEMBERSHIP_FIELDS)))
+                        continue
+
+                claims.append((tweet_id, keyword, period))
+                kept.append(item)
+
+            if claims or memberships:
+                self._conn.executemany("INSERT INTO seen (tweet_id, keyword, period) VALUES (?, ?, ?)", claims)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO memberships (tweet_id, keyword, period, author_username, created_time, text) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", memberships
+                )
+                self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'count'", (len(claims),))
+                self._conn.commit()
+
+                for tweet_id, _, _ in claims:
+                    self.bloom.add(tweet_id)
+
+        if memberships:
+            logger.info(f"Skipped {len(memberships)} tweets already saved under other keywords/periods")
+        return kept
+
+    def keywords_for(self, tweet_id: str) -> List[Tuple[str, str]]:
+        """
+        Return every (keyword, period) a tweet was found under.
+
+        Args:
+            tweet_id: Tweet ID
+
+        Returns:
+            List[Tuple[str, str]]: Owner first, followed by duplicate memberships
+        """
+        with self._lock:
+            owner = self._conn.execute(
+                "SELECT keyword, period FROM seen WHERE tweet_id = ?", (str(tweet_id),)
+            ).fetchall()
+            others = self._conn.execute(
+                "SELECT keyword, period FROM memberships WHERE tweet_id = ?", (str(tweet_id),)
+            ).fetchall()
+        return owner + others
+
+    def iter_memberships(self) -> Iterator[Tuple[Optional[str], ...]]:
+        """Yield (tweet_id, keyword, period, *MEMBERSHIP_FIELDS) for every duplicate sighting."""
+        return iter_memberships(self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._stored_count()
+
+    def close(self):
+        """Save the Bloom filter and close the database."""
+        with self._lock:
+            self.bloom.save(self.bloom_path)
+            self._conn.close()
+
+def iter_memberships(path: str) -> Iterator[Tuple[Optional[str], ...]]:
+    """
+    Yield every duplicate sighting stored in a seen-ID index, without loading its Bloom filter.
+
+    Args:
+        path: Location of the SQLite database
+
+    Returns:
+        Iterator: (tweet_id, keyword, period, author_username, created_time,
+        text) tuples; the tweet fields are None for sightings recorded before
+        they were stored
+    """
+    conn = sqlite3.connect(path)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(memberships)")}
+        fields = [field if field in columns else 'NULL' for field in MEMBERSHIP_FIELDS]
+        yield from conn.execute(f"SELECT tweet_id, keyword, period, {', '.join(fields)} FROM memberships")
+    finally:
+        conn.close()
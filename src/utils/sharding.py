@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+DATE_FORMAT = "%Y-%m-%d"
+
+def _parse(value: str) -> date:
+    return date.fromisoformat(value)
+
+def split_window(start_date: str, end_date: str, days: int) -> List[Tuple[str, str]]:
+    """
+    Split an inclusive date window into consecutive windows of at most `days` days.
+
+    Args:
+        start_date: First day of the window (YYYY-MM-DD)
+        end_date: Last day of the window (YYYY-MM-DD)
+        days: Maximum length of each window in days
+
+    Returns:
+        List[Tuple[str, str]]: (start, end) windows, newest first to match the
+        API's date_desc ordering
+    """
+    if days < 1:
+        raise ValueError("Shard length must be at least one day")
+
+    start, end = _parse(start_date), _parse(end_date)
+    if start > end:
+        raise ValueError(f"Invalid date window: {start_date} to {end_date}")
+
+    windows = []
+    current = start
+    while current <= end:
+        window_end = min(end, current + timedelta(days=days - 1))
+        windows.append((current.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)))
+        current = window_end + timedelta(days=1)
+
+    return windows[::-1]
+
+def bisect_window(start_date: str, end_date: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Split an inclusive date window into two halves.
+
+    Args:
+        start_date: First day of the window (YYYY-MM-DD)
+        end_date: Last day of the window (YYYY-MM-DD)
+
+    Returns:
+        Optional[List[Tuple[str, str]]]: Two (start, end) halves, newest first,
+        or None if the window is a single day and cannot be split further
+    """
+    start, end = _parse(start_date), _parse(end_date)
+    span = (end - start).days
+    if span < 1:
+        return None
+
+    middle = start + timedelta(days=(span - 1) // 2)
+    return [
+        ((middle + timedelta(days=1)).strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)),
+        (start.strftime(DATE_FORMAT), middle.strftime(DATE_FORMAT))
+    ]
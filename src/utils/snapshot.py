@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather
+except ImportError:
+    pa = None
+
+logger = setup_logger('snapshot')
+
+# Schema metadata key holding the source file and read options a snapshot was built from
+SNAPSHOT_METADATA_KEY = b'csv_snapshot'
+
+def _signature(path: str, options: dict) -> dict:
+    """Identify a CSV by path, size and modification time, plus the options it was read with."""
+    stat = os.stat(path)
+    return {
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'options': hashlib.sha1(json.dumps(options, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    }
+
+def _read_snapshot(snapshot_path: str, signature: dict) -> Optional[pd.DataFrame]:
+    """Load a snapshot if it was built from the same CSV with the same options."""
+    if pa is None or not os.path.exists(snapshot_path):
+        return None
+    try:
+        table = pa.feather.read_table(snapshot_path, memory_map=True)
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning(f"Ignoring unreadable snapshot {snapshot_path}: {e}")
+        return None
+    stored = (table.schema.metadata or {}).get(SNAPSHOT_METADATA_KEY)
+    if stored is None or json.loads(stored) != signature:
+        return None
+    return table.to_pandas()
+
+def _write_snapshot(df: pd.DataFrame, snapshot_path: str, signature: dict):
+    """Write a Feather snapshot tagged with the signature of its CSV, replacing it atomically."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SNAPSHOT_METADATA_KEY: json.dumps(signature).encode('utf-8')
+    })
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    tmp_path = f"{snapshot_path}.tmp"
+    try:
+        # Uncompressed, so later loads are a memory map rather than a decode
+        pa.feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, snapshot_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_typed_csv(path: str, dtypes: Dict[str, str], date_columns: Iterable[str] = (),
+                   date_format: str = 'ISO8601', snapshot_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a CSV with declared column types, through a binary snapshot when one is current.
+
+    Only the columns named in `dtypes` are read (any that are missing from
+    the file are skipped), with their types given up front instead of
+    inferred. Columns declared 'float64' that turn out to have no missing
+    values are narrowed to int64, as counts would be. Dates are parsed with
+    a fixed format, and a value that does not match it is an error. The
+    result is written to `snapshot_path` as an uncompressed Feather file
+    tagged with the CSV's size and modification time, which later calls read
+    directly until the CSV or the options change.
+
+    Args:
+        path: CSV file
+        dtypes: Type of every column to read, e.g. {'sentiment': 'category'}
+        date_columns: Columns to parse as datetimes
+        date_format: Format of the date columns (default: ISO 8601)
+        snapshot_path: Feather snapshot to use and refresh; none if omitted or
+            without pyarrow
+
+    Returns:
+        pd.DataFrame: The typed rows
+    """
+    start = time.perf_counter()
+    date_columns = list(date_columns)
+    options = {'dtypes': dtypes, 'date_columns': date_columns, 'date_format': date_format}
+    signature = _signature(path, options)
+
+    if snapshot_path:
+        df = _read_snapshot(snapshot_path, signature)
+        if df is not None:
+            logger.info(f"Loaded {len(df)} rows from snapshot {snapshot_path} in {time.perf_counter() - start:.3f}s")
+            return df
+
+    read_types = {column: dtype for column, dtype in dtypes.items() if column not in date_columns}
+    df = pd.read_csv(path, usecols=lambda column: column in dtypes, dtype=read_types)
+    for column in date_columns:
+        if column in df.columns:
+            parsed = pd.to_datetime(df[column], format=date_format, errors='coerce')
+            unparsed = parsed.isna() & df[column].notna()
+            if unparsed.any():
+                raise ValueError(
+                    f"{int(unparsed.sum())} {column} values in {path} do not match {date_format!r}, "
+                    f"e.g. {df[column][unparsed].iloc[0]!r}"
+                )
+            df[column] = parsed
+    for column, dtype in read_types.items():
+        if column in df.columns and dtype == 'float64' and not df[column].isna().any():
+            values = df[column].to_numpy()
+            if np.array_equal(values, np.trunc(values)):
+                df[column] = values.astype(np.int64)
+    logger.info(f"Parsed {len(df)} rows from {path} in {time.perf_counter() - start:.3f}s")
+
+    if snapshot_path:
+        if pa is None:
+            logger.warning("pyarrow is not installed; not writing a snapshot")
+        else:
+            _write_snapshot(df, snapshot_path, signature)
+    return df
@@ -0,0 +1,273 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+from src.utils.logger import setup_logger
+
+logger = setup_logger('telemetry')
+
+# Upper bounds (seconds) of the histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+METRICS = {
+    'request_duration_seconds': ('histogram', "Latency of API calls by endpoint", LATENCY_BUCKETS),
+    'stage_duration_seconds': ('histogram', "Duration of local processing stages", STAGE_BUCKETS),
+    'requests_total': ('counter', "API calls by endpoint and HTTP status", None),
+    'response_bytes_total': ('counter', "Bytes received from the API, as read from the socket", None),
+    'pages_total': ('counter', "Result pages fetched by keyword", None),
+    'items_total': ('counter', "Tweets returned by the API by keyword", None),
+    'page_fetch_seconds_total': ('counter', "Time spent fetching result pages by keyword", None),
+    'sleep_seconds_total': ('counter', "Time spent waiting instead of working, by reason", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _bound(value: Optional[float]) -> Any:
+    """JSON-safe form of a bucket bound."""
+    return '+Inf' if value is not None and math.isinf(value) else value
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Return (upper bound, cumulative count) pairs, ending with +Inf."""
+        pairs, running = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket holding it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return bound
+        return math.inf
+
+class Telemetry:
+    """
+    Thread-safe registry of collection counters and histograms.
+
+    The transport records every API call (latency per endpoint, status,
+    bytes); the collector records pages, items, processing stages and every
+    sleep, so a run can be broken down into waiting versus working. A
+    snapshot can be taken at any time and exported as JSON or in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, namespace: str = 'twitter_collector'):
+        """
+        Args:
+            namespace: Prefix of the exported Prometheus metric names
+        """
+        self.namespace = namespace
+        self.started = time.monotonic()
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add `value` to a counter."""
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram."""
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as a processing stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - start, stage=stage)
+
+    def _total(self, name: str, **match) -> float:
+        return sum(
+            value for (metric, labels), value in self._counters.items()
+            if metric == name and all(dict(labels).get(k) == v for k, v in match.items())
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the headline figures of the run so far.
+
+        Returns:
+            Dict[str, Any]: Elapsed time, request and page rates, and the split
+            between time spent working and time spent sleeping. Work and
+            sleep are summed over all worker threads.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            requests = self._total('requests_total')
+            pages = self._total('pages_total')
+            items = self._total('items_total')
+            bytes_received = self._total('response_bytes_total')
+            request_time = sum(h.sum for (name, _), h in self._histograms.items()
+                               if name == 'request_duration_seconds')
+            stage_time = sum(h.sum for (name, _), h in self._histograms.items()
+                             if name == 'stage_duration_seconds')
+            sleep = {
+                dict(labels)['reason']: round(value, 3)
+                for (name, labels), value in self._counters.items() if name == 'sleep_seconds_total'
+            }
+
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'requests': int(requests),
+            'requests_per_second': round(requests / elapsed, 3) if elapsed else None,
+            'pages': int(pages),
+            'pages_per_second': round(pages / elapsed, 3) if elapsed else None,
+            'items': int(items),
+            'bytes_received': int(bytes_received),
+            'work_seconds': round(request_time + stage_time, 3),
+            'request_seconds': round(request_time, 3),
+            'processing_seconds': round(stage_time, 3),
+            'sleep_seconds': sleep,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return every counter and histogram as plain data.
+
+        Returns:
+            Dict[str, Any]: Summary plus counters and histograms keyed by metric name
+        """
+        summary = self.summary()
+        with self._lock:
+            counters: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({'labels': dict(labels), 'value': round(value, 6)})
+
+            histograms: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                histograms.setdefault(name, []).append({
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'p50': _bound(histogram.quantile(0.5)),
+                    'p95': _bound(histogram.quantile(0.95)),
+                    'buckets': {str(_bound(b)): c for b, c in histogram.cumulative()}
+                })
+
+        return {
+            'started_at': self.started_at,
+            'summary': summary,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def to_json(self, **extra) -> str:
+        """Serialise a snapshot, plus any `extra` top-level fields, as JSON."""
+        return json.dumps({**self.snapshot(), **extra}, indent=2, default=str)
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ''
+        escaped = (
+            (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, value in pairs
+        )
+        return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (kind, description, _) in METRICS.items():
+                full_name = f"{self.namespace}_{name}"
+                if kind == 'counter':
+                    series = sorted((labels, value) for (metric, labels), value in self._counters.items()
+                                    if metric == name)
+                else:
+                    series = sorted((labels, h) for (metric, labels), h in self._histograms.items()
+                                    if metric == name)
+                if not series:
+                    continue
+
+                lines.append(f"# HELP {full_name} {description}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in series:
+                    if kind == 'counter':
+                        lines.append(f"{full_name}{self._format_labels(labels)} {value:g}")
+                        continue
+                    for bound, count in value.cumulative():
+                        le = '+Inf' if math.isinf(bound) else f"{bound:g}"
+                        lines.append(f"{full_name}_bucket{self._format_labels(labels, (('le', le),))} {count}")
+                    lines.append(f"{full_name}_sum{self._format_labels(labels)} {value.sum:g}")
+                    lines.append(f"{full_name}_count{self._format_labels(labels)} {value.count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, directory: str, **extra) -> Tuple[str, str]:
+        """
+        Write telemetry.json and telemetry.prom to `directory`, replacing earlier exports.
+
+        Args:
+            directory: Output directory
+            **extra: Extra top-level fields for the JSON export
+
+        Returns:
+            Tuple[str, str]: Paths of the JSON and Prometheus files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for filename, content in (('telemetry.json', self.to_json(**extra)),
+                                  ('telemetry.prom', self.to_prometheus())):
+            path = os.path.join(directory, filename)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+            paths.append(path)
+
+        return paths[0], paths[1]
+
+    def log_summary(self):
+        """Log the headline figures of the run."""
+        summary = self.summary()
+        sleep = ', '.join(f"{reason} {seconds}s" for reason, seconds in sorted(summary['sleep_seconds'].items()))
+        logger.info(
+            f"Telemetry: {summary['pages']} pages ({summary['pages_per_second']}/s), "
+            f"{summary['requests']} requests ({summary['requests_per_second']}/s) in {summary['elapsed_seconds']}s; "
+            f"work {summary['work_seconds']}s, sleep: {sleep or 'none'}"
+        )
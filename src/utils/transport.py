@@ -0,0 +1,260 @@
+import random
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from src.utils.logger import setup_logger
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.telemetry import Telemetry
+
+logger = setup_logger('transport')
+
+# Server errors worth retrying; other 4xx/5xx responses are returned to the caller
+RETRY_STATUSES = {500, 502, 503, 504}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+
+    Args:
+        value: Raw header value
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparseable
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class HTTPTransport:
+    """
+    Pooled HTTP transport shared by every API call of a collector.
+
+    A single requests.Session keeps TCP/TLS connections alive across calls,
+    the adapter pool bounds how many sockets are open per host, responses are
+    negotiated as gzip/deflate and every request carries a timeout. Byte and
+    latency counters are kept so a run can report its network cost.
+
+    When a rate limiter is given, every attempt first takes a token from it.
+    429 responses lower the shared rate and honour Retry-After; 5xx responses
+    and connection failures are retried with jittered exponential backoff.
+    
+    When telemetry is given, every attempt is recorded per endpoint along
+    with the time spent waiting on the limiter and in retry backoff.
+    """
+
+    def __init__(self, pool_size: int = 10,
+                 timeout: Union[float, Tuple[float, float]] = (10, 60),
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 max_retries: int = 0, backoff: float = 1.0, backoff_max: float = 60.0,
+                 telemetry: Optional[Telemetry] = None):
+        """
+        Args:
+            pool_size: Maximum number of keep-alive connections per host
+            timeout: Per-request timeout, either a number or (connect, read)
+            limiter: Shared rate limiter consulted before every attempt
+            max_retries: Retries allowed for throttled or transient failures
+            backoff: Base delay in seconds for retry backoff
+            backoff_max: Upper bound on a single retry delay
+            telemetry: Registry receiving per-request latency, status and byte counts
+        """
+        self.timeout = timeout
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.telemetry = telemetry
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
+        })
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._retries = 0
+        self._wire_bytes = 0
+        self._body_bytes = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter for the given retry attempt."""
+        delay = min(self.backoff_max, self.backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry(self, attempt: int, delay: float, reason: str, url: str, sleep: bool = True):
+        """Log and count a retry, sleeping for `delay` unless the limiter already enforces it."""
+        logger.warning(
+            f"{reason} from {url}; retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+        )
+        with self._lock:
+            self._retries += 1
+        if sleep:
+            time.sleep(delay)
+            if self.telemetry is not None:
+                self.telemetry.inc('sleep_seconds_total', delay, reason='retry_backoff')
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session, applying rate limiting and retries.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Extra arguments forwarded to requests.Session.request
+
+        Returns:
+            requests.Response: Response with its body already read. Throttled or
+            5xx responses are returned once retries are exhausted.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+
+        while True:
+            if self.limiter is not None:
+                waited = self.limiter.acquire()
+                if waited and self.telemetry is not None:
+                    self.telemetry.inc('sleep_seconds_total', waited, reason='rate_limit')
+
+            try:
+                response = self._send(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._retry(attempt, self._backoff_delay(attempt), type(e).__name__, url)
+                attempt += 1
+                continue
+
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+                if self.limiter is not None:
+                    self.limiter.on_throttle(delay)
+                if attempt >= self.max_retries:
+                    return response
+                # The limiter pauses every caller for `delay`, so only sleep without one
+                self._retry(attempt, delay, 'HTTP 429', url, sleep=self.limiter is None)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                if attempt >= self.max_retries:
+                    return response
+                self._retry(attempt, self._backoff_delay(attempt), f"HTTP {response.status_code}", url)
+                attempt += 1
+                continue
+
+            if self.limiter is not None:
+                self.limiter.on_success()
+            return response
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a single attempt and update the byte/latency counters."""
+        endpoint = self._endpoint(url)
+        start = time.perf_counter()
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+            body_bytes = len(response.content)
+        except requests.exceptions.RequestException as e:
+            with self._lock:
+                self._requests += 1
+                self._errors += 1
+            if self.telemetry is not None:
+                self.telemetry.inc('requests_total', method=method, endpoint=endpoint, status=type(e).__name__)
+            raise
+
+        latency = time.perf_counter() - start
+        # urllib3 reports the (compressed) bytes actually read from the socket
+        wire_bytes = response.raw.tell() if hasattr(response.raw, 'tell') else body_bytes
+
+        with self._lock:
+            self._requests += 1
+            self._wire_bytes += wire_bytes or body_bytes
+            self._body_bytes += body_bytes
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+
+        if self.telemetry is not None:
+            self.telemetry.observe('request_duration_seconds', latency, method=method, endpoint=endpoint)
+            self.telemetry.inc('requests_total', method=method, endpoint=endpoint, status=response.status_code)
+            self.telemetry.inc('response_bytes_total', wire_bytes or body_bytes, method=method, endpoint=endpoint)
+
+        return response
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        """Label an API call by the last two path segments, e.g. /post/posts."""
+        segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+        return '/' + '/'.join(segments[-2:])
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request."""
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the transport counters.
+
+        Returns:
+            Dict[str, Any]: Request, error, byte and latency totals
+        """
+        with self._lock:
+            completed = self._requests - self._errors
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'retries': self._retries,
+                'bytes_received': self._wire_bytes,
+                'bytes_decoded': self._body_bytes,
+                'compression_ratio': round(self._body_bytes / self._wire_bytes, 2) if self._wire_bytes else None,
+                'total_latency': round(self._total_latency, 3),
+                'avg_latency': round(self._total_latency / completed, 3) if completed else None,
+                'max_latency': round(self._max_latency, 3)
+            }
+
+    def log_stats(self):
+        """Log the current transport counters."""
+        stats = self.get_stats()
+        logger.info(
+            f"Transport: {stats['requests']} requests ({stats['errors']} errors, {stats['retries']} retries), "
+            f"{stats['bytes_received']:,} bytes received ({stats['bytes_decoded']:,} decoded), "
+            f"avg latency {stats['avg_latency']}s, max latency {stats['max_latency']}s"
+        )
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()